@@ -17,11 +17,10 @@ ORDER BY rs.average_rating DESC
 LIMIT 20;
 
 SELECT
-  genre,
-  AVG(rating) AS average_rating,
-  COUNT(DISTINCT movie_id) AS total_movies
-FROM {{ ref('dim_movies_with_tags') }} m
-JOIN {{ ref('fct_ratings') }} r ON m.movie_id = r.movie_id
-CROSS JOIN UNNEST(m.genre_array) AS genre
-GROUP BY genre
+  mg.genre,
+  AVG(r.rating) AS average_rating,
+  COUNT(DISTINCT mg.movie_id) AS total_movies
+FROM {{ ref('dim_movie_genres') }} mg
+JOIN {{ ref('fct_ratings') }} r ON mg.movie_id = r.movie_id
+GROUP BY mg.genre
 ORDER BY average_rating DESC;
\ No newline at end of file
@@ -2,40 +2,44 @@
 
 import streamlit as st
 import pandas as pd
-import snowflake.connector
+from backends import create_backend
 from queries import (
     top_rated_movies_summary,
     user_engagement,
     rating_over_the_years,
     tag_relevance_analysis
 )
+from queries1 import QUERY_SCHEMAS
 #Credentials
 from dotenv import load_dotenv
 import os
 load_dotenv()
-# 🚀 Snowflake connection
+# 🚀 Query backend (Snowflake, or DuckDB over local Parquet exports)
 @st.cache_resource
-def get_connection():
-    return snowflake.connector.connect(
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),
-        warehouse='COMPUTE_WH',
-        database='MOVIELENS',
-        schema='DEV'
-    )
-
-conn = get_connection()
-if conn is None:
+def get_backend():
+    kind = os.getenv("MOVIELENS_BACKEND", "snowflake").lower()
+    try:
+        if kind == "duckdb":
+            return create_backend("duckdb")
+        return create_backend("snowflake", {
+            "user": os.getenv("SNOWFLAKE_USER"),
+            "password": os.getenv("SNOWFLAKE_PASSWORD"),
+            "account": os.getenv("SNOWFLAKE_ACCOUNT"),
+            "warehouse": 'COMPUTE_WH',
+            "database": 'MOVIELENS',
+            "schema": 'DEV'
+        })
+    except Exception as e:
+        st.error(f"❌ The {kind} query backend could not be started. Error: {e}")
+        return None
+
+backend = get_backend()
+if backend is None:
     st.stop()
 
 # 🔍 Run query and return DataFrame
-def run_query(query):
-    with conn.cursor() as cur:
-        cur.execute(query)
-        columns = [col[0] for col in cur.description]
-        data = cur.fetchall()
-    return pd.DataFrame(data, columns=columns)
+def run_query(query, schema=None):
+    return backend.run_query(query, schema)
 
 # 🎨 Streamlit page setup
 st.set_page_config(page_title="🎬 MovieLens Dashboard", layout="wide")
@@ -109,8 +113,8 @@ options = {
 selection = st.sidebar.radio("Select a section", list(options.keys()))
 
 # 📦 Execute query
-query = options[selection]()
-df = run_query(query)
+query_func = options[selection]
+df = run_query(query_func(), QUERY_SCHEMAS.get(query_func.__name__))
 df.columns = [col.lower() for col in df.columns]
 
 # 📈 Visualizations by section
@@ -121,7 +125,6 @@ if selection == "🎥 Top Rated Movies":
     st.markdown("### ⭐ Top Rated Movies")
     st.markdown("Shows the top movies based on average user ratings.")
 
-    df["average_rating"] = pd.to_numeric(df["average_rating"], errors="coerce")
     top10 = df.sort_values("average_rating", ascending=False).head(10)
 
     st.bar_chart(top10.set_index("movie_title")["average_rating"])
@@ -132,7 +135,6 @@ elif selection == "👤 User Engagement":
     st.markdown("### 👥 User Engagement Overview")
     st.markdown("How active are users based on number of ratings submitted?")
 
-    df["number_of_ratings"] = pd.to_numeric(df["number_of_ratings"], errors="coerce")
     top_users = df.sort_values("number_of_ratings", ascending=False).head(30)
 
     st.line_chart(top_users.set_index("user_id")["number_of_ratings"])
@@ -144,7 +146,6 @@ elif selection == "📅 Rating Over the Years":
     st.markdown("Visualizes how user activity evolved year-by-year.")
 
     if "rating_year" in df.columns and "ratings_given" in df.columns:
-        df["ratings_given"] = pd.to_numeric(df["ratings_given"], errors="coerce")
         st.line_chart(df.set_index("rating_year")["ratings_given"])
         st.markdown(" ")
         st.dataframe(df, use_container_width=True)
@@ -155,7 +156,6 @@ elif selection == "🏷️ Tag Relevance Analysis":
     st.markdown("### 🏷️ Most Relevant Tags")
     st.markdown("Top tags used by users and their average relevance scores.")
 
-    df["avg_relevance"] = pd.to_numeric(df["avg_relevance"], errors="coerce")
     top_tags = df.sort_values("avg_relevance", ascending=False).head(15)
 
     st.bar_chart(top_tags.set_index("tag_name")["avg_relevance"])
@@ -0,0 +1,586 @@
+# backends.py
+
+"""Query backends used by the dashboard's `run_query`.
+
+`SnowflakeBackend` runs queries against the warehouse. `DuckDBBackend` runs the
+same SQL in-process against Parquet exports of the dbt models, which is handy
+for local development, CI and as a fallback when the warehouse is unavailable.
+`ColumnarBackend` answers the rating queries from an in-memory `RatingsStore`
+for self-hosted deployments without a warehouse. `LatencyBackend` adds a fixed
+delay to another backend so load tests can stand in for a remote warehouse.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+from connection_pool import ConnectionPool
+from instrumentation import NULL_SPAN, tracer
+from queries1 import query_id
+
+
+# Tables the dashboard reads. The local backend expects one `<name>.parquet`
+# file (or a directory of Parquet files) per table in its data directory.
+DASHBOARD_TABLES = ["fct_ratings", "dim_movies", "fct_genome_scores", "dim_genome_tags"]
+
+# Models the dashboard reads on top of the base tables (see models/example/dim and
+# models/example/mart). When one has no Parquet export, the local backend derives
+# it from the base tables with this SQL. Entries are in dependency order.
+LOCAL_DERIVED_VIEWS = {
+    "dim_movie_genres": """
+        SELECT movie_id, UNNEST(string_split(genres, '|')) AS genre FROM dim_movies
+    """,
+    "mart_movie_rating_stats": """
+        SELECT movie_id, SUM(rating) AS rating_sum, COUNT(*) AS total_ratings,
+               AVG(rating) AS average_rating
+        FROM fct_ratings
+        GROUP BY movie_id
+    """,
+    "mart_movie_ratings_by_year": """
+        SELECT movie_id, year(rating_timestamp) AS rating_year, SUM(rating) AS rating_sum,
+               COUNT(*) AS total_ratings
+        FROM fct_ratings
+        WHERE rating_timestamp IS NOT NULL
+        GROUP BY movie_id, rating_year
+    """,
+    "mart_user_engagement": """
+        SELECT user_id, SUM(rating) AS rating_sum, COUNT(*) AS number_of_ratings,
+               AVG(rating) AS average_rating_given
+        FROM fct_ratings
+        GROUP BY user_id
+    """,
+    "mart_ratings_by_year": """
+        SELECT year(rating_timestamp) AS rating_year, COUNT(*) AS ratings_given
+        FROM fct_ratings
+        WHERE rating_timestamp IS NOT NULL
+        GROUP BY rating_year
+    """,
+    "mart_genre_ratings": """
+        SELECT mg.genre, r.rating, COUNT(*) AS ratings_given
+        FROM fct_ratings r
+        JOIN dim_movie_genres mg ON mg.movie_id = r.movie_id
+        GROUP BY mg.genre, r.rating
+    """,
+    "mart_genre_stats": """
+        WITH genre_ratings AS (
+            SELECT genre, SUM(rating * ratings_given) AS rating_sum, SUM(ratings_given) AS total_ratings
+            FROM mart_genre_ratings
+            GROUP BY genre
+        ),
+        genre_movies AS (
+            SELECT mg.genre, COUNT(DISTINCT mg.movie_id) AS number_of_movies
+            FROM dim_movie_genres mg
+            JOIN mart_movie_rating_stats s ON s.movie_id = mg.movie_id
+            GROUP BY mg.genre
+        )
+        SELECT gm.genre, gm.number_of_movies, gr.total_ratings,
+               gr.rating_sum / gr.total_ratings AS average_rating
+        FROM genre_movies gm
+        JOIN genre_ratings gr ON gr.genre = gm.genre
+        WHERE gm.genre != '(no genres listed)'
+    """,
+    "mart_ratings_summary": """
+        SELECT (SELECT COUNT(*) FROM dim_movies) AS total_movies,
+               (SELECT SUM(number_of_ratings) FROM mart_user_engagement) AS total_ratings,
+               (SELECT COUNT(*) FROM mart_user_engagement) AS total_users
+    """,
+}
+
+# Column types a query can declare in its schema (see QUERY_SCHEMAS in queries1.py).
+ARROW_TYPES = {
+    "int32": pa.int32(),
+    "int64": pa.int64(),
+    "float32": pa.float32(),
+    "float64": pa.float64(),
+    "string": pa.string(),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+# Rows per record batch when a result is streamed instead of fetched whole
+BATCH_ROWS = 65536
+
+
+def arrow_to_frame(table, schema=None):
+    """Converts an Arrow result to pandas, casting columns to the declared `schema` first.
+
+    Columns are lower-cased. Columns not covered by `schema` keep their Arrow type,
+    except decimals, which become float64 instead of object columns of `Decimal`.
+    """
+    table = table.rename_columns([name.lower() for name in table.column_names])
+    schema = schema or {}
+    fields = []
+    for field in table.schema:
+        if field.name in schema:
+            fields.append(pa.field(field.name, ARROW_TYPES[schema[field.name]]))
+        elif pa.types.is_decimal(field.type):
+            fields.append(pa.field(field.name, pa.float64()))
+        else:
+            fields.append(field)
+    table = table.cast(pa.schema(fields))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _lower_case(batch):
+    return batch.rename_columns([name.lower() for name in batch.schema.names])
+
+
+def _build_frame(table, schema):
+    with tracer.span("frame") as span:
+        df = arrow_to_frame(table, schema)
+        if span:
+            span.set(rows=len(df), bytes=int(df.memory_usage(index=False).sum()))
+    return df
+
+
+# Single-quoted literals and `::` casts are skipped; `:name` is a bind parameter.
+_NAMED_PARAM = re.compile(r"'(?:[^']|'')*'|::|:(\w+)")
+
+
+def to_qmark(query, params=None):
+    """Rewrites `:name` placeholders to `?` and returns `(query, args)` in placeholder order.
+
+    Both backends bind with the qmark style, so values never end up in the SQL text.
+    """
+    if not params:
+        return query, None
+    args = []
+
+    def bind(match):
+        name = match.group(1)
+        if name is None:
+            return match.group(0)
+        if name not in params:
+            raise KeyError(f"No value given for bind parameter :{name}")
+        args.append(params[name])
+        return "?"
+
+    return _NAMED_PARAM.sub(bind, query), args
+
+
+class QueryBackend:
+    """Common interface for everything `run_query` can talk to."""
+
+    name = "base"
+    max_workers = 4
+
+    def run_query(self, query, schema=None, params=None):
+        """Runs `query` and returns the result as a DataFrame with lower-case columns.
+
+        `schema` optionally maps result columns to the dtypes listed in `ARROW_TYPES`;
+        `params` supplies values for `:name` bind parameters in `query`.
+        """
+        raise NotImplementedError
+
+    def iter_batches(self, query, params=None, batch_rows=BATCH_ROWS):
+        """Yields the result of `query` as Arrow record batches with lower-case columns.
+
+        Meant for exporting whole results: backends that can stream hand over one
+        cursor batch of at most `batch_rows` rows at a time, so the result is never
+        held at once. This default runs `run_query` and splits its DataFrame.
+        """
+        table = pa.Table.from_pandas(self.run_query(query, params=params), preserve_index=False)
+        # An empty result still yields one batch, which carries the columns
+        yield from table.to_batches(batch_rows) or [pa.RecordBatch.from_pylist([], schema=table.schema)]
+
+    def submit(self, query, schema=None, params=None):
+        """Starts `query` without waiting for it and returns a Future of its DataFrame."""
+        return self._in_background(self.run_query, query, schema, params)
+
+    def _in_background(self, fn, *args):
+        # Carries the caller's context along, so spans opened by `fn` join its trace
+        return self._pool().submit(contextvars.copy_context().run, fn, *args)
+
+    def _pool(self):
+        if getattr(self, "_executor", None) is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-query")
+        return self._executor
+
+    def data_version(self):
+        """Returns a token that changes whenever the underlying tables change (None if unknown)."""
+        return None
+
+    def close(self):
+        pass
+
+
+# --- Snowflake ---
+class SnowflakeBackend(QueryBackend):
+    """Runs queries on Snowflake through a pool of `snowflake.connector` connections.
+
+    `pool_size` bounds the number of open connections and `max_inflight` the
+    number of submitted queries waited on at once; `connector` can be swapped for
+    a fake module exposing `connect()` to exercise the backend without a network.
+    """
+
+    name = "snowflake"
+
+    def __init__(self, private_key=None, private_key_passphrase=None, pool_size=4, max_inflight=16, keepalive_interval=900, connector=None, **connect_args):
+        if connector is None:
+            import snowflake.connector as connector
+
+        if private_key:
+            # Derived once; every pooled connection reuses the same key bytes
+            connect_args["private_key"] = self._pkcs8_private_key(private_key, private_key_passphrase)
+        # Server-side binding for the `?` placeholders produced by to_qmark
+        connect_args.setdefault("paramstyle", "qmark")
+        # Waiting threads only hold a connection while they poll, so they can outnumber the pool
+        self.max_workers = max(max_inflight, pool_size)
+        self.pool = ConnectionPool(
+            lambda: connector.connect(**connect_args),
+            size=pool_size,
+            keepalive_interval=keepalive_interval,
+            # DB-API drivers export it at module level; a fake connector without one closes on any error
+            query_errors=getattr(connector, "ProgrammingError", ()),
+        )
+
+    @staticmethod
+    def _pkcs8_private_key(private_key, passphrase):
+        """Decrypts a PEM private key and returns it in the PKCS8 DER format the connector expects."""
+        from cryptography.hazmat.primitives import serialization
+
+        key = serialization.load_pem_private_key(
+            private_key.encode("utf-8"),
+            password=passphrase.encode("utf-8") if passphrase else None
+        )
+        return key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+
+    poll_interval = 0.1
+
+    def run_query(self, query, schema=None, params=None):
+        query, args = to_qmark(query, params)
+
+        def execute(conn):
+            with conn.cursor() as cur:
+                with tracer.span("execute", backend=self.name) as span:
+                    cur.execute(query, args)
+                    span.set(query_id=cur.sfqid)
+                return self._fetch_frame(cur, schema)
+        return self.pool.run(execute)
+
+    def iter_batches(self, query, params=None, batch_rows=BATCH_ROWS):
+        query, args = to_qmark(query, params)
+        # Holds a pooled connection until the last batch is read or the consumer stops
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            with tracer.span("execute", backend=self.name) as span:
+                cur.execute(query, args)
+                span.set(query_id=cur.sfqid)
+            # One Arrow table per result chunk downloaded from the warehouse
+            for table in cur.fetch_arrow_batches():
+                for batch in table.to_batches(batch_rows):
+                    yield _lower_case(batch)
+
+    def submit(self, query, schema=None, params=None):
+        query, args = to_qmark(query, params)
+        # Covers the time in the warehouse; ended by the thread that waits for the results
+        span = tracer.span("execute", backend=self.name)
+        return self._in_background(self._run_async, query, args, schema, span)
+
+    def _run_async(self, query, args, schema, span=NULL_SPAN):
+        """Starts `query` with execute_async and polls it until its results can be fetched.
+
+        Every step checks a connection out only for its own round trip, so queries
+        waiting in the warehouse hold no connection and more of them than
+        `pool_size` can run at once.
+        """
+        def start(conn):
+            with conn.cursor() as cur:
+                cur.execute_async(query, args)
+                return cur.sfqid
+
+        def still_running(conn):
+            return conn.is_still_running(conn.get_query_status_throw_if_error(query_id))
+
+        def fetch(conn):
+            with conn.cursor() as cur:
+                cur.get_results_from_sfqid(query_id)
+                return self._fetch_frame(cur, schema)
+
+        try:
+            query_id = self.pool.run(start)
+            span.set(query_id=query_id)
+            while self.pool.run(still_running):
+                time.sleep(self.poll_interval)
+        finally:
+            span.end()
+        return self.pool.run(fetch)
+
+    @staticmethod
+    def _fetch_frame(cur, schema):
+        with tracer.span("fetch", query_id=cur.sfqid) as span:
+            table = cur.fetch_arrow_all()
+            if span and table is not None:
+                span.set(rows=table.num_rows, bytes=table.nbytes)
+        if table is None:
+            # The connector returns no Arrow table for empty results
+            return pd.DataFrame(columns=[col[0].lower() for col in cur.description])
+        return _build_frame(table, schema)
+
+    def data_version(self):
+        # SHOW is answered from metadata by the cloud services layer, so unlike an
+        # INFORMATION_SCHEMA query it never resumes a suspended warehouse. Row counts
+        # and sizes change with every load; creation times with every full refresh.
+        def table_stats(conn):
+            with conn.cursor() as cur:
+                cur.execute("SHOW TABLES IN SCHEMA")
+                columns = [col[0].lower() for col in cur.description]
+                return sorted(
+                    (row["name"], str(row["created_on"]), row["rows"], row["bytes"])
+                    for row in (dict(zip(columns, values)) for values in cur.fetchall())
+                )
+        stats = json.dumps(self.pool.run(table_stats), default=str)
+        return hashlib.sha256(stats.encode("utf-8")).hexdigest()[:16]
+
+    def close(self):
+        self.pool.close()
+
+
+# --- DuckDB over Parquet ---
+# Snowflake constructs used in queries1.py and their DuckDB equivalents.
+_DIALECT_SHIMS = [
+    # FROM t x, LATERAL FLATTEN(input => SPLIT(x.col, '|')) g  ->  unnest into g(value)
+    (re.compile(r"LATERAL\s+FLATTEN\s*\(\s*input\s*=>\s*SPLIT\s*\(\s*([\w.]+)\s*,\s*('[^']*')\s*\)\s*\)\s+(?:AS\s+)?(\w+)", re.I),
+     r"UNNEST(string_split(\1, \2)) AS \3(value)"),
+    # EXTRACT(YEAR FROM col)  ->  year(col)
+    (re.compile(r"EXTRACT\s*\(\s*YEAR\s+FROM\s+([\w.]+)\s*\)", re.I), r"year(\1)"),
+    # APPROX_PERCENTILE(x, p)  ->  approx_quantile(x, p)
+    (re.compile(r"\bAPPROX_PERCENTILE\s*\(", re.I), "approx_quantile("),
+    # HASH_AGG(a, b)  ->  bit_xor(hash(a, b)), also order-independent
+    (re.compile(r"\bHASH_AGG\s*\(([^()]*)\)", re.I), r"bit_xor(hash(\1))"),
+    # t SAMPLE SYSTEM (10)  ->  t TABLESAMPLE SYSTEM (10%)
+    (re.compile(r"\bSAMPLE\s+SYSTEM\s*\(\s*([\d.]+)\s*\)", re.I), r"TABLESAMPLE SYSTEM (\1%)"),
+    # Fully qualified Snowflake names  ->  views registered on the local connection
+    (re.compile(r"\bMOVIELENS\.DEV\.", re.I), ""),
+]
+
+
+def to_duckdb_sql(query):
+    """Rewrites the Snowflake SQL used by the dashboard into DuckDB SQL."""
+    for pattern, replacement in _DIALECT_SHIMS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+def fetch_duckdb_arrow(cur):
+    """Fetches a DuckDB result as an Arrow table (`to_arrow_table` replaced `fetch_arrow_table` in 1.4)."""
+    fetch = getattr(cur, "to_arrow_table", None) or cur.fetch_arrow_table
+    return fetch()
+
+
+def fetch_duckdb_reader(cur, batch_rows):
+    """Streams a DuckDB result as an Arrow RecordBatchReader (`to_arrow_reader` replaced `fetch_record_batch`)."""
+    fetch = getattr(cur, "to_arrow_reader", None) or cur.fetch_record_batch
+    return fetch(batch_rows)
+
+
+class DuckDBBackend(QueryBackend):
+    """Runs dashboard queries in-process against Parquet exports of the dbt models.
+
+    Derived models without an export are computed on the fly from the base tables.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, data_dir):
+        import duckdb
+
+        self.data_dir = data_dir
+        self.conn = duckdb.connect(database=":memory:")
+        missing = []
+        for table in DASHBOARD_TABLES:
+            path = self._parquet_path(table)
+            if path is None:
+                missing.append(table)
+                continue
+            self.conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+        if missing:
+            raise FileNotFoundError(f"No Parquet export found in {data_dir} for: {', '.join(missing)}")
+        for model, sql in LOCAL_DERIVED_VIEWS.items():
+            path = self._parquet_path(model)
+            source = f"SELECT * FROM read_parquet('{path}')" if path else sql
+            self.conn.execute(f"CREATE VIEW {model} AS {source}")
+
+    def _parquet_path(self, table):
+        single = os.path.join(self.data_dir, f"{table}.parquet")
+        if os.path.isfile(single):
+            return single
+        partitioned = os.path.join(self.data_dir, table)
+        if os.path.isdir(partitioned):
+            return os.path.join(partitioned, "*.parquet")
+        return None
+
+    def run_query(self, query, schema=None, params=None):
+        query, args = to_qmark(to_duckdb_sql(query), params)
+        cur = self.conn.cursor()
+        try:
+            with tracer.span("execute", backend=self.name):
+                cur.execute(query, args)
+            with tracer.span("fetch") as span:
+                table = fetch_duckdb_arrow(cur)
+                if span:
+                    span.set(rows=table.num_rows, bytes=table.nbytes)
+            return _build_frame(table, schema)
+        finally:
+            cur.close()
+
+    def iter_batches(self, query, params=None, batch_rows=BATCH_ROWS):
+        query, args = to_qmark(to_duckdb_sql(query), params)
+        cur = self.conn.cursor()
+        try:
+            with tracer.span("execute", backend=self.name):
+                cur.execute(query, args)
+            reader = fetch_duckdb_reader(cur, batch_rows)
+            empty = True
+            for batch in reader:
+                empty = False
+                yield _lower_case(batch)
+            if empty:
+                yield _lower_case(pa.RecordBatch.from_pylist([], schema=reader.schema))
+        finally:
+            cur.close()
+
+    def data_version(self):
+        latest = 0.0
+        for root, _, files in os.walk(self.data_dir):
+            for name in files:
+                if name.endswith(".parquet"):
+                    latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+        return str(latest)
+
+    def close(self):
+        self.conn.close()
+
+
+# --- In-process columnar store ---
+_LIMIT = re.compile(r"\bLIMIT\s+(\d+)\s*;?\s*$", re.I)
+
+
+class ColumnarBackend(QueryBackend):
+    """Answers dashboard queries from a `RatingsStore` instead of running their SQL.
+
+    Queries are recognized by the query id `build_query` tags them with; those the
+    store has no handler for, such as the tag genome queries, go to `fallback`,
+    usually a `DuckDBBackend` over the same exports. With a `data_dir`,
+    `data_version` first appends the ratings loaded into its `fct_ratings` export
+    since the last sync.
+    """
+
+    name = "columnar"
+
+    def __init__(self, store, fallback=None, data_dir=None):
+        from ratings_store import QUERY_HANDLERS
+
+        self.store = store
+        self.fallback = fallback
+        self.data_dir = data_dir
+        self.handlers = QUERY_HANDLERS
+
+    def run_query(self, query, schema=None, params=None):
+        name = query_id(query)
+        handler = self.handlers.get(name)
+        if handler is None:
+            if self.fallback is None:
+                raise NotImplementedError(f"The ratings store cannot answer query '{name}' and there is no fallback backend")
+            return self.fallback.run_query(query, schema, params)
+        limit = _LIMIT.search(query)
+        with tracer.span("execute", backend=self.name, query=name):
+            df = handler(self.store, params or {}, int(limit.group(1)) if limit else None)
+        return _build_frame(pa.Table.from_pandas(df, preserve_index=False), schema)
+
+    def iter_batches(self, query, params=None, batch_rows=BATCH_ROWS):
+        # Store answers are already in memory; everything else streams from the fallback
+        if query_id(query) not in self.handlers and self.fallback is not None:
+            return self.fallback.iter_batches(query, params, batch_rows)
+        return super().iter_batches(query, params, batch_rows)
+
+    def data_version(self):
+        if self.data_dir is not None:
+            self.store.sync(self.data_dir)
+        fallback = self.fallback.data_version() if self.fallback is not None else None
+        return f"{self.store.rows}:{fallback}"
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+# --- Simulated latency ---
+class LatencyBackend(QueryBackend):
+    """Wraps `backend`, sleeping `latency` seconds before each query it forwards.
+
+    Makes a local backend behave like a warehouse round trip for load tests. At
+    most `max_workers` queries are submitted at once, like the Snowflake pool.
+    """
+
+    name = "latency"
+
+    def __init__(self, backend, latency, max_workers=4):
+        self.backend = backend
+        self.latency = latency
+        self.max_workers = max_workers
+
+    def run_query(self, query, schema=None, params=None):
+        with tracer.span("latency", backend=self.backend.name, seconds=self.latency):
+            time.sleep(self.latency)
+        return self.backend.run_query(query, schema, params)
+
+    def iter_batches(self, query, params=None, batch_rows=BATCH_ROWS):
+        time.sleep(self.latency)
+        yield from self.backend.iter_batches(query, params, batch_rows)
+
+    def data_version(self):
+        return self.backend.data_version()
+
+    def close(self):
+        if getattr(self, "_executor", None) is not None:
+            self._executor.shutdown(wait=False)
+        self.backend.close()
+
+
+def export_parquet(source, data_dir, tables=DASHBOARD_TABLES):
+    """Dumps `tables` from `source` (usually Snowflake) into Parquet files for `DuckDBBackend`."""
+    os.makedirs(data_dir, exist_ok=True)
+    for table in tables:
+        df = source.run_query(f"SELECT * FROM MOVIELENS.DEV.{table}")
+        df.to_parquet(os.path.join(data_dir, f"{table}.parquet"), index=False)
+
+
+def create_backend(kind, settings=None):
+    """Builds the backend named by `kind` ("snowflake", "duckdb" or "columnar").
+
+    For Snowflake, `settings` are the connector arguments plus an optional PEM
+    `private_key`/`private_key_passphrase`; for DuckDB, an optional `data_dir`.
+    The columnar backend also takes a `store_dir` (default `<data_dir>/ratings_store`),
+    which is built from the exports in `data_dir` on first use.
+
+    A local backend is wrapped in a `LatencyBackend` when `latency_ms` (or
+    `MOVIELENS_BACKEND_LATENCY_MS`) is set, to simulate a remote warehouse.
+    """
+    settings = settings or {}
+    data_dir = settings.get("data_dir") or os.getenv("MOVIELENS_PARQUET_DIR", "data")
+    latency_ms = float(settings.get("latency_ms") or os.getenv("MOVIELENS_BACKEND_LATENCY_MS", "0"))
+    if kind == "duckdb":
+        backend = DuckDBBackend(data_dir)
+    elif kind == "columnar":
+        from ratings_store import RatingsStore
+
+        store_dir = settings.get("store_dir") or os.getenv("MOVIELENS_STORE_DIR") or os.path.join(data_dir, "ratings_store")
+        backend = ColumnarBackend(RatingsStore.open(store_dir, data_dir), DuckDBBackend(data_dir), data_dir)
+    elif kind == "snowflake":
+        return SnowflakeBackend(**settings)
+    else:
+        raise ValueError(f"Unknown query backend '{kind}'")
+    if latency_ms > 0:
+        return LatencyBackend(backend, latency_ms / 1000, int(os.getenv("MOVIELENS_POOL_SIZE", "4")))
+    return backend
@@ -0,0 +1,11 @@
+# benchmarks/__init__.py
+
+"""Benchmark harness for the dashboard queries and the dbt models.
+
+`synthetic` generates deterministic MovieLens-shaped raw tables at the scale of
+the public ml-100k, ml-1m and ml-25m datasets; `run` builds the models from
+them with DuckDB, runs every dashboard query and writes the measurements to
+JSON. Run it from the `netflix/` directory:
+
+    python -m benchmarks.run --scale ml-1m --output bench_ml-1m.json
+"""
@@ -0,0 +1,274 @@
+# benchmarks/load.py
+
+"""Load-tests the dashboard with concurrent sessions and reports how it scales.
+
+Starts `streamlit run app1.py` against a local backend (DuckDB or the columnar
+store over the benchmark exports) that sleeps `--latency-ms` before every query
+to stand in for the warehouse, then connects N headless sessions over
+Streamlit's websocket protocol. Each session walks every page of the sidebar
+for a number of rounds. For each concurrency level it reports the p50/p95/p99
+rerun latency, the throughput in reruns per second and the server's peak RSS:
+
+    python -m benchmarks.load --sessions 1,4,16 --latency-ms 200
+
+`--url` (and `--pid`, for RSS) points it at a server that is already running.
+Exits non-zero when a rerun raises or times out, or when a level's p95 goes
+over `--max-p95-ms`.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks import synthetic
+from benchmarks.run import benchmark_models
+from benchmarks.startup import APP_DIR, page_scripts
+
+
+# Statuses of a script run that another run replaces, so it isn't the end of the rerun
+_SUPERSEDED = {"FINISHED_EARLY_FOR_RERUN"}
+
+
+# --- Server ---
+def start_server(port, env, log_path):
+    """Starts `streamlit run app1.py` on `port` with `env` added and waits until it is healthy."""
+    log = open(log_path, "w", encoding="utf-8")
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", "app1.py",
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=APP_DIR,
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    url = f"http://localhost:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"The Streamlit server exited with code {server.returncode}; see {log_path}")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return server, url
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"The Streamlit server did not become healthy; see {log_path}")
+
+
+def rss_mb(pid):
+    """Current resident set size of process `pid` in MB (None if it cannot be read)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def sample_rss(pid, samples, interval=0.1):
+    while True:
+        mb = rss_mb(pid)
+        if mb is not None:
+            samples.append(mb)
+        await asyncio.sleep(interval)
+
+
+# --- Sessions ---
+async def rerun(ws, page, timeout):
+    """Asks the server to run `page` and waits for it to finish; returns `(seconds, error)`."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_name = page
+    error = None
+    start = time.perf_counter()
+    await ws.send(msg.SerializeToString())
+
+    async def finished():
+        nonlocal error
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.new_element.WhichOneof("type") == "exception":
+                error = error or fwd.delta.new_element.exception.message
+            elif kind == "script_finished" and ForwardMsg.ScriptFinishedStatus.Name(fwd.script_finished) not in _SUPERSEDED:
+                return
+
+    await asyncio.wait_for(finished(), timeout)
+    return time.perf_counter() - start, error
+
+
+async def session(url, pages, rounds, think, timeout, rng, result):
+    """One browser tab: walks `pages` `rounds` times, pausing about `think` seconds between reruns."""
+    import websockets
+
+    stream = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+    async with websockets.connect(stream, subprotocols=["streamlit"], max_size=None) as ws:
+        for _ in range(rounds):
+            for page in pages:
+                try:
+                    seconds, error = await rerun(ws, page, timeout)
+                except asyncio.TimeoutError:
+                    result["timeouts"] += 1
+                    return
+                result["latencies"].append(seconds)
+                if error:
+                    result["errors"].append(f"{page}: {error}")
+                if think:
+                    await asyncio.sleep(rng.uniform(0, 2 * think))
+
+
+async def run_level(url, pid, pages, sessions, rounds, think, timeout, seed):
+    """Runs `sessions` concurrent sessions to completion and summarizes their reruns."""
+    result = {"latencies": [], "errors": [], "timeouts": 0}
+    samples = []
+    sampler = asyncio.create_task(sample_rss(pid, samples)) if pid else None
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        session(url, pages, rounds, think, timeout, random.Random(seed + i), result)
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+    latencies = [s * 1000 for s in result["latencies"]]
+    return {
+        "sessions": sessions,
+        "reruns": len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies, default=None),
+        "throughput_rps": len(latencies) / elapsed if elapsed else None,
+        "peak_rss_mb": max(samples, default=None),
+        "errors": len(result["errors"]),
+        "timeouts": result["timeouts"],
+        "first_errors": result["errors"][:5],
+    }
+
+
+def _fmt(value, spec=".0f"):
+    return "-" if value is None else format(value, spec)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+# --- Main ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=synthetic.SCALES, default="ml-100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default=".bench", help="where raw data and model exports are kept between runs")
+    parser.add_argument("--backend", choices=["duckdb", "columnar"], default="duckdb")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="delay added to every backend query")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=3, help="times each session walks every page")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a session's reruns")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds a rerun may take before the session gives up")
+    parser.add_argument("--no-result-cache", action="store_true", help="send every query to the backend")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra environment for the server")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--url", default=None, help="load-test a server that is already running instead")
+    parser.add_argument("--pid", type=int, default=None, help="process id of the --url server, to sample its RSS")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail when any level's p95 goes over this")
+    parser.add_argument("--output", default=None, help="also write the measurements to this JSON file")
+    args = parser.parse_args(argv)
+
+    levels = [int(n) for n in args.sessions.split(",")]
+    pages = [os.path.splitext(script)[0] for script in page_scripts()]
+    server = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        scale_dir = os.path.join(args.work_dir, f"{args.scale}-seed{args.seed}")
+        raw_dir, export_dir = os.path.join(scale_dir, "raw"), os.path.join(scale_dir, "models")
+        if synthetic.generate(args.scale, raw_dir, args.seed) or not os.path.isdir(export_dir):
+            benchmark_models(raw_dir, export_dir)
+        scratch = tempfile.mkdtemp(prefix="movielens-load-")
+        env = {
+            "MOVIELENS_BACKEND": args.backend,
+            "MOVIELENS_PARQUET_DIR": os.path.abspath(export_dir),
+            "MOVIELENS_BACKEND_LATENCY_MS": str(args.latency_ms),
+            "MOVIELENS_CACHE_DIR": os.path.join(scratch, "results"),
+            "MOVIELENS_SIMILAR_DIR": os.path.join(scratch, "similar_movies"),
+        }
+        if args.no_result_cache:
+            env.update({"MOVIELENS_CACHE_MAX_MB": "0", "MOVIELENS_CACHE_DIR": ""})
+        env.update(item.split("=", 1) for item in args.env)
+        server, url = start_server(args.port, env, os.path.join(scratch, "server.log"))
+        pid = server.pid
+        print(f"server   {url} (pid {pid}, log {scratch}/server.log)", file=sys.stderr)
+
+    try:
+        # One session over every page first, so the levels start from warm caches
+        warmup = asyncio.run(run_level(url, pid, pages, 1, 1, 0, args.timeout, args.seed))
+        print(f"warmup   {warmup['reruns']} reruns, p50 {_fmt(warmup['p50_ms'])} ms, max {_fmt(warmup['max_ms'])} ms", file=sys.stderr)
+        results = []
+        print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rerun/s':>8} {'RSS MB':>8} {'failed':>7}", file=sys.stderr)
+        for n in levels:
+            level = asyncio.run(run_level(url, pid, pages, n, args.rounds, args.think_ms / 1000, args.timeout, args.seed))
+            results.append(level)
+            print(
+                f"{n:>8} {level['reruns']:>7} {_fmt(level['p50_ms']):>8} {_fmt(level['p95_ms']):>8} {_fmt(level['p99_ms']):>8} "
+                f"{_fmt(level['throughput_rps'], '.1f'):>8} {_fmt(level['peak_rss_mb']):>8} {level['errors'] + level['timeouts']:>7}",
+                file=sys.stderr,
+            )
+            for message in level["first_errors"]:
+                print(f"  error  {message}", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    failures = []
+    for level in [warmup, *results]:
+        if level["errors"] or level["timeouts"]:
+            failures.append(f"{level['sessions']} sessions: {level['errors']} errors, {level['timeouts']} timeouts")
+        if args.max_p95_ms is not None and level["p95_ms"] is not None and level["p95_ms"] > args.max_p95_ms:
+            failures.append(f"{level['sessions']} sessions: p95 {level['p95_ms']:.0f} ms (budget {args.max_p95_ms:.0f} ms)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "scale": None if args.url else args.scale,
+                "backend": None if args.url else args.backend,
+                "latency_ms": None if args.url else args.latency_ms,
+                "result_cache": not args.no_result_cache,
+                "pages": pages,
+                "rounds": args.rounds,
+                "warmup": warmup,
+                "levels": results,
+                "failures": failures,
+            }, f, indent=2)
+    for message in failures:
+        print(f"FAILED {message}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
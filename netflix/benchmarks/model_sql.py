@@ -0,0 +1,95 @@
+# benchmarks/model_sql.py
+
+"""DuckDB equivalents of the dbt models, for benchmarking their cost locally.
+
+Each entry mirrors a model in `models/example` as a full-refresh build over the
+raw tables from `synthetic.generate`. Staging models stay views, as in
+`dbt_project.yml`; everything else is materialized. The marts reuse the local
+backend's `LOCAL_DERIVED_VIEWS`, so the benchmark measures the same SQL the
+DuckDB dashboard backend falls back to.
+"""
+
+from backends import LOCAL_DERIVED_VIEWS
+
+
+# DuckDB has no INITCAP; capitalize each space-separated word instead
+def _initcap(expr):
+    return f"array_to_string(list_transform(string_split(TRIM({expr}), ' '), w -> upper(w[1]) || lower(w[2:])), ' ')"
+
+
+STAGING_SQL = {
+    "src_ratings": """
+        SELECT userId AS user_id, movieId AS movie_id, rating,
+               to_timestamp(timestamp) AS rating_timestamp
+        FROM raw_ratings
+    """,
+    "src_movies": "SELECT movieId AS movie_id, title, genres FROM raw_movies",
+    "src_tags": """
+        SELECT userId AS user_id, movieId AS movie_id, tag,
+               to_timestamp(timestamp) AS tag_timestamp
+        FROM raw_tags
+    """,
+    "src_genome_score": "SELECT movieId AS movie_id, tagId AS tag_id, relevance FROM raw_genome_scores",
+    "src_genome_tags": "SELECT tagId AS tag_id, tag FROM raw_genome_tags",
+    "src_links": "SELECT movieId AS movie_id, imdbld AS imdb_id, tmdbld AS tmdb_id FROM raw_links",
+}
+
+_DIM_FACT_SQL = {
+    "dim_movies": f"""
+        SELECT movie_id, {_initcap('title')} AS movie_title,
+               string_split(genres, '|') AS genre_array, genres
+        FROM src_movies
+    """,
+    "dim_genome_tags": f"SELECT tag_id, {_initcap('tag')} AS tag_name FROM src_genome_tags",
+    "dim_users": """
+        SELECT user_id FROM src_ratings
+        UNION
+        SELECT user_id FROM src_tags
+    """,
+    "fct_ratings": """
+        SELECT user_id, movie_id, rating, rating_timestamp, current_timestamp AS loaded_at
+        FROM src_ratings
+        WHERE rating IS NOT NULL
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY user_id, movie_id, rating_timestamp
+            ORDER BY rating DESC
+        ) = 1
+    """,
+    "fct_genome_scores": """
+        SELECT movie_id, tag_id, ROUND(relevance, 4) AS relevance_score
+        FROM src_genome_score
+        WHERE relevance > 0
+    """,
+    # OBJECT_AGG / ARRAY_AGG / HASH_AGG become a MAP, a filtered LIST and a BIT_XOR of hashes
+    "dim_movies_with_tags": """
+        WITH movie_tags AS (
+            SELECT s.movie_id, t.tag_name, s.relevance_score, s.tag_id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY s.movie_id
+                       ORDER BY s.relevance_score DESC, t.tag_name
+                   ) AS tag_rank
+            FROM fct_genome_scores s
+            JOIN dim_genome_tags t ON t.tag_id = s.tag_id
+        )
+        SELECT m.movie_id, m.movie_title, m.genres,
+               map_from_entries(list((mt.tag_name, mt.relevance_score)) FILTER (WHERE mt.tag_name IS NOT NULL)) AS tag_relevance,
+               list({'tag_name': mt.tag_name, 'relevance_score': mt.relevance_score} ORDER BY mt.tag_rank)
+                   FILTER (WHERE mt.tag_rank <= 10) AS top_tags,
+               hash(m.movie_title, m.genres, bit_xor(hash(mt.tag_id, mt.relevance_score))) AS scores_hash
+        FROM dim_movies m
+        LEFT JOIN movie_tags mt ON mt.movie_id = m.movie_id
+        GROUP BY m.movie_id, m.movie_title, m.genres
+    """,
+}
+
+_SEED_MART_SQL = {
+    "mart_movie_releases": """
+        SELECT f.*,
+               CASE WHEN d.release_date IS NULL THEN 'unknown' ELSE 'known' END AS release_info_available
+        FROM fct_ratings f
+        LEFT JOIN seed_movie_release_dates d ON f.movie_id = d.movie_id
+    """,
+}
+
+# Materialized models in dependency order
+MODEL_SQL = {**_DIM_FACT_SQL, **LOCAL_DERIVED_VIEWS, **_SEED_MART_SQL}
@@ -0,0 +1,240 @@
+# benchmarks/run.py
+
+"""Benchmarks the dbt models and dashboard queries on synthetic data.
+
+Generates (or reuses) the raw tables for a scale, builds every model with the
+DuckDB SQL in `model_sql`, exports the models to Parquet and runs each query in
+`queries1.py` through the same path as `DuckDBBackend`. Every step reports its
+latency, rows scanned (from DuckDB's profiler), peak RSS and result size; the
+report is written as JSON. With `--baseline`, the run fails if a step scans more
+rows or got slower than the baseline by more than `--tolerance`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import duckdb
+
+import queries1
+from backends import DuckDBBackend, arrow_to_frame, fetch_duckdb_arrow, to_duckdb_sql, to_qmark
+from benchmarks import synthetic
+from benchmarks.model_sql import MODEL_SQL, STAGING_SQL
+from result_cache import frame_nbytes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SEEDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "seeds")
+
+# Queries without a section of their own (app.py, the legacy dashboard, and full-table versions of paged queries)
+EXTRA_QUERIES = [
+    queries1.top_rated_movies_summary,
+    queries1.user_engagement,
+    queries1.tag_relevance_analysis,
+    queries1.genre_rating_distribution,
+]
+
+# Latencies below this are too noisy to flag as regressions
+MIN_COMPARABLE_MS = 20.0
+
+
+def dashboard_queries():
+    funcs = [func for section in queries1.SECTION_QUERIES.values() for func in section] + EXTRA_QUERIES
+    return list(dict.fromkeys(funcs))
+
+
+# --- Memory ---
+def reset_peak_rss():
+    """Resets the kernel's peak RSS counter where supported (Linux), so peaks are per step."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # Process-wide high-water mark: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# --- Profiling ---
+class Profiler:
+    """Times statements on a DuckDB connection and reads back the rows they scanned."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.path = os.path.join(tempfile.mkdtemp(prefix="movielens-bench-"), "profile.json")
+        conn.execute("PRAGMA enable_profiling = 'json'")
+        conn.execute(f"PRAGMA profiling_output = '{self.path}'")
+
+    def measure(self, fn):
+        """Returns `(result, metrics)` for `fn()`; metrics cover the last statement it ran."""
+        reset_peak_rss()
+        start = time.perf_counter()
+        result = fn()
+        latency_ms = (time.perf_counter() - start) * 1000
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                rows_scanned = json.load(f).get("cumulative_rows_scanned")
+        except (OSError, ValueError):
+            rows_scanned = None
+        return result, {"latency_ms": latency_ms, "rows_scanned": rows_scanned, "peak_rss_mb": peak_rss_mb()}
+
+
+def summarize(name, kind, runs, result_rows, result_bytes):
+    latencies = [run["latency_ms"] for run in runs]
+    return {
+        "kind": kind,
+        "name": name,
+        "latency_ms": {
+            "min": min(latencies),
+            "median": statistics.median(latencies),
+            "max": max(latencies),
+            "runs": latencies,
+        },
+        "rows_scanned": runs[-1]["rows_scanned"],
+        "peak_rss_mb": max((run["peak_rss_mb"] or 0) for run in runs) or None,
+        "result_rows": result_rows,
+        "result_bytes": result_bytes,
+    }
+
+
+# --- Steps ---
+def benchmark_models(raw_dir, export_dir, threads=None):
+    """Builds every model from the raw tables and exports it to `export_dir`."""
+    conn = duckdb.connect(database=":memory:")
+    if threads:
+        conn.execute(f"SET threads = {int(threads)}")
+    for table in synthetic.RAW_TABLES:
+        conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{os.path.join(raw_dir, table + '.parquet')}')")
+    conn.execute(
+        "CREATE TABLE seed_movie_release_dates AS SELECT * FROM "
+        f"read_csv('{os.path.join(SEEDS_DIR, 'seed_movie_release_dates.csv')}', header = true)"
+    )
+    for name, sql in STAGING_SQL.items():
+        conn.execute(f"CREATE VIEW {name} AS {sql}")
+
+    profiler = Profiler(conn)
+    os.makedirs(export_dir, exist_ok=True)
+    results = []
+    for name, sql in MODEL_SQL.items():
+        _, metrics = profiler.measure(lambda: conn.execute(f"CREATE OR REPLACE TABLE {name} AS {sql}"))
+        rows = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        path = os.path.join(export_dir, f"{name}.parquet")
+        conn.execute(f"COPY {name} TO '{path}' (FORMAT parquet)")
+        results.append(summarize(name, "model", [metrics], rows, os.path.getsize(path)))
+        print(f"model  {name:<28} {metrics['latency_ms']:>10.1f} ms  {rows:>12,} rows", file=sys.stderr)
+    conn.close()
+    return results
+
+
+def benchmark_queries(export_dir, repeat=3, threads=None):
+    """Runs each dashboard query `repeat` times against the exported models."""
+    backend = DuckDBBackend(export_dir)
+    if threads:
+        backend.conn.execute(f"SET threads = {int(threads)}")
+    profiler = Profiler(backend.conn)
+    results = []
+    for func in dashboard_queries():
+        name = func.__name__
+        sql, params = queries1.build_query(func)
+        sql, args = to_qmark(to_duckdb_sql(sql), params)
+        schema = queries1.QUERY_SCHEMAS.get(name)
+        runs = []
+        for _ in range(repeat):
+            # Same work as DuckDBBackend.run_query, on the profiled connection
+            df, metrics = profiler.measure(lambda: arrow_to_frame(fetch_duckdb_arrow(backend.conn.execute(sql, args)), schema))
+            runs.append(metrics)
+        results.append(summarize(name, "query", runs, len(df), frame_nbytes(df)))
+        print(f"query  {name:<28} {statistics.median(r['latency_ms'] for r in runs):>10.1f} ms  {len(df):>12,} rows", file=sys.stderr)
+    backend.close()
+    return results
+
+
+# --- Regression check ---
+def compare(report, baseline, tolerance):
+    """Returns a message for every step that got worse than `baseline` by more than `tolerance`."""
+    previous = {(r["kind"], r["name"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["kind"], result["name"]))
+        if before is None:
+            continue
+        label = f"{result['kind']} {result['name']}"
+        if before["rows_scanned"] and result["rows_scanned"] and result["rows_scanned"] > before["rows_scanned"] * (1 + tolerance):
+            regressions.append(f"{label}: rows scanned {before['rows_scanned']:,} -> {result['rows_scanned']:,}")
+        old_ms, new_ms = before["latency_ms"]["median"], result["latency_ms"]["median"]
+        if old_ms >= MIN_COMPARABLE_MS and new_ms > old_ms * (1 + tolerance):
+            regressions.append(f"{label}: median latency {old_ms:.1f} ms -> {new_ms:.1f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=synthetic.SCALES, default="ml-100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default=".bench", help="where raw data and model exports are kept between runs")
+    parser.add_argument("--output", default=None, help="report path (default: <work-dir>/<scale>.json)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per dashboard query")
+    parser.add_argument("--threads", type=int, default=None, help="DuckDB threads (default: all cores)")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing, as a fraction")
+    args = parser.parse_args(argv)
+
+    scale_dir = os.path.join(args.work_dir, f"{args.scale}-seed{args.seed}")
+    raw_dir, export_dir = os.path.join(scale_dir, "raw"), os.path.join(scale_dir, "models")
+
+    start = time.perf_counter()
+    generated = synthetic.generate(args.scale, raw_dir, args.seed)
+    generate_seconds = time.perf_counter() - start
+
+    results = benchmark_models(raw_dir, export_dir, args.threads)
+    results += benchmark_queries(export_dir, args.repeat, args.threads)
+    report = {
+        "scale": args.scale,
+        "seed": args.seed,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "duckdb_version": duckdb.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "generate_seconds": generate_seconds if generated else None,
+        "results": results,
+    }
+    output = args.output or os.path.join(args.work_dir, f"{args.scale}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# benchmarks/startup.py
+
+"""Checks the dashboard's import time and rerun overhead against a budget.
+
+Measures, in fresh interpreters, how long the modules `app1.py` needs before its
+first paint take to import on top of Streamlit, and that none of the heavy
+dependencies the pages load lazily (pandas, Plotly Express, DuckDB, the Snowflake
+connector) come with them. Then drives `app1.py` with Streamlit's `AppTest`
+against the DuckDB backend over the benchmark exports and times the first run
+and warm reruns of every page. Exits non-zero when a budget is exceeded:
+
+    python -m benchmarks.startup --scale ml-100k
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+from benchmarks import synthetic
+from benchmarks.run import benchmark_models
+
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What the entrypoint imports before its first paint
+FIRST_PAINT_MODULES = ["dashboard", "instrumentation", "queries1"]
+# Imported only by the pages and backends that need them
+LAZY_MODULES = ["pandas", "plotly.express", "duckdb", "snowflake.connector", "cryptography.hazmat.primitives.serialization", "backends", "charts"]
+
+IMPORT_PROBE = """
+import json, sys, time
+import streamlit
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - start) * 1000,
+    "eager": [name for name in {lazy!r} if name in sys.modules],
+}}))
+"""
+
+
+# --- Measurements ---
+def measure_imports(repeat=5):
+    """Best-of-`repeat` import time of the first-paint modules, each in a fresh interpreter."""
+    probe = IMPORT_PROBE.format(modules=FIRST_PAINT_MODULES, lazy=LAZY_MODULES)
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=APP_DIR, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(run["import_ms"] for run in runs), sorted({name for run in runs for name in run["eager"]})
+
+
+def page_scripts():
+    return sorted(name for name in os.listdir(os.path.join(APP_DIR, "sections")) if name.endswith(".py"))
+
+
+def measure_reruns(export_dir, repeat=5):
+    """Returns the first run's latency and the median warm rerun latency of every page, in ms."""
+    from streamlit.testing.v1 import AppTest
+
+    scratch = tempfile.mkdtemp(prefix="movielens-startup-")
+    os.environ.update({
+        "MOVIELENS_BACKEND": "duckdb",
+        "MOVIELENS_PARQUET_DIR": os.path.abspath(export_dir),
+        "MOVIELENS_CACHE_DIR": os.path.join(scratch, "results"),
+        "MOVIELENS_SIMILAR_DIR": os.path.join(scratch, "similar_movies"),
+    })
+    app = AppTest.from_file(os.path.join(APP_DIR, "app1.py"), default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first_run_ms = (time.perf_counter() - start) * 1000
+
+    reruns = {}
+    for script in page_scripts():
+        app.switch_page(f"sections/{script}").run()
+        # A second run picks up results that were still loading behind a preview
+        app.run()
+        if app.exception:
+            raise RuntimeError(f"{script}: {app.exception[0].value}")
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.run()
+            runs.append((time.perf_counter() - start) * 1000)
+        reruns[script] = statistics.median(runs)
+    return first_run_ms, reruns
+
+
+# --- Main ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=synthetic.SCALES, default="ml-100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default=".bench", help="where raw data and model exports are kept between runs")
+    parser.add_argument("--repeat", type=int, default=5, help="imports and reruns measured per check")
+    parser.add_argument("--import-budget-ms", type=float, default=150.0, help="import time of the first-paint modules")
+    parser.add_argument("--rerun-budget-ms", type=float, default=250.0, help="median warm rerun of any page")
+    parser.add_argument("--output", default=None, help="also write the measurements to this JSON file")
+    args = parser.parse_args(argv)
+
+    scale_dir = os.path.join(args.work_dir, f"{args.scale}-seed{args.seed}")
+    raw_dir, export_dir = os.path.join(scale_dir, "raw"), os.path.join(scale_dir, "models")
+    if synthetic.generate(args.scale, raw_dir, args.seed) or not os.path.isdir(export_dir):
+        benchmark_models(raw_dir, export_dir)
+
+    import_ms, eager = measure_imports(args.repeat)
+    print(f"import   first-paint modules       {import_ms:>8.1f} ms", file=sys.stderr)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        first_run_ms, reruns = measure_reruns(export_dir, args.repeat)
+    print(f"run      first (cold caches)       {first_run_ms:>8.1f} ms", file=sys.stderr)
+    for script, ms in reruns.items():
+        print(f"rerun    {script:<26} {ms:>8.1f} ms", file=sys.stderr)
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"importing {', '.join(FIRST_PAINT_MODULES)} took {import_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+    if eager:
+        failures.append(f"lazily loaded modules are imported before first paint: {', '.join(eager)}")
+    for script, ms in reruns.items():
+        if ms > args.rerun_budget_ms:
+            failures.append(f"rerunning {script} took {ms:.0f} ms (budget {args.rerun_budget_ms:.0f} ms)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "scale": args.scale,
+                "import_ms": import_ms,
+                "eager_modules": eager,
+                "first_run_ms": first_run_ms,
+                "rerun_ms": reruns,
+                "failures": failures,
+            }, f, indent=2)
+    for message in failures:
+        print(f"OVER BUDGET {message}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# benchmarks/synthetic.py
+
+"""Deterministic synthetic MovieLens data.
+
+Writes one Parquet file per raw table (`raw_ratings.parquet`, ...) with the
+column names the staging models select from `MOVIELENS.RAW`. Row counts follow
+the public datasets; ml-100k and ml-1m ship without tag genome (and ml-1m
+without tags), so those get a proportional genome so every model has input.
+Movie popularity and user activity are long-tailed and ratings depend on a
+per-movie quality, so filters such as `min_ratings` and the hidden-gems median
+behave like they do on the real data. The same scale and seed always produce
+the same files.
+"""
+
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+SCALES = {
+    "ml-100k": {"users": 610, "movies": 9_742, "ratings": 100_836, "tags": 3_683,
+                "genome_movies": 500, "genome_tags": 1_128},
+    "ml-1m": {"users": 6_040, "movies": 3_883, "ratings": 1_000_209, "tags": 10_000,
+              "genome_movies": 3_000, "genome_tags": 1_128},
+    "ml-25m": {"users": 162_541, "movies": 62_423, "ratings": 25_000_095, "tags": 1_093_360,
+               "genome_movies": 13_816, "genome_tags": 1_128},
+}
+
+RAW_TABLES = ["raw_ratings", "raw_movies", "raw_tags", "raw_genome_scores", "raw_genome_tags", "raw_links"]
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary",
+    "Drama", "Fantasy", "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance",
+    "Sci-Fi", "Thriller", "War", "Western",
+]
+
+# Unix timestamps of the first and last ratings in ml-25m
+FIRST_TIMESTAMP = 789_652_009
+LAST_TIMESTAMP = 1_574_327_703
+
+# Rows generated and written per Parquet row group, which bounds memory at ml-25m
+CHUNK_ROWS = 2_000_000
+
+_MARKER = "_generated.json"
+
+
+def _rng(seed, table):
+    # One independent stream per table, so tables do not depend on generation order
+    return np.random.default_rng([seed, RAW_TABLES.index(table)])
+
+
+def _long_tail(rng, n, sigma):
+    weights = rng.lognormal(mean=0.0, sigma=sigma, size=n)
+    return weights / weights.sum()
+
+
+def _write_chunks(path, chunks):
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.table(chunk)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _movies(spec, seed):
+    rng = _rng(seed, "raw_movies")
+    n = spec["movies"]
+    years = rng.integers(1915, 2020, size=n)
+    genre_counts = rng.integers(1, 4, size=n)
+    genre_weights = _long_tail(rng, len(GENRES), 0.8)
+    genres = []
+    for count in genre_counts:
+        if rng.random() < 0.01:
+            genres.append("(no genres listed)")
+        else:
+            picked = rng.choice(len(GENRES), size=count, replace=False, p=genre_weights)
+            genres.append("|".join(GENRES[i] for i in sorted(picked)))
+    yield {
+        "movieId": np.arange(1, n + 1, dtype=np.int32),
+        # Lower-case and padded so INITCAP(TRIM(title)) in dim_movies has work to do
+        "title": [f" synthetic movie {i} ({year}) " for i, year in enumerate(years, start=1)],
+        "genres": genres,
+    }
+
+
+def _ratings(spec, seed):
+    rng = _rng(seed, "raw_ratings")
+    users, movies = spec["users"], spec["movies"]
+    user_weights = _long_tail(rng, users, 1.2)
+    movie_weights = _long_tail(rng, movies, 1.6)
+    movie_quality = rng.normal(3.5, 0.5, size=movies)
+    user_bias = rng.normal(0.0, 0.4, size=users)
+    remaining = spec["ratings"]
+    while remaining:
+        size = min(remaining, CHUNK_ROWS)
+        user_idx = rng.choice(users, size=size, p=user_weights)
+        movie_idx = rng.choice(movies, size=size, p=movie_weights)
+        score = movie_quality[movie_idx] + user_bias[user_idx] + rng.normal(0.0, 0.8, size=size)
+        yield {
+            "userId": (user_idx + 1).astype(np.int32),
+            "movieId": (movie_idx + 1).astype(np.int32),
+            "rating": np.clip(np.round(score * 2) / 2, 0.5, 5.0),
+            "timestamp": rng.integers(FIRST_TIMESTAMP, LAST_TIMESTAMP, size=size),
+        }
+        remaining -= size
+
+
+def _tags(spec, seed):
+    rng = _rng(seed, "raw_tags")
+    n = spec["tags"]
+    vocabulary = np.array([f"tag {i}" for i in range(spec["genome_tags"])])
+    yield {
+        "userId": rng.integers(1, spec["users"] + 1, size=n, dtype=np.int32),
+        "movieId": rng.integers(1, spec["movies"] + 1, size=n, dtype=np.int32),
+        "tag": vocabulary[rng.integers(0, len(vocabulary), size=n)],
+        "timestamp": rng.integers(FIRST_TIMESTAMP, LAST_TIMESTAMP, size=n),
+    }
+
+
+def _genome_tags(spec, seed):
+    n = spec["genome_tags"]
+    yield {
+        "tagId": np.arange(1, n + 1, dtype=np.int32),
+        "tag": [f" genome tag {i} " for i in range(1, n + 1)],
+    }
+
+
+def _genome_scores(spec, seed):
+    rng = _rng(seed, "raw_genome_scores")
+    n_tags = spec["genome_tags"]
+    movie_ids = np.sort(rng.choice(spec["movies"], size=min(spec["genome_movies"], spec["movies"]), replace=False)) + 1
+    block = max(1, CHUNK_ROWS // n_tags)
+    for start in range(0, len(movie_ids), block):
+        ids = movie_ids[start:start + block]
+        yield {
+            "movieId": np.repeat(ids, n_tags).astype(np.int32),
+            "tagId": np.tile(np.arange(1, n_tags + 1, dtype=np.int32), len(ids)),
+            # Mostly low relevance with a few strong tags per movie, like the real genome
+            "relevance": np.round(rng.beta(0.5, 4.0, size=len(ids) * n_tags), 5),
+        }
+
+
+def _links(spec, seed):
+    rng = _rng(seed, "raw_links")
+    n = spec["movies"]
+    # Column names as src_links selects them
+    yield {
+        "movieId": np.arange(1, n + 1, dtype=np.int32),
+        "imdbld": rng.choice(10_000_000, size=n, replace=False).astype(np.int64),
+        "tmdbld": rng.choice(1_000_000, size=n, replace=False).astype(np.int64),
+    }
+
+
+_GENERATORS = {
+    "raw_ratings": _ratings,
+    "raw_movies": _movies,
+    "raw_tags": _tags,
+    "raw_genome_scores": _genome_scores,
+    "raw_genome_tags": _genome_tags,
+    "raw_links": _links,
+}
+
+
+def generate(scale, out_dir, seed=42):
+    """Writes the raw tables for `scale` into `out_dir`, unless they are already there.
+
+    Returns True if files were written.
+    """
+    spec = SCALES[scale]
+    marker = os.path.join(out_dir, _MARKER)
+    manifest = {"scale": scale, "seed": seed, **spec}
+    try:
+        with open(marker, encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                return False
+    except (OSError, ValueError):
+        pass
+    os.makedirs(out_dir, exist_ok=True)
+    for table in RAW_TABLES:
+        _write_chunks(os.path.join(out_dir, f"{table}.parquet"), _GENERATORS[table](spec, seed))
+    # Written last, so an interrupted run is regenerated next time
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="ml-100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("out_dir")
+    args = parser.parse_args()
+    generate(args.scale, args.out_dir, args.seed)
@@ -0,0 +1,99 @@
+# cache_warmer.py
+
+"""Background refresher that keeps every dashboard query warm in the result cache.
+
+The warmer re-runs its registered queries on a fixed interval and as soon as the
+cache's data version changes (e.g. after a dbt run). While a refresh is in flight,
+the cache keeps serving the previous result; the new one replaces it in a single
+`ResultCache.put`, so interactive requests never wait on a cold query.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from result_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    def __init__(self, cache, interval=600, poll_interval=15):
+        self.cache = cache
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self._jobs = {}  # key -> run
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        cache.on_stale = self.refresh
+
+    def register(self, query, run, params=None, schema=None):
+        """Adds a query to the set that is pre-executed on every warm cycle."""
+        key = cache_key(query, params, schema)
+        with self._lock:
+            self._jobs[key] = run
+        return key
+
+    def refresh(self, key, run=None, force=True):
+        """Queues `key` for recomputation; duplicate requests for the same key are ignored.
+
+        With `force=False` the query is skipped if the cache already holds a fresh result.
+        """
+        with self._lock:
+            if run is not None:
+                self._jobs.setdefault(key, run)
+            if key in self._pending or key not in self._jobs:
+                return
+            self._pending.add(key)
+        self._queue.put((key, force))
+
+    def refresh_all(self, force=True):
+        with self._lock:
+            keys = list(self._jobs)
+        for key in keys:
+            self.refresh(key, force=force)
+
+    def start(self):
+        if not self._thread.is_alive():
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _loop(self):
+        last_version = None
+        last_warm = 0.0
+        while not self._stop.is_set():
+            version = self.cache.current_version()
+            if version != last_version:
+                # Startup or new data: fill in whatever is missing or stale
+                last_version = version
+                last_warm = time.monotonic()
+                self.refresh_all(force=False)
+            elif time.monotonic() - last_warm >= self.interval:
+                last_warm = time.monotonic()
+                self.refresh_all()
+            try:
+                key, force = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            self._run(key, force)
+
+    def _run(self, key, force):
+        with self._lock:
+            run = self._jobs.get(key)
+        try:
+            if force or self.cache.get(key) is None:
+                self.cache.put(key, run())
+        except Exception:
+            # Keep serving the previous result; the next cycle will try again
+            logger.exception("Cache refresh failed for %s", key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
@@ -0,0 +1,136 @@
+# charts.py
+
+"""The cache that keeps built figures and table styles between reruns.
+
+Every Streamlit rerun used to rebuild each Plotly figure and table gradient from
+scratch, even when the query result behind it had not changed. `ChartCache`
+keeps built figures and table styles keyed by chart name and a fingerprint of
+the data, so a rerun over unchanged results only serializes them again.
+
+Long series are reduced with LTTB (Largest-Triangle-Three-Buckets) before they
+are plotted and drawn with WebGL traces, and table gradients are looked up from
+a precomputed color table for the displayed rows only. Only `plotly.colors` is
+imported here; the figure builders live with their pages in `sections/`.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.colors
+
+
+# Series longer than this are downsampled with LTTB before plotting
+MAX_POINTS = 2000
+# Line and area charts with more points than this use WebGL (scattergl) traces
+WEBGL_MIN_POINTS = 1000
+
+
+# --- Caching ---
+def frame_fingerprint(df):
+    """Hash of a DataFrame's columns, dtypes, index and values."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr([(col, str(dtype)) for col, dtype in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """LRU of built figures and table styles, shared by all sessions.
+
+    Cached objects are handed to every session as-is and must not be modified
+    after they are built.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, name, df, build):
+        """Returns `build(df)`, building it only if `name` has not been built for this data yet."""
+        key = (name, frame_fingerprint(df))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = build(df)
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+# --- Downsampling ---
+def lttb(x, y, threshold):
+    """Indices of the `threshold` points that keep the shape of (x, y), by Largest-Triangle-Three-Buckets.
+
+    `x` must be sorted. The first and last points are always kept; every bucket
+    in between keeps the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    last = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[last] - avg_x) * (y[start:end] - y[last]) - (x[last] - x[start:end]) * (avg_y - y[last]))
+        last = start + int(np.argmax(area))
+        selected[i + 1] = last
+    return selected
+
+
+def downsample(df, x, y, max_points=MAX_POINTS):
+    """`df` sorted by `x`, reduced to `max_points` rows with LTTB if it is longer."""
+    df = df.sort_values(x)
+    if len(df) <= max_points:
+        return df
+    return df.iloc[lttb(df[x].to_numpy(), df[y].to_numpy(), max_points)]
+
+
+# --- Table gradients ---
+@lru_cache(maxsize=None)
+def _gradient_lut(cmap, size=256):
+    """CSS for `size` evenly spaced colors of the Plotly colorscale `cmap`, with readable text on each."""
+    colors = plotly.colors.sample_colorscale(plotly.colors.get_colorscale(cmap), np.linspace(0, 1, size).tolist(), colortype="tuple")
+    rgb = np.clip(np.array(colors, dtype=np.float64), 0, 1)
+    # Relative luminance, as pandas' background_gradient uses to pick the text color
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    dark = linear @ np.array([0.2126, 0.7152, 0.0722]) < 0.408
+    hexes = ["#{:02x}{:02x}{:02x}".format(*(np.round(c * 255).astype(int))) for c in rgb]
+    return np.array([
+        f"background-color: {color}; color: {'#f1f1f1' if is_dark else '#000000'}"
+        for color, is_dark in zip(hexes, dark)
+    ], dtype=object)
+
+
+def gradient_styles(df, cmap, subset):
+    """Per-cell CSS for the `subset` columns of `df`, shaded like `Styler.background_gradient`.
+
+    Each column is scaled between its own minimum and maximum and mapped onto
+    the colorscale in one vectorized lookup.
+    """
+    lut = _gradient_lut(cmap)
+    styles = pd.DataFrame("", index=df.index, columns=subset, dtype=object)
+    for col in subset:
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+        finite = np.isfinite(values)
+        if not finite.any():
+            continue
+        low, high = values[finite].min(), values[finite].max()
+        scaled = (values - low) / (high - low) if high > low else np.zeros_like(values)
+        index = np.clip(np.nan_to_num(scaled) * (len(lut) - 1), 0, len(lut) - 1).round().astype(np.int64)
+        styles[col] = np.where(finite, lut[index], "")
+    return styles
@@ -0,0 +1,165 @@
+# connection_pool.py
+
+"""Bounded, thread-safe pool of DB-API connections.
+
+Each query checks a connection out for its own duration, so concurrent sessions
+no longer serialize on one shared connection. Idle connections are health-checked
+before reuse and optionally pinged in the background to keep their sessions alive;
+sessions that expired anyway are replaced transparently.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Snowflake error numbers for sessions that can no longer be used:
+# session gone, master token expired, session token expired.
+EXPIRED_SESSION_ERRNOS = {390111, 390112, 390114}
+
+
+def is_expired_session(exc):
+    return getattr(exc, "errno", None) in EXPIRED_SESSION_ERRNOS
+
+
+def ping(conn):
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1")
+        cur.fetchall()
+    finally:
+        cur.close()
+
+
+class ConnectionPool:
+    """Hands out at most `size` connections created by `connect()`.
+
+    Connections idle for longer than `check_after` seconds are pinged before being
+    handed out. With `keepalive_interval` set, a background thread also pings idle
+    connections on that schedule so their sessions do not time out. A connection
+    that raised anything but one of `query_errors` (errors in the query itself,
+    such as the driver's `ProgrammingError`) is closed rather than reused. Waiting
+    longer than `checkout_timeout` seconds for a free connection raises TimeoutError.
+    """
+
+    def __init__(self, connect, size=4, check_after=60, keepalive_interval=None, health_check=ping, query_errors=(), checkout_timeout=30):
+        self.connect = connect
+        self.size = size
+        self.check_after = check_after
+        self.health_check = health_check
+        self.query_errors = query_errors
+        self.checkout_timeout = checkout_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []  # (conn, last_used), most recently used last
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        if keepalive_interval:
+            threading.Thread(target=self._keepalive, args=(keepalive_interval,), name="pool-keepalive", daemon=True).start()
+
+    @contextmanager
+    def connection(self):
+        """Checks a connection out for the duration of the `with` block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception as e:
+            if is_expired_session(e):
+                # Idle connections share the same token age, so drop them too
+                self.discard(conn)
+                self._drop_idle()
+                conn = None
+            elif not isinstance(e, self.query_errors):
+                # A reset network, cancelled session or the like may have left it unusable
+                self.discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.release(conn)
+
+    def run(self, fn):
+        """Calls `fn(conn)`, retrying once on a new connection if the session had expired."""
+        try:
+            with self.connection() as conn:
+                return fn(conn)
+        except Exception as e:
+            if not is_expired_session(e):
+                raise
+            logger.info("Snowflake session expired; reconnecting")
+            with self.connection() as conn:
+                return fn(conn)
+
+    def acquire(self):
+        if self._closed.is_set():
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise TimeoutError(f"No pooled connection became free within {self.checkout_timeout} s (pool size {self.size})")
+        try:
+            return self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+        self._slots.release()
+
+    def discard(self, conn):
+        """Closes a checked-out connection instead of returning it to the pool."""
+        self._close_quietly(conn)
+        self._slots.release()
+
+    def close(self):
+        self._closed.set()
+        self._drop_idle()
+
+    def _drop_idle(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.check_after or self._healthy(conn):
+                return conn
+            self._close_quietly(conn)
+        return self.connect()
+
+    def _healthy(self, conn):
+        try:
+            self.health_check(conn)
+            return True
+        except Exception:
+            return False
+
+    def _keepalive(self, interval):
+        while not self._closed.wait(interval):
+            with self._lock:
+                idle, self._idle = self._idle, []
+            alive = []
+            for conn, _ in idle:
+                if self._healthy(conn):
+                    alive.append((conn, time.monotonic()))
+                else:
+                    self._close_quietly(conn)
+            with self._lock:
+                # Connections opened while these were being pinged may push the idle list over size
+                self._idle = alive + self._idle
+                surplus, self._idle = self._idle[:-self.size], self._idle[-self.size:]
+            for conn, _ in surplus:
+                self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
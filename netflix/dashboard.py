@@ -0,0 +1,438 @@
+# dashboard.py
+
+"""Shared services and building blocks of the dashboard pages.
+
+`app1.py` draws the page shell and runs one script from `sections/` per page;
+both reach the query backend, caches and executor through this module. The
+services are created on first use rather than at import, so the shell paints
+before the warehouse connection is opened, and heavy dependencies (pandas,
+Plotly, DuckDB, the Snowflake connector) are imported only by the code that
+needs them.
+"""
+
+import os
+from concurrent.futures import wait
+
+import streamlit as st
+
+from instrumentation import tracer
+from queries1 import APPROXIMATE_QUERIES, QUERY_SCHEMAS, SECTION_EXPORTS, SECTION_QUERIES, build_query, genre_options, tag_query, year_range
+
+
+# --- Query Backend ---
+@st.cache_resource
+def get_backend():
+    """Creates the query backend: Snowflake by default, DuckDB over local Parquet exports on request or as a fallback.
+
+    `MOVIELENS_BACKEND=columnar` answers the rating queries from the in-process ratings store instead.
+    """
+    from backends import create_backend
+
+    kind = os.getenv("MOVIELENS_BACKEND", "snowflake").lower()
+    if kind == "snowflake":
+        try:
+            # Credentials and the encrypted private key live in Streamlit secrets
+            return create_backend("snowflake", {
+                "user": st.secrets.snowflake.user,
+                "account": st.secrets.snowflake.account,
+                "warehouse": st.secrets.snowflake.warehouse,
+                "database": st.secrets.snowflake.database,
+                "schema": st.secrets.snowflake.schema,
+                "private_key": st.secrets.snowflake.private_key,
+                "private_key_passphrase": st.secrets.snowflake.private_key_passphrase,
+                "pool_size": int(os.getenv("MOVIELENS_POOL_SIZE", "4")),
+            })
+        except Exception as e:
+            st.error(f"❄️ Snowflake connection failed. Please check your credentials and network. Error: {e}")
+            if not os.getenv("MOVIELENS_PARQUET_DIR"):
+                return None
+            st.info("🦆 Falling back to the local DuckDB backend over Parquet exports.")
+    local = "columnar" if kind == "columnar" else "duckdb"
+    try:
+        return create_backend(local)
+    except Exception as e:
+        st.error(f"🦆 Local {local} backend could not be started. Error: {e}")
+        return None
+
+
+def backend():
+    """The query backend, connected on first use; stops the page if none could be started."""
+    backend = get_backend()
+    if backend is None:
+        st.stop()
+    return backend
+
+
+# --- Result Cache ---
+@st.cache_resource
+def get_result_cache():
+    """Memory + on-disk Parquet cache, invalidated when dbt runs or the backend's tables change."""
+    from result_cache import ResultCache, dbt_run_version
+
+    query_backend = backend()
+    target_dir = os.getenv("MOVIELENS_DBT_TARGET_DIR", os.path.join(os.path.dirname(__file__), "target"))
+    return ResultCache(
+        max_bytes=int(os.getenv("MOVIELENS_CACHE_MAX_MB", "256")) * 1024 * 1024,
+        disk_dir=os.getenv("MOVIELENS_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "results")),
+        disk_max_bytes=int(os.getenv("MOVIELENS_CACHE_DISK_MB", "1024")) * 1024 * 1024,
+        version_fn=lambda: (dbt_run_version(target_dir), query_backend.data_version())
+    )
+
+
+def fetch(query, schema=None, params=None):
+    query_backend = backend()
+    return lambda: query_backend.run_query(query, schema, params)
+
+
+def query_spec(query_func, filters=None, approximate=False):
+    """Returns `(query, schema, params)` for `query_func` under the sidebar `filters` (defaults if None)."""
+    query, params = build_query(query_func, approximate=approximate, **(filters or {}))
+    return query, QUERY_SCHEMAS.get(query_func.__name__), params
+
+
+# --- Cache Warmer ---
+@st.cache_resource
+def get_cache_warmer():
+    """Keeps every section's queries warm and refreshes stale results in the background."""
+    from cache_warmer import CacheWarmer
+
+    warmer = CacheWarmer(get_result_cache(), interval=int(os.getenv("MOVIELENS_WARM_INTERVAL", "600")))
+    for query_funcs in SECTION_QUERIES.values():
+        for query_func in query_funcs:
+            query, schema, params = query_spec(query_func)
+            warmer.register(query, fetch(query, schema, params), params=params, schema=schema)
+    return warmer.start()
+
+
+# --- Query Executor ---
+@st.cache_resource
+def get_executor():
+    """Runs independent queries concurrently and shares in-flight queries between sessions."""
+    from executor import QueryExecutor
+
+    return QueryExecutor(backend(), get_result_cache())
+
+
+# --- Chart Cache ---
+@st.cache_resource
+def get_chart_cache():
+    """Built figures and table styles by data fingerprint, so reruns over unchanged results skip rebuilding them."""
+    from charts import ChartCache
+
+    return ChartCache(max_entries=int(os.getenv("MOVIELENS_CHART_CACHE_ENTRIES", "128")))
+
+
+# --- Data Fetching ---
+def run_queries(specs, section):
+    """Runs `(query, schema, params)` specs concurrently; a failed query comes back as an empty DataFrame."""
+    return collect_frames(specs, get_executor().run_all(specs), section)
+
+
+def collect_frames(specs, futures, section):
+    import pandas as pd
+
+    frames = []
+    for (query, *_), future in zip(specs, futures):
+        try:
+            with tracer.span("wait"):
+                frames.append(future.result())
+        except Exception as e:
+            st.error(f"❌ Query execution failed for the '{section}' section.")
+            st.code(query, language="sql")
+            st.error(f"Error details: {e}")
+            frames.append(pd.DataFrame())
+    return frames
+
+
+def run_query(query, schema=None, params=None, section=None):
+    return run_queries([(query, schema, params)], section)[0]
+
+
+# --- Fast Preview ---
+PREVIEW_BUDGET = float(os.getenv("MOVIELENS_PREVIEW_BUDGET", "0.5"))
+
+def run_section(query_funcs, filters, section, preview=True):
+    """Runs a section's queries and returns `(frames, pending)`.
+
+    With `preview` on, queries that have an approximate version and are not back
+    within PREVIEW_BUDGET seconds are answered by that version instead. `pending`
+    holds the exact futures still running, so the page can re-render once they land.
+    A query is previewed at most once in a row: the re-render waits for its exact
+    result even if that missed the cache, so refinement can never loop.
+    """
+    from result_cache import cache_key
+
+    executor = get_executor()
+    specs = [query_spec(query_func, filters) for query_func in query_funcs]
+    futures = executor.run_all(specs)
+    pending = []
+    if preview:
+        wait(futures, timeout=PREVIEW_BUDGET)
+        refining = st.session_state.setdefault("refining", set())
+        for i, query_func in enumerate(query_funcs):
+            query, schema, params = specs[i]
+            key = cache_key(query, params, schema)
+            if key in refining:
+                # This run is its refinement
+                refining.discard(key)
+                continue
+            if not futures[i].done() and query_func.__name__ in APPROXIMATE_QUERIES:
+                refining.add(key)
+                pending.append(futures[i])
+                specs[i] = query_spec(query_func, filters, approximate=True)
+                futures[i] = executor.submit(*specs[i])
+    return collect_frames(specs, futures, section), pending
+
+
+def section_frames(section):
+    """Runs `section`'s queries under the sidebar filters; returns its frames, or None if the first came back empty.
+
+    Exact queries still running behind an approximate preview are left in
+    session state, for the app to redraw the page once they are cached.
+    """
+    frames, pending = run_section(SECTION_QUERIES[section], st.session_state.get("filters"), section, preview=st.session_state.get("fast_preview", True))
+    st.session_state["pending"] = pending
+    if pending:
+        st.markdown('<span class="approx-badge">≈ Approximate preview · exact results are loading</span>', unsafe_allow_html=True)
+    if frames[0].empty:
+        st.warning(f"The query for the '{section}' section ran successfully but returned no data. Your dashboard appears empty because there's nothing to display. Please check your data source or the query logic in `queries.py`.")
+        return None
+    return frames
+
+
+def is_preview():
+    """Whether the page is being drawn from approximate results."""
+    return bool(st.session_state.get("pending"))
+
+
+# --- Sidebar Filters ---
+def sidebar_filters(section):
+    """Draws the filter widgets and returns them as bind parameters; queries ignore the filters they do not declare."""
+    with st.expander("🎛️ Filters", expanded=False):
+        st.caption("Applied to Top Rated Movies and Rating Trends.")
+        genres_df, years_df = run_queries([query_spec(genre_options), query_spec(year_range)], section)
+        filters = {
+            "min_ratings": st.number_input("Minimum ratings per movie", min_value=0, value=100, step=25, key="filter_min_ratings"),
+        }
+        genres = ["All genres"] + (genres_df["genre"].tolist() if not genres_df.empty else [])
+        genre = st.selectbox("Genre", genres, key="filter_genre")
+        filters["genre"] = None if genre == "All genres" else genre
+        if not years_df.empty and years_df.at[0, "first_year"] < years_df.at[0, "last_year"]:
+            first_year, last_year = int(years_df.at[0, "first_year"]), int(years_df.at[0, "last_year"])
+            year_from, year_to = st.slider("Rating years", first_year, last_year, (first_year, last_year), key="filter_years")
+            # The full range needs no year filter, which keeps queries on the all-time marts
+            filters["year_from"] = year_from if year_from > first_year else None
+            filters["year_to"] = year_to if year_to < last_year else None
+    return filters
+
+
+# --- Animated Metrics ---
+METRIC_CSS = """
+    .metric-container {
+        background-color: rgba(255, 255, 255, 0.05);
+        border: 1px solid rgba(255, 255, 255, 0.15);
+        border-radius: 12px;
+        padding: 1.5rem 1rem;
+        text-align: center;
+    }
+    .metric-label {
+        font-size: 1.1rem;
+        color: #A0A0B0;
+        margin-bottom: 0.5rem;
+    }
+    .metric-value {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #FFFFFF;
+    }
+"""
+
+METRICS_TEMPLATE = """
+<style>
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700&display=swap');
+
+    body {
+        margin: 0;
+        font-family: 'Inter', sans-serif;
+    }
+    .metric-row {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));
+        gap: 1rem;
+    }
+METRIC_CSS</style>
+<div class="metric-row">METRIC_CARDS</div>
+<script>
+    // Count every metric up from zero in about a second, then settle on the exact value
+    const duration = 1000;
+    const start = performance.now();
+    const values = Array.from(document.querySelectorAll(".metric-value"));
+    function step(now) {
+        const progress = Math.min((now - start) / duration, 1);
+        for (const el of values) {
+            el.textContent = Math.floor(Number(el.dataset.target) * progress).toLocaleString("en-US");
+        }
+        if (progress < 1) requestAnimationFrame(step);
+    }
+    requestAnimationFrame(step);
+</script>
+"""
+
+def animated_metrics(metrics, height=170):
+    """Renders `(label, value)` metric cards that count up client-side from only the final numbers."""
+    cards = "".join(
+        f'<div class="metric-container"><div class="metric-label">{label}</div>'
+        f'<div class="metric-value" data-target="{int(value)}">{int(value):,}</div></div>'
+        for label, value in metrics
+    )
+    html = METRICS_TEMPLATE.replace("METRIC_CSS", METRIC_CSS).replace("METRIC_CARDS", cards)
+    with tracer.span("chart", chart="animated_metrics"):
+        st.iframe(html, height=height)
+
+
+# --- Charts & Tables ---
+def plotly_chart(name, df, build):
+    """Draws the figure `build(df)`, reusing the one built for the same data on an earlier rerun."""
+    with tracer.span("chart", chart=name):
+        st.plotly_chart(get_chart_cache().get_or_build(name, df, build), width="stretch")
+
+
+# Helper function to display styled dataframes
+def display_styled_dataframe(df, cmap, subset, formatter=None):
+    with tracer.span("table", rows=len(df)):
+        _display_styled_dataframe(df, cmap, subset, formatter)
+
+
+def _display_styled_dataframe(df, cmap, subset, formatter=None):
+    from charts import gradient_styles
+
+    try:
+        # Gradient colors come from a lookup table rather than matplotlib, cached per displayed rows
+        styles = get_chart_cache().get_or_build(f"gradient:{cmap}:{','.join(subset)}", df, lambda df: gradient_styles(df, cmap, subset))
+        styler = df.style
+        if formatter:
+            styler = styler.format(formatter)
+        styler = styler.apply(lambda _: styles, axis=None, subset=subset)
+        st.dataframe(styler, width="stretch")
+    except Exception as e:
+        st.warning(f"Could not apply table styling. Displaying raw data. Error: {e}")
+        st.dataframe(df, width="stretch")
+
+
+# --- Paginated Tables ---
+PAGE_SIZE = 50
+
+def page_spec(page_func, after=None):
+    """Returns `(query, schema, params)` for the keyset page of `page_func` after `after`."""
+    return tag_query(page_func.__name__, page_func(PAGE_SIZE, after)), QUERY_SCHEMAS.get(page_func.__name__), after
+
+
+def fetch_page(page_func, after=None):
+    """Fetches one keyset page of `page_func`; each page is cached under its own cursor."""
+    import pandas as pd
+
+    try:
+        return get_executor().submit(*page_spec(page_func, after)).result()
+    except Exception as e:
+        st.error(f"❌ Could not load the page. Error details: {e}")
+        return pd.DataFrame()
+
+
+@st.fragment
+def paginated_table(page_func, keyset, cmap, subset, formatter=None):
+    """Shows the rows of `page_func` one page at a time instead of the whole table.
+
+    The cursors of the pages visited so far are kept as a stack in session state,
+    so going back pops to a page that is already cached. The next page is
+    prefetched in the background while the current one is displayed. Paging
+    reruns only this table, not the charts around it.
+    """
+    state_key = f"{page_func.__name__}_cursors"
+    cursors = st.session_state.setdefault(state_key, [None])
+    df = fetch_page(page_func, cursors[-1])
+    page = df.head(PAGE_SIZE)
+    next_cursor = page[keyset].iloc[[-1]].to_dict("records")[0] if len(df) > PAGE_SIZE else None
+    if next_cursor is not None:
+        # The same spec `fetch_page` builds, so the next page is a cache hit
+        get_executor().submit(*page_spec(page_func, next_cursor))
+
+    display_styled_dataframe(page, cmap, subset, formatter)
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        # Callbacks move the cursor before the rerun, so the click needs no second rerun
+        st.button("◀ Previous", key=f"{state_key}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with col_page:
+        st.caption(f"Page {len(cursors)} · {PAGE_SIZE} rows per page")
+    with col_next:
+        st.button("Next ▶", key=f"{state_key}_next", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
+
+
+# --- Exports ---
+EXPORT_MAX_ROWS = int(os.getenv("MOVIELENS_EXPORT_MAX_ROWS", "1000000"))
+# Without serve.py's streaming route Streamlit serves a download from memory, so this bounds what each export holds
+EXPORT_MAX_MB = int(os.getenv("MOVIELENS_EXPORT_MAX_MB", "100"))
+
+def export_panel(section, filters):
+    """Download links for the full results behind `section`, read from the cursor only when one is followed.
+
+    Under serve.py they stream from its `/export/<token>` route; otherwise the
+    download button builds the whole file first, capped in size.
+    """
+    from exports import EXPORT_FORMATS, export_bytes, links
+
+    exports = SECTION_EXPORTS.get(section)
+    if not exports:
+        return
+    query_backend = backend()
+    streamed = links.served
+    with st.expander("📥 Export full results", expanded=False):
+        if streamed:
+            st.caption(f"Exports stream as they are read and stop after {EXPORT_MAX_ROWS:,} rows.")
+        else:
+            st.caption(
+                f"Exports are capped at {EXPORT_MAX_ROWS:,} rows or about {EXPORT_MAX_MB} MB, whichever comes first; "
+                "larger results are cut off there. The download starts once the file is complete. "
+                "Run `streamlit run serve.py` to stream exports instead."
+            )
+        for label, query_func in exports:
+            query, params = build_query(query_func, **(filters or {}))
+            columns = st.columns([2] + [1] * len(EXPORT_FORMATS))
+            columns[0].markdown(f"**{label}**")
+            for column, (fmt, (extension, mime)) in zip(columns[1:], EXPORT_FORMATS.items()):
+                open_batches = lambda query=query, params=params: query_backend.iter_batches(query, params)
+                if streamed:
+                    token = links.register(
+                        (query, repr(sorted((params or {}).items())), fmt), query_func.__name__, fmt, open_batches, EXPORT_MAX_ROWS
+                    )
+                    column.link_button(fmt.upper(), f"/export/{token}", width="stretch")
+                    continue
+                # Runs on its own thread only when clicked, not on every rerun
+                column.download_button(
+                    fmt.upper(),
+                    data=lambda open_batches=open_batches, fmt=fmt: export_bytes(open_batches(), fmt, EXPORT_MAX_ROWS, EXPORT_MAX_MB * 1024 * 1024),
+                    file_name=f"{query_func.__name__}.{extension}",
+                    mime=mime,
+                    key=f"export_{query_func.__name__}_{fmt}",
+                    on_click="ignore"
+                )
+
+
+# --- Query Debug Panel ---
+DEBUG_COLUMNS = ["name", "duration_ms", "cache", "rows", "bytes", "query_id", "chart", "key"]
+
+def render_debug_panel(trace):
+    """Shows the spans of this script run in the sidebar (only when MOVIELENS_TRACE is set)."""
+    import pandas as pd
+
+    spans = pd.DataFrame([span.to_dict() for span in tracer.spans(trace.trace_id)])
+    with st.expander("🔍 Query Debug", expanded=False):
+        st.metric("Page time", f"{trace.duration_ms:,.0f} ms")
+        if spans.empty:
+            st.caption("No spans recorded.")
+            return
+        by_stage = spans[spans["name"] != "page"].groupby("name")["duration_ms"].agg(["count", "sum"])
+        st.dataframe(by_stage.rename(columns={"sum": "total_ms"}), width="stretch")
+        columns = [col for col in DEBUG_COLUMNS if col in spans.columns]
+        st.dataframe(spans[columns], width="stretch", hide_index=True)
+        if tracer.log_path:
+            st.caption(f"Spans are also written to `{tracer.log_path}`.")
@@ -0,0 +1,89 @@
+# executor.py
+
+"""Concurrent, cache-aware query execution for the dashboard pages."""
+
+import logging
+import threading
+from concurrent.futures import Future
+
+from instrumentation import tracer
+from result_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def _done(df):
+    future = Future()
+    future.set_result(df)
+    return future
+
+
+class QueryExecutor:
+    """Submits independent queries concurrently through the backend and the result cache.
+
+    Cached results come back as already-completed futures. Misses are started with
+    `backend.submit` (Snowflake `execute_async`, or a thread pool locally), and
+    identical queries that are already in flight share one future.
+    """
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    def submit(self, query, schema=None, params=None):
+        """Returns a Future of the result of `query`; each set of `params` is cached separately."""
+        key = cache_key(query, params, schema)
+        with tracer.span("query", key=key[:12]) as span:
+            df, fresh = self.cache.lookup(key)
+            if df is not None:
+                span.set(cache="hit" if fresh else "stale", rows=len(df))
+                if not fresh:
+                    self.cache.on_stale(key, lambda: self.backend.run_query(query, schema, params))
+                return _done(df)
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is not None:
+                    span.set(cache="inflight")
+                    return future
+                span.set(cache="miss")
+                # Registered first, so identical queries share it while this one starts
+                future = Future()
+                self._inflight[key] = future
+            # Outside the lock, so a backend that is slow to accept the query never
+            # holds up other sessions; inside the span, so its spans become children
+            try:
+                started = self.backend.submit(query, schema, params)
+            except Exception as e:
+                started = Future()
+                started.set_exception(e)
+        # The callback runs immediately if the query already finished
+        started.add_done_callback(lambda f: self._store(key, future, f))
+        return future
+
+    def run_all(self, specs):
+        """Runs `(query, schema[, params])` specs concurrently and returns their futures in order.
+
+        Total latency is that of the slowest query rather than the sum.
+        """
+        return [self.submit(*spec) for spec in specs]
+
+    def prefetch(self, specs):
+        """Starts `(query, schema[, params])` specs in the background so a later page load is a cache hit."""
+        self.run_all(specs)
+
+    def _store(self, key, future, started):
+        # Cached before the in-flight entry goes and the waiters wake up, so a
+        # lookup for the same query right after it lands is a hit
+        if started.exception() is None:
+            try:
+                self.cache.put(key, started.result())
+            except Exception:
+                logger.exception("Could not cache the result of %s", key)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if started.exception() is not None:
+            future.set_exception(started.exception())
+        else:
+            future.set_result(started.result())
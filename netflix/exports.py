@@ -0,0 +1,167 @@
+# exports.py
+
+"""Streaming CSV and Parquet exports of whole query results.
+
+`export_chunks` encodes the record batches a backend's `iter_batches` reads
+from the cursor, one batch at a time, and yields the encoded bytes as soon as
+each batch is written. The result is never built as a DataFrame, so memory
+stays at about one batch however large the result is, and a row or byte cap
+stops the export (and the cursor behind it) early.
+
+Served by `serve.py`, an export streams straight to the browser: the page
+registers it in `links` and links to `/export/<token>`, whose route sends
+`export_chunks` as the response body. Under a plain `streamlit run app1.py`
+there is no such route, and `export_bytes` hands Streamlit's download button
+the finished file instead.
+"""
+
+import io
+import secrets
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from instrumentation import tracer
+
+
+# Format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that collects what the writers write until it is taken."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(fmt, sink, schema):
+    if fmt == "csv":
+        return pa_csv.CSVWriter(sink, schema)
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    raise ValueError(f"Unknown export format '{fmt}'")
+
+
+def export_chunks(batches, fmt, max_rows=None, max_bytes=None):
+    """Encodes Arrow record `batches` as `fmt` ("csv" or "parquet"), yielding the bytes of each batch.
+
+    Stops after `max_rows` rows, or at about `max_bytes` of output (the last batch
+    is cut to the rows expected to fit), and closes `batches` then, which releases
+    the cursor behind them.
+    Parquet gets one row group per batch and its footer in the last chunk. If
+    `batches` yields nothing at all, the file is empty.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    sink = _ChunkSink()
+    writer = None
+    rows = 0
+    written = 0
+    truncated = False
+    # Not entered as a context: the generator may be resumed from another context
+    span = tracer.span("export", format=fmt)
+    try:
+        try:
+            for batch in batches:
+                limit = batch.num_rows
+                if max_rows is not None:
+                    limit = min(limit, max_rows - rows)
+                if max_bytes is not None and written:
+                    # Sized by the bytes per row so far, so the file ends near the cap rather than a batch past it
+                    limit = min(limit, int((max_bytes - written) * rows / written))
+                if limit < batch.num_rows:
+                    truncated = True
+                    batch = batch.slice(0, max(limit, 0))
+                if writer is None:
+                    writer = _open_writer(fmt, sink, batch.schema)
+                if batch.num_rows:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+                chunk = sink.take()
+                written += len(chunk)
+                if chunk:
+                    yield chunk
+                if truncated or (max_rows is not None and rows >= max_rows) or (max_bytes is not None and written >= max_bytes):
+                    truncated = True
+                    break
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+        if writer is not None:
+            writer.close()
+            yield sink.take()
+    finally:
+        span.set(rows=rows, bytes=written, truncated=truncated)
+        span.end()
+
+
+def export_bytes(batches, fmt, max_rows=None, max_bytes=None):
+    """Runs `export_chunks` through a temporary file on disk and returns the finished file's bytes.
+
+    For callers that need the whole file at once, such as Streamlit's download
+    button: only the encoded file is ever held in memory, never the result, so
+    `max_bytes` bounds the memory an export takes.
+    """
+    with tempfile.TemporaryFile() as f:
+        for chunk in export_chunks(batches, fmt, max_rows, max_bytes):
+            f.write(chunk)
+        f.seek(0)
+        return f.read()
+
+
+class ExportLinks:
+    """Exports the pages have offered, by unguessable token, for the streaming route to serve.
+
+    The same export gets the same token on every rerun. Only the most recent
+    `max_links` exports are kept; older links answer 404.
+    """
+
+    def __init__(self, max_links=1024):
+        self.max_links = max_links
+        # Set by serve.py when the route that serves the links is mounted
+        self.served = False
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self._exports = {}
+
+    def register(self, key, filename, fmt, open_batches, max_rows=None):
+        """Offers an export; returns its token. `open_batches()` starts the query's `iter_batches`."""
+        with self._lock:
+            token = self._tokens.get(key) or secrets.token_urlsafe(16)
+            self._tokens[key] = token
+            self._tokens.move_to_end(key)
+            self._exports[token] = (filename, fmt, open_batches, max_rows)
+            while len(self._tokens) > self.max_links:
+                _, old = self._tokens.popitem(last=False)
+                self._exports.pop(old, None)
+            return token
+
+    def get(self, token):
+        """`(filename, fmt, open_batches, max_rows)` of the export behind `token`, or None."""
+        with self._lock:
+            return self._exports.get(token)
+
+
+# Shared by the pages and serve.py's route, which run in the same process
+links = ExportLinks()
@@ -0,0 +1,159 @@
+# instrumentation.py
+
+"""Timing spans for query execution and page rendering.
+
+Spans record how long each stage took (execute, fetch, frame build, chart build)
+together with attributes such as row counts, approximate bytes, the Snowflake
+query ID and cache hits. Finished spans are kept in a small in-memory buffer for
+the dashboard's debug panel and, optionally, appended to a JSON-lines log.
+
+Tracing is off unless `MOVIELENS_TRACE` is set. While it is off, `span()` hands
+back a shared no-op span, so instrumented code pays one call per stage.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+
+_current = contextvars.ContextVar("movielens_span", default=None)
+
+
+def _new_id():
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """One timed stage of a trace."""
+
+    __slots__ = ("tracer", "name", "attrs", "trace_id", "span_id", "parent_id", "started_at", "_start", "duration_ms", "_token")
+
+    def __init__(self, tracer, name, attrs, parent):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = parent.trace_id if parent else _new_id()
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = _new_id()
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._start) * 1000
+            self.tracer._record(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            **self.attrs,
+        }
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.attrs["error"] = repr(exc)
+        _current.reset(self._token)
+        self.end()
+
+
+class _NullSpan:
+    """Stands in for every span while tracing is disabled. Falsy, so callers can skip computing attributes."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def end(self):
+        pass
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Creates spans and collects the finished ones.
+
+    Child spans inherit the trace of the span that is current in their context;
+    `QueryBackend` copies that context into its worker threads, so backend spans
+    land in the trace of the page that submitted the query.
+    """
+
+    def __init__(self, enabled=False, log_path=None, max_spans=2000):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._log = None
+
+    def span(self, name, **attrs):
+        """Starts a span, a child of the current span if there is one.
+
+        Use it as a context manager, or call `end()` on it from whichever thread
+        sees the stage finish.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attrs, _current.get())
+
+    def start_trace(self, name, **attrs):
+        """Starts a new trace and makes its root span current for the rest of this context.
+
+        Meant for the top of a Streamlit script run; the next run replaces it.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        span = Span(self, name, attrs, None)
+        _current.set(span)
+        return span
+
+    def spans(self, trace_id=None):
+        """Returns finished spans, oldest first, optionally only those of one trace."""
+        with self._lock:
+            spans = list(self._spans)
+        return [s for s in spans if trace_id is None or s.trace_id == trace_id]
+
+    def _record(self, span):
+        line = json.dumps(span.to_dict(), default=str) if self.log_path else None
+        with self._lock:
+            self._spans.append(span)
+            if line is not None:
+                if self._log is None:
+                    self._log = open(self.log_path, "a", encoding="utf-8")
+                self._log.write(line + "\n")
+                self._log.flush()
+
+
+def _from_env():
+    enabled = os.getenv("MOVIELENS_TRACE", "").lower() in ("1", "true", "yes")
+    return Tracer(enabled=enabled, log_path=os.getenv("MOVIELENS_TRACE_LOG") if enabled else None)
+
+
+tracer = _from_env()
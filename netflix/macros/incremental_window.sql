@@ -0,0 +1,25 @@
+{% macro incremental_window(column) %}
+    {#-
+        Predicate selecting the rows an incremental model has to (re)process.
+
+        * With --vars '{backfill_start: ..., backfill_end: ...}' it selects that
+          half-open range, so a date range can be reloaded without --full-refresh.
+        * On a normal incremental run it selects everything from the current
+          high-water mark minus `lookback_days` (default 3), so late-arriving
+          rows with older timestamps are still picked up.
+        * On a full build it selects everything.
+    -#}
+    {%- set backfill_start = var('backfill_start', none) -%}
+    {%- set backfill_end = var('backfill_end', none) -%}
+    {%- if backfill_start and backfill_end -%}
+        {{ column }} >= '{{ backfill_start }}'::TIMESTAMP_LTZ
+        AND {{ column }} < '{{ backfill_end }}'::TIMESTAMP_LTZ
+    {%- elif is_incremental() -%}
+        {{ column }} >= (
+            SELECT DATEADD(day, -{{ var('lookback_days', 3) }}, MAX({{ column }}))
+            FROM {{ this }}
+        )
+    {%- else -%}
+        TRUE
+    {%- endif -%}
+{% endmacro %}
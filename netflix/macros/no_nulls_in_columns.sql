@@ -1,7 +0,0 @@
-{% macro no_nulls_in_columns(model) %}
-    SELECT * FROM {{ model }} WHERE
-    {% for col in adapter.get_columns_in_relation(model) %}
-        {{ col.column }} IS NULL OR
-    {% endfor %}
-    FALSE
-{% endmacro %}
\ No newline at end of file
@@ -0,0 +1,62 @@
+{% macro profile_columns(model, checks={}, nullable=[], incremental_column=none, sample_percent=none) %}
+    {#-
+        Profiles every column of `model` in a single aggregate scan and returns the
+        profile row only if something is wrong, so it can back a singular test.
+
+        Per column it computes the null count, an approximate distinct count and,
+        for numeric and date/time columns, the min and max. The test fails when a
+        column outside `nullable` has nulls or when any row violates one of
+        `checks` ({column: condition}, e.g. {'relevance_score': 'relevance_score > 0'}).
+
+        * `incremental_column`: only profile the latest load, i.e. the rows where
+          this column equals its maximum. Incremental models stamp every row of a
+          run with the same value, so that is the batch of the last `dbt run`,
+          whether the test runs in the same `dbt build` or on its own afterwards.
+          Pass --vars '{profile_since: "2024-01-01"}' to profile from that time
+          on, or --vars '{profile_full: true}' to scan everything. The test also
+          fails when the window holds no rows (unless sampling), so it never passes
+          unchecked.
+        * `sample_percent`: profile a Bernoulli sample instead of every row.
+    -#}
+    {%- set columns = adapter.get_columns_in_relation(model) -%}
+    {%- set nullable = nullable | map('upper') | list -%}
+    {%- set failures = [] -%}
+    {%- set windowed = incremental_column and not var('profile_full', false) -%}
+    {%- if windowed and not sample_percent %}{% do failures.append('row_count = 0') %}{% endif -%}
+
+    WITH profile AS (
+        SELECT
+            COUNT(*) AS row_count
+            {%- for col in columns %}
+            {%- set name = col.column %}
+            , COUNT(*) - COUNT({{ name }}) AS {{ name }}__nulls
+            {%- if col.data_type | upper not in ['ARRAY', 'OBJECT', 'VARIANT'] %}
+            , APPROX_COUNT_DISTINCT({{ name }}) AS {{ name }}__distinct
+            {%- endif %}
+            {%- if col.is_numeric() or col.is_float() or col.is_integer() or 'DATE' in col.data_type | upper or 'TIME' in col.data_type | upper %}
+            , MIN({{ name }}) AS {{ name }}__min
+            , MAX({{ name }}) AS {{ name }}__max
+            {%- endif %}
+            {%- if name | upper not in nullable %}
+            {%- do failures.append(name ~ '__nulls > 0') %}
+            {%- endif %}
+            {%- endfor %}
+            {%- for column, condition in checks.items() %}
+            , COUNT_IF(NOT ({{ condition }})) AS {{ column }}__violations
+            {%- do failures.append(column ~ '__violations > 0') %}
+            {%- endfor %}
+        FROM {{ model }}
+        {%- if sample_percent %} SAMPLE ({{ sample_percent }}){% endif %}
+        {%- if windowed %}
+        {%- if var('profile_since', none) %}
+        WHERE {{ incremental_column }} >= '{{ var("profile_since") }}'::TIMESTAMP_TZ
+        {%- else %}
+        WHERE {{ incremental_column }} >= (SELECT MAX({{ incremental_column }}) FROM {{ model }})
+        {%- endif %}
+        {%- endif %}
+    )
+
+    SELECT *
+    FROM profile
+    WHERE {{ failures | join(' OR ') if failures else 'FALSE' }}
+{% endmacro %}
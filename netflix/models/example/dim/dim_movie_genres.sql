@@ -0,0 +1,9 @@
+WITH movies AS (
+    SELECT * FROM {{ ref('dim_movies') }}
+)
+
+SELECT
+    m.movie_id,
+    g.value::STRING AS genre
+FROM movies m,
+     LATERAL FLATTEN(input => m.genre_array) g
@@ -1,9 +1,15 @@
 {{
     config(
-        materialized = 'table'
+        materialized = 'incremental',
+        unique_key = 'movie_id',
+        on_schema_change = 'fail'
     )
 }}
 
+-- One row per movie with its whole tag relevance vector as an OBJECT keyed by
+-- tag name and its top tags as an ordered array, instead of one row per
+-- movie x tag. Incremental runs only rebuild movies whose scores (or title and
+-- genres) changed, detected through a hash per movie.
 WITH movies AS (
     SELECT * FROM {{ ref("dim_movies") }}
 ),
@@ -12,14 +18,49 @@ tags AS (
 ),
 scores AS (
     SELECT * FROM {{ ref("fct_genome_scores") }}
+),
+movie_hashes AS (
+    SELECT
+        m.movie_id,
+        HASH(m.movie_title, m.genres, HASH_AGG(s.tag_id, s.relevance_score)) AS scores_hash
+    FROM movies m
+    LEFT JOIN scores s ON m.movie_id = s.movie_id
+    GROUP BY m.movie_id, m.movie_title, m.genres
+),
+changed AS (
+    SELECT h.movie_id, h.scores_hash
+    FROM movie_hashes h
+    {% if is_incremental() %}
+    LEFT JOIN {{ this }} t ON t.movie_id = h.movie_id
+    WHERE t.scores_hash IS DISTINCT FROM h.scores_hash
+    {% endif %}
+),
+movie_tags AS (
+    SELECT
+        s.movie_id,
+        t.tag_name,
+        s.relevance_score,
+        ROW_NUMBER() OVER (
+            PARTITION BY s.movie_id
+            ORDER BY s.relevance_score DESC, t.tag_name
+        ) AS tag_rank
+    FROM scores s
+    JOIN changed c ON c.movie_id = s.movie_id
+    JOIN tags t ON t.tag_id = s.tag_id
 )
 
 SELECT
     m.movie_id,
     m.movie_title,
     m.genres,
-    t.tag_name,
-    s.relevance_score
-FROM movies m
-LEFT JOIN scores s ON m.movie_id = s.movie_id
-LEFT JOIN tags t ON t.tag_id = s.tag_id
\ No newline at end of file
+    OBJECT_AGG(mt.tag_name, mt.relevance_score::VARIANT) AS tag_relevance,
+    ARRAY_AGG(
+        CASE WHEN mt.tag_rank <= {{ var('top_tags_per_movie', 10) }}
+             THEN OBJECT_CONSTRUCT('tag_name', mt.tag_name, 'relevance_score', mt.relevance_score)
+        END
+    ) WITHIN GROUP (ORDER BY mt.tag_rank) AS top_tags,
+    c.scores_hash
+FROM changed c
+JOIN movies m ON m.movie_id = c.movie_id
+LEFT JOIN movie_tags mt ON mt.movie_id = c.movie_id
+GROUP BY m.movie_id, m.movie_title, m.genres, c.scores_hash
@@ -1,24 +1,44 @@
 {{
     config(
-        materialized= 'incremental',
-        on_schema_change=  'fail'
+        materialized = 'incremental',
+        incremental_strategy = 'append',
+        on_schema_change = 'fail'
     )
 }}
+-- Re-reads a lookback window (or an explicit backfill range) instead of only rows
+-- newer than the high-water mark, and appends the ratings whose
+-- (user_id, movie_id, rating_timestamp) is not loaded yet. A key is inserted once
+-- and never updated: a changed rating for a loaded key needs a --full-refresh.
+-- loaded_at records when a row arrived, which is what downstream marts use as
+-- their watermark.
 WITH src_ratings AS (
-    SELECT* FROM {{ ref('src_ratings') }}
+    SELECT * FROM {{ ref('src_ratings') }}
+    WHERE rating IS NOT NULL
+      AND {{ incremental_window('rating_timestamp') }}
+    QUALIFY ROW_NUMBER() OVER (
+        PARTITION BY user_id, movie_id, rating_timestamp
+        ORDER BY rating DESC
+    ) = 1
 )
-SELECT 
-    user_id,
-    movie_id,
-    rating,
-    rating_timestamp
-FROM src_ratings
-WHERE rating IS NOT NULL
+{% if is_incremental() %},
+loaded AS (
+    SELECT user_id, movie_id, rating_timestamp
+    FROM {{ this }}
+    WHERE {{ incremental_window('rating_timestamp') }}
+)
+{% endif %}
 
+SELECT
+    s.user_id,
+    s.movie_id,
+    s.rating,
+    s.rating_timestamp,
+    CURRENT_TIMESTAMP() AS loaded_at
+FROM src_ratings s
 {% if is_incremental() %}
-    AND rating_timestamp> (
-    SELECT MAX(rating_timestamp)
-    FROM {{ this }} 
-     )
+LEFT JOIN loaded l
+    ON l.user_id = s.user_id
+   AND l.movie_id = s.movie_id
+   AND l.rating_timestamp = s.rating_timestamp
+WHERE l.user_id IS NULL
 {% endif %}
-
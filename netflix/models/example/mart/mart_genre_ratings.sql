@@ -0,0 +1,47 @@
+{{
+    config(
+        materialized = 'incremental',
+        unique_key = ['genre', 'rating'],
+        on_schema_change = 'fail'
+    )
+}}
+
+-- Number of ratings per genre and rating value. Incremental runs join only the
+-- new fct_ratings rows to the genre bridge and add them to the stored counts.
+WITH new_ratings AS (
+    SELECT * FROM {{ ref('fct_ratings') }}
+    {% if is_incremental() %}
+    WHERE loaded_at > (
+        SELECT MAX(last_loaded_at)
+        FROM {{ this }}
+    )
+    {% endif %}
+),
+movie_genres AS (
+    SELECT * FROM {{ ref('dim_movie_genres') }}
+),
+delta AS (
+    SELECT
+        mg.genre,
+        r.rating,
+        COUNT(*) AS ratings_given,
+        MAX(r.loaded_at) AS last_loaded_at
+    FROM new_ratings r
+    JOIN movie_genres mg ON mg.movie_id = r.movie_id
+    GROUP BY mg.genre, r.rating
+),
+previous AS (
+    {% if is_incremental() %}
+    SELECT genre, rating, ratings_given FROM {{ this }}
+    {% else %}
+    SELECT NULL AS genre, NULL AS rating, 0 AS ratings_given WHERE FALSE
+    {% endif %}
+)
+
+SELECT
+    d.genre,
+    d.rating,
+    d.ratings_given + COALESCE(p.ratings_given, 0) AS ratings_given,
+    d.last_loaded_at
+FROM delta d
+LEFT JOIN previous p ON p.genre = d.genre AND p.rating = d.rating
@@ -0,0 +1,29 @@
+{{ config(materialized = 'table') }}
+
+-- Per-genre stats built from the genre x rating counts and the per-movie mart,
+-- so nothing here re-splits genre strings or touches individual ratings.
+WITH genre_ratings AS (
+    SELECT
+        genre,
+        SUM(rating * ratings_given) AS rating_sum,
+        SUM(ratings_given) AS total_ratings
+    FROM {{ ref('mart_genre_ratings') }}
+    GROUP BY genre
+),
+genre_movies AS (
+    SELECT
+        mg.genre,
+        COUNT(DISTINCT mg.movie_id) AS number_of_movies
+    FROM {{ ref('dim_movie_genres') }} mg
+    JOIN {{ ref('mart_movie_rating_stats') }} s ON s.movie_id = mg.movie_id
+    GROUP BY mg.genre
+)
+
+SELECT
+    gm.genre,
+    gm.number_of_movies,
+    gr.total_ratings,
+    gr.rating_sum / gr.total_ratings AS average_rating
+FROM genre_movies gm
+JOIN genre_ratings gr ON gr.genre = gm.genre
+WHERE gm.genre != '(no genres listed)'
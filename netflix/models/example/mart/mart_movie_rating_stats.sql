@@ -0,0 +1,44 @@
+{{
+    config(
+        materialized = 'incremental',
+        unique_key = 'movie_id',
+        on_schema_change = 'fail'
+    )
+}}
+
+-- Per-movie rating totals. Incremental runs only aggregate the fct_ratings rows
+-- loaded since the last build and fold them into the stored totals.
+WITH new_ratings AS (
+    SELECT * FROM {{ ref('fct_ratings') }}
+    {% if is_incremental() %}
+    WHERE loaded_at > (
+        SELECT MAX(last_loaded_at)
+        FROM {{ this }}
+    )
+    {% endif %}
+),
+delta AS (
+    SELECT
+        movie_id,
+        SUM(rating) AS rating_sum,
+        COUNT(*) AS total_ratings,
+        MAX(loaded_at) AS last_loaded_at
+    FROM new_ratings
+    GROUP BY movie_id
+),
+previous AS (
+    {% if is_incremental() %}
+    SELECT movie_id, rating_sum, total_ratings FROM {{ this }}
+    {% else %}
+    SELECT NULL AS movie_id, 0 AS rating_sum, 0 AS total_ratings WHERE FALSE
+    {% endif %}
+)
+
+SELECT
+    d.movie_id,
+    d.rating_sum + COALESCE(p.rating_sum, 0) AS rating_sum,
+    d.total_ratings + COALESCE(p.total_ratings, 0) AS total_ratings,
+    (d.rating_sum + COALESCE(p.rating_sum, 0)) / (d.total_ratings + COALESCE(p.total_ratings, 0)) AS average_rating,
+    d.last_loaded_at
+FROM delta d
+LEFT JOIN previous p ON p.movie_id = d.movie_id
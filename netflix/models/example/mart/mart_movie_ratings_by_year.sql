@@ -0,0 +1,49 @@
+{{
+    config(
+        materialized = 'incremental',
+        unique_key = ['movie_id', 'rating_year'],
+        on_schema_change = 'fail'
+    )
+}}
+
+-- Rating totals per movie and calendar year, so dashboard queries filtered by a
+-- year range read this mart instead of fct_ratings. Folded in incrementally like
+-- mart_movie_rating_stats.
+WITH new_ratings AS (
+    SELECT * FROM {{ ref('fct_ratings') }}
+    WHERE rating_timestamp IS NOT NULL
+    {% if is_incremental() %}
+    AND loaded_at > (
+        SELECT MAX(last_loaded_at)
+        FROM {{ this }}
+    )
+    {% endif %}
+),
+delta AS (
+    SELECT
+        movie_id,
+        EXTRACT(YEAR FROM rating_timestamp) AS rating_year,
+        SUM(rating) AS rating_sum,
+        COUNT(*) AS total_ratings,
+        MAX(loaded_at) AS last_loaded_at
+    FROM new_ratings
+    GROUP BY movie_id, rating_year
+),
+previous AS (
+    {% if is_incremental() %}
+    SELECT movie_id, rating_year, rating_sum, total_ratings FROM {{ this }}
+    {% else %}
+    SELECT NULL AS movie_id, NULL AS rating_year, 0 AS rating_sum, 0 AS total_ratings WHERE FALSE
+    {% endif %}
+)
+
+SELECT
+    d.movie_id,
+    d.rating_year,
+    d.rating_sum + COALESCE(p.rating_sum, 0) AS rating_sum,
+    d.total_ratings + COALESCE(p.total_ratings, 0) AS total_ratings,
+    d.last_loaded_at
+FROM delta d
+LEFT JOIN previous p
+    ON p.movie_id = d.movie_id
+   AND p.rating_year = d.rating_year
@@ -1,10 +1,40 @@
-{{ config(materialized = 'table') }}
+{{
+    config(
+        materialized = 'incremental',
+        incremental_strategy = 'merge',
+        unique_key = ['user_id', 'movie_id', 'rating_timestamp'],
+        on_schema_change = 'fail'
+    )
+}}
 
+-- Incremental runs flag only the fct_ratings rows loaded since the last build.
+-- If the seed changed, the rows of movies whose flag flipped are re-emitted
+-- from this table with the new flag and merged in place; nothing else is rewritten.
 WITH fct_ratings AS (
     SELECT * FROM {{ ref('fct_ratings') }}
+    {% if is_incremental() %}
+    WHERE loaded_at > (
+        SELECT MAX(loaded_at)
+        FROM {{ this }}
+    )
+    {% endif %}
 ),
 seed_dates AS (
     SELECT * FROM {{ ref('seed_movie_release_dates') }}
+),
+ratings_to_flag AS (
+    SELECT user_id, movie_id, rating, rating_timestamp, loaded_at FROM fct_ratings
+    {% if is_incremental() %}
+    UNION ALL
+    SELECT user_id, movie_id, rating, rating_timestamp, loaded_at
+    FROM {{ this }}
+    WHERE movie_id IN (
+        SELECT f.movie_id
+        FROM (SELECT DISTINCT movie_id, release_info_available FROM {{ this }}) f
+        LEFT JOIN seed_dates d ON f.movie_id = d.movie_id
+        WHERE f.release_info_available != CASE WHEN d.release_date IS NULL THEN 'unknown' ELSE 'known' END
+    )
+    {% endif %}
 )
 
 SELECT 
@@ -13,6 +43,6 @@ SELECT
         WHEN d.release_date IS NULL THEN 'unknown'
         ELSE 'known'
     END AS release_info_available
-FROM fct_ratings f
+FROM ratings_to_flag f
 LEFT JOIN seed_dates d
-ON f.movie_id = d.movie_id
\ No newline at end of file
+ON f.movie_id = d.movie_id
@@ -0,0 +1,41 @@
+{{
+    config(
+        materialized = 'incremental',
+        unique_key = 'rating_year',
+        on_schema_change = 'fail'
+    )
+}}
+
+-- Ratings submitted per calendar year, folded in from new fct_ratings rows.
+WITH new_ratings AS (
+    SELECT * FROM {{ ref('fct_ratings') }}
+    WHERE rating_timestamp IS NOT NULL
+    {% if is_incremental() %}
+    AND loaded_at > (
+        SELECT MAX(last_loaded_at)
+        FROM {{ this }}
+    )
+    {% endif %}
+),
+delta AS (
+    SELECT
+        EXTRACT(YEAR FROM rating_timestamp) AS rating_year,
+        COUNT(*) AS ratings_given,
+        MAX(loaded_at) AS last_loaded_at
+    FROM new_ratings
+    GROUP BY rating_year
+),
+previous AS (
+    {% if is_incremental() %}
+    SELECT rating_year, ratings_given FROM {{ this }}
+    {% else %}
+    SELECT NULL AS rating_year, 0 AS ratings_given WHERE FALSE
+    {% endif %}
+)
+
+SELECT
+    d.rating_year,
+    d.ratings_given + COALESCE(p.ratings_given, 0) AS ratings_given,
+    d.last_loaded_at
+FROM delta d
+LEFT JOIN previous p ON p.rating_year = d.rating_year
@@ -0,0 +1,14 @@
+{{ config(materialized = 'table') }}
+
+-- One-row summary for the dashboard's Executive Summary page.
+WITH movies AS (
+    SELECT * FROM {{ ref('dim_movies') }}
+),
+users AS (
+    SELECT * FROM {{ ref('mart_user_engagement') }}
+)
+
+SELECT
+    (SELECT COUNT(*) FROM movies) AS total_movies,
+    (SELECT SUM(number_of_ratings) FROM users) AS total_ratings,
+    (SELECT COUNT(*) FROM users) AS total_users
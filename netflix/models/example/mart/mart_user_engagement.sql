@@ -0,0 +1,44 @@
+{{
+    config(
+        materialized = 'incremental',
+        unique_key = 'user_id',
+        on_schema_change = 'fail'
+    )
+}}
+
+-- Per-user rating totals. Incremental runs only aggregate the fct_ratings rows
+-- loaded since the last build and fold them into the stored totals.
+WITH new_ratings AS (
+    SELECT * FROM {{ ref('fct_ratings') }}
+    {% if is_incremental() %}
+    WHERE loaded_at > (
+        SELECT MAX(last_loaded_at)
+        FROM {{ this }}
+    )
+    {% endif %}
+),
+delta AS (
+    SELECT
+        user_id,
+        SUM(rating) AS rating_sum,
+        COUNT(*) AS number_of_ratings,
+        MAX(loaded_at) AS last_loaded_at
+    FROM new_ratings
+    GROUP BY user_id
+),
+previous AS (
+    {% if is_incremental() %}
+    SELECT user_id, rating_sum, number_of_ratings FROM {{ this }}
+    {% else %}
+    SELECT NULL AS user_id, 0 AS rating_sum, 0 AS number_of_ratings WHERE FALSE
+    {% endif %}
+)
+
+SELECT
+    d.user_id,
+    d.rating_sum + COALESCE(p.rating_sum, 0) AS rating_sum,
+    d.number_of_ratings + COALESCE(p.number_of_ratings, 0) AS number_of_ratings,
+    (d.rating_sum + COALESCE(p.rating_sum, 0)) / (d.number_of_ratings + COALESCE(p.number_of_ratings, 0)) AS average_rating_given,
+    d.last_loaded_at
+FROM delta d
+LEFT JOIN previous p ON p.user_id = d.user_id
@@ -1,6 +1,4 @@
-{{ config
-    (materialized = 'table')
-}}
+{{ config(materialized = 'view') }}
 
 WITH raw_ratings AS (
     SELECT *FROM MOVIELENS.RAW.RAW_RATINGS
@@ -1,4 +1,4 @@
-{{config(materialized='table')}}
+{{config(materialized='view')}}
 WITH raw_tags AS(
     SELECT* FROM MOVIELENS.RAW.RAW_TAGS
 )
@@ -1,98 +1,439 @@
+import re
 
 
 def top_rated_movies_summary():
     return """
-    WITH ratings_summary AS (
-      SELECT
-        movie_id,
-        AVG(rating) AS average_rating,
-        COUNT(*) AS total_ratings
-      FROM MOVIELENS.DEV.fct_ratings
-      GROUP BY movie_id
-      HAVING COUNT(*) > 100
-    )
-
     SELECT
       m.movie_title,
-      rs.average_rating,
-      rs.total_ratings
-    FROM ratings_summary rs
-    JOIN MOVIELENS.DEV.dim_movies m ON m.movie_id = rs.movie_id
-    ORDER BY rs.average_rating DESC;
+      s.average_rating,
+      s.total_ratings
+    FROM MOVIELENS.DEV.mart_movie_rating_stats s
+    JOIN MOVIELENS.DEV.dim_movies m ON m.movie_id = s.movie_id
+    WHERE s.total_ratings > 100
+    ORDER BY s.average_rating DESC;
     """
 
 def user_engagement():
     return """
     SELECT
       user_id,
-      COUNT(*) AS number_of_ratings,
-      AVG(rating) AS average_rating_given
-    FROM MOVIELENS.DEV.fct_ratings
-    GROUP BY user_id
+      number_of_ratings,
+      average_rating_given
+    FROM MOVIELENS.DEV.mart_user_engagement
     ORDER BY number_of_ratings DESC;
     """
 
-def rating_over_the_years():
-    return """
+# Engagement segments as (upper bound on number_of_ratings, label); None means no upper bound.
+USER_SEGMENTS = [
+    (50, 'Casual Fans (1-50)'),
+    (200, 'Active Critics (51-200)'),
+    (500, 'Super Fans (201-500)'),
+    (None, 'Hall of Famers (501+)'),
+]
+
+def user_engagement_segments():
+    """Number of users per engagement segment, bucketed in the warehouse."""
+    cases = "\n".join(
+        f"        WHEN number_of_ratings <= {int(bound)} THEN '{label}'"
+        for bound, label in USER_SEGMENTS if bound is not None
+    )
+    return f"""
+    SELECT
+      CASE
+{cases}
+        ELSE '{USER_SEGMENTS[-1][1]}'
+      END AS category,
+      COUNT(*) AS number_of_users
+    FROM MOVIELENS.DEV.mart_user_engagement
+    GROUP BY category;
+    """
+
+def most_active_users(limit=20):
+    return f"""
+    SELECT
+      user_id,
+      number_of_ratings,
+      average_rating_given
+    FROM MOVIELENS.DEV.mart_user_engagement
+    ORDER BY number_of_ratings DESC, user_id
+    LIMIT {int(limit)};
+    """
+
+# --- Filters ---
+# Filter values are never formatted into the SQL. Query functions receive the
+# values that are set only to decide which conditions to include, and reference
+# them as `:name` bind parameters; build_query returns the values separately.
+def _movie_stats(min_ratings=None, genre=None, year_from=None, year_to=None):
+    """A `stats` CTE of movie_id, average_rating and total_ratings, restricted by the filters that are set."""
+    conditions = []
+    if genre is not None:
+        conditions.append("movie_id IN (SELECT movie_id FROM MOVIELENS.DEV.dim_movie_genres WHERE genre = :genre)")
+    if year_from is None and year_to is None:
+        if min_ratings is not None:
+            conditions.append("total_ratings > :min_ratings")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"""WITH stats AS (
+      SELECT movie_id, average_rating, total_ratings
+      FROM MOVIELENS.DEV.mart_movie_rating_stats
+      {where}
+    )"""
+    # A year range reads the per-year totals instead of the all-time ones
+    if year_from is not None:
+        conditions.append("rating_year >= :year_from")
+    if year_to is not None:
+        conditions.append("rating_year <= :year_to")
+    having = "HAVING SUM(total_ratings) > :min_ratings" if min_ratings is not None else ""
+    return f"""WITH stats AS (
+      SELECT movie_id, SUM(rating_sum) / SUM(total_ratings) AS average_rating, SUM(total_ratings) AS total_ratings
+      FROM MOVIELENS.DEV.mart_movie_ratings_by_year
+      WHERE {' AND '.join(conditions)}
+      GROUP BY movie_id
+      {having}
+    )"""
+
+def highest_rated_movies(limit=10, min_ratings=None, genre=None, year_from=None, year_to=None):
+    return f"""
+    {_movie_stats(min_ratings, genre, year_from, year_to)}
+    SELECT
+      m.movie_title,
+      s.average_rating,
+      s.total_ratings
+    FROM stats s
+    JOIN MOVIELENS.DEV.dim_movies m ON m.movie_id = s.movie_id
+    ORDER BY s.average_rating DESC, s.total_ratings DESC
+    LIMIT {int(limit)};
+    """
+
+def most_popular_movies(limit=10, min_ratings=None, genre=None, year_from=None, year_to=None):
+    return f"""
+    {_movie_stats(min_ratings, genre, year_from, year_to)}
+    SELECT
+      m.movie_title,
+      s.average_rating,
+      s.total_ratings
+    FROM stats s
+    JOIN MOVIELENS.DEV.dim_movies m ON m.movie_id = s.movie_id
+    ORDER BY s.total_ratings DESC
+    LIMIT {int(limit)};
+    """
+
+def hidden_gems(limit=10, min_ratings=None, genre=None, year_from=None, year_to=None, min_average=None, approximate=False):
+    """Highly rated movies with fewer ratings than the median of the Top Rated pool."""
+    median = "APPROX_PERCENTILE(total_ratings, 0.5)" if approximate else "MEDIAN(total_ratings)"
+    min_average_condition = "s.average_rating >= :min_average\n      AND " if min_average is not None else ""
+    return f"""
+    {_movie_stats(min_ratings, genre, year_from, year_to)}
     SELECT
-  EXTRACT(YEAR FROM rating_timestamp) AS rating_year,
-  COUNT(*) AS ratings_given
-FROM MOVIELENS.DEV.fct_ratings
-WHERE rating_timestamp IS NOT NULL
-GROUP BY rating_year
-ORDER BY rating_year;
+      m.movie_title,
+      s.average_rating,
+      s.total_ratings
+    FROM stats s
+    JOIN MOVIELENS.DEV.dim_movies m ON m.movie_id = s.movie_id
+    WHERE {min_average_condition}s.total_ratings < (SELECT {median} FROM stats)
+    ORDER BY s.average_rating DESC
+    LIMIT {int(limit)};
+    """
 
+def rating_over_the_years(year_from=None, year_to=None):
+    conditions = []
+    if year_from is not None:
+        conditions.append("rating_year >= :year_from")
+    if year_to is not None:
+        conditions.append("rating_year <= :year_to")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+    SELECT
+      rating_year,
+      ratings_given
+    FROM MOVIELENS.DEV.mart_ratings_by_year
+    {where}
+    ORDER BY rating_year;
+    """
 
+def genre_options():
+    """Genres offered by the sidebar's genre filter."""
+    return """
+    SELECT genre
+    FROM MOVIELENS.DEV.mart_genre_stats
+    ORDER BY genre;
     """
 
-def tag_relevance_analysis():
+def year_range():
+    """First and last rating years, the bounds of the sidebar's year filter."""
     return """
     SELECT
+      MIN(rating_year) AS first_year,
+      MAX(rating_year) AS last_year
+    FROM MOVIELENS.DEV.mart_ratings_by_year;
+    """
+
+# --- Approximate previews ---
+# Percentage of fct_genome_scores (in micro-partitions) read by approximate tag queries
+PREVIEW_SAMPLE_PERCENT = 10
+
+def _genome_tag_stats(approximate=False):
+    """SELECT list and FROM clause of the per-tag relevance aggregate.
+
+    The approximate version averages a block sample and scales the distinct movie
+    count from the sample back up, which is close because every movie has a
+    score for every tag.
+    """
+    if approximate:
+        return f"""
+      t.tag_name,
+      AVG(gs.relevance_score) AS avg_relevance,
+      ROUND(APPROX_COUNT_DISTINCT(gs.movie_id) * {100 / PREVIEW_SAMPLE_PERCENT}) AS movies_tagged
+    FROM MOVIELENS.DEV.fct_genome_scores gs SAMPLE SYSTEM ({PREVIEW_SAMPLE_PERCENT})"""
+    return """
       t.tag_name,
       AVG(gs.relevance_score) AS avg_relevance,
       COUNT(DISTINCT gs.movie_id) AS movies_tagged
-    FROM MOVIELENS.DEV.fct_genome_scores gs
+    FROM MOVIELENS.DEV.fct_genome_scores gs"""
+
+def tag_relevance_analysis(approximate=False):
+    return f"""
+    SELECT{_genome_tag_stats(approximate)}
     JOIN MOVIELENS.DEV.dim_genome_tags t ON gs.tag_id = t.tag_id
     GROUP BY t.tag_name
     ORDER BY avg_relevance DESC;
     """
 
-# This query is having some issues
-
-# def genre_rating_distribution():
-#     return """
-#     SELECT
-#       genre.value::STRING AS genre,
-#       AVG(r.rating) AS average_rating,
-#       COUNT(DISTINCT m.movie_id) AS total_movies
-#     FROM MOVIELENS.DEV.dim_movies_with_tags m,
-#          LATERAL FLATTEN(input => SPLIT(m.genres, '|')) genre
-#     JOIN MOVIELENS.DEV.fct_ratings r ON m.movie_id = r.movie_id
-#     WHERE r.rating IS NOT NULL
-#     GROUP BY genre.value
-#     ORDER BY average_rating DESC
-#     LIMIT 100;
-#     """
+# --- Similar movies ---
+# Read by similar_movies.SimilarityIndex to build its genome vectors, not shown directly
+def genome_tags():
+    return """
+    SELECT tag_id, tag_name
+    FROM MOVIELENS.DEV.dim_genome_tags
+    ORDER BY tag_id;
+    """
 
-def genre_analysis():
+def genome_score_hashes():
+    """One hash per movie over its genome scores; the index re-reads movies whose hash changed."""
+    return """
+    SELECT movie_id, HASH_AGG(tag_id, relevance_score) AS scores_hash
+    FROM MOVIELENS.DEV.fct_genome_scores
+    GROUP BY movie_id;
     """
-    NEW QUERY: Analyzes genres by counting movies and calculating average ratings.
+
+def genome_scores(movie_ids):
+    """Genome scores of `movie_ids`, bound as `:movie_0`, `:movie_1`, ..."""
+    placeholders = ", ".join(f":movie_{i}" for i in range(len(movie_ids)))
+    return f"""
+    SELECT movie_id, tag_id, relevance_score
+    FROM MOVIELENS.DEV.fct_genome_scores
+    WHERE movie_id IN ({placeholders});
     """
+
+def genome_movie_titles():
+    """Movies with genome scores, offered by the Similar Movies picker."""
     return """
-    WITH movie_genres AS (
-      SELECT
-        m.movie_id,
-        g.value::STRING AS genre
-      FROM MOVIELENS.DEV.dim_movies m,
-           LATERAL FLATTEN(input => SPLIT(m.genres, '|')) g
+    SELECT m.movie_id, m.movie_title
+    FROM MOVIELENS.DEV.dim_movies m
+    WHERE m.movie_id IN (SELECT movie_id FROM MOVIELENS.DEV.fct_genome_scores)
+    ORDER BY m.movie_title;
+    """
+
+# --- Keyset pagination ---
+# Page queries sort descending on their keyset columns and continue after the
+# previous page's last row, whose keyset values are bound as `:column` parameters.
+# They fetch one row more than `page_size` so the caller knows whether a next page exists.
+USER_ENGAGEMENT_KEYSET = ["number_of_ratings", "user_id"]
+TAG_RELEVANCE_KEYSET = ["avg_relevance", "tag_name"]
+
+def keyset_condition(columns):
+    """`(a, b) < (:a, :b)` spelled out, as Snowflake has no row-value comparison."""
+    first, rest = columns[0], columns[1:]
+    if not rest:
+        return f"{first} < :{first}"
+    return f"({first} < :{first} OR ({first} = :{first} AND {keyset_condition(rest)}))"
+
+def _keyset_page(keyset, page_size, after):
+    where = f"WHERE {keyset_condition(keyset)}" if after else ""
+    order_by = ", ".join(f"{col} DESC" for col in keyset)
+    return f"{where}\n    ORDER BY {order_by}\n    LIMIT {int(page_size) + 1}"
+
+def user_engagement_page(page_size=50, after=None):
+    """One page of user_engagement(); `after` is the previous page's last keyset values, if any."""
+    return f"""
+    SELECT
+      user_id,
+      number_of_ratings,
+      average_rating_given
+    FROM MOVIELENS.DEV.mart_user_engagement
+    {_keyset_page(USER_ENGAGEMENT_KEYSET, page_size, after)};
+    """
+
+def tag_relevance_page(page_size=50, after=None, approximate=False):
+    """One page of tag_relevance_analysis(); `after` is the previous page's last keyset values, if any."""
+    # Rounded so the keyset value read back from a page compares equal on the next query
+    return f"""
+    WITH tag_stats AS (
+      SELECT{_genome_tag_stats(approximate)}
+      JOIN MOVIELENS.DEV.dim_genome_tags t ON gs.tag_id = t.tag_id
+      GROUP BY t.tag_name
+    ),
+    tags AS (
+      SELECT tag_name, ROUND(avg_relevance, 6) AS avg_relevance, movies_tagged
+      FROM tag_stats
     )
+    SELECT tag_name, avg_relevance, movies_tagged
+    FROM tags
+    {_keyset_page(TAG_RELEVANCE_KEYSET, page_size, after)};
+    """
+
+def genre_rating_distribution():
+    return """
     SELECT
       mg.genre,
-      COUNT(DISTINCT mg.movie_id) as number_of_movies,
-      AVG(r.rating) as average_rating
-    FROM movie_genres mg
-    JOIN MOVIELENS.DEV.fct_ratings r ON mg.movie_id = r.movie_id
-    WHERE mg.genre != '(no genres listed)'
+      SUM(s.rating_sum) / SUM(s.total_ratings) AS average_rating,
+      COUNT(DISTINCT mg.movie_id) AS total_movies
+    FROM MOVIELENS.DEV.dim_movie_genres mg
+    JOIN MOVIELENS.DEV.mart_movie_rating_stats s ON s.movie_id = mg.movie_id
     GROUP BY mg.genre
+    ORDER BY average_rating DESC
+    LIMIT 100;
+    """
+
+def genre_analysis():
+    """
+    NEW QUERY: Analyzes genres by counting movies and calculating average ratings.
+    """
+    return """
+    SELECT
+      genre,
+      number_of_movies,
+      average_rating
+    FROM MOVIELENS.DEV.mart_genre_stats
     ORDER BY number_of_movies DESC;
-    """
\ No newline at end of file
+    """
+
+def executive_summary():
+    """Headline counts for the Executive Summary page, read from the one-row summary mart."""
+    return """
+    SELECT
+      total_movies,
+      total_ratings,
+      total_users
+    FROM MOVIELENS.DEV.mart_ratings_summary;
+    """
+
+# Result column types per query function. run_query casts the Arrow result to these
+# so pages get compact numeric and categorical columns without coercing them again.
+QUERY_SCHEMAS = {
+    "top_rated_movies_summary": {"movie_title": "category", "average_rating": "float32", "total_ratings": "int32"},
+    "user_engagement": {"user_id": "int32", "number_of_ratings": "int32", "average_rating_given": "float32"},
+    "user_engagement_segments": {"category": "category", "number_of_users": "int32"},
+    "most_active_users": {"user_id": "int32", "number_of_ratings": "int32", "average_rating_given": "float32"},
+    "highest_rated_movies": {"movie_title": "category", "average_rating": "float32", "total_ratings": "int32"},
+    "most_popular_movies": {"movie_title": "category", "average_rating": "float32", "total_ratings": "int32"},
+    "hidden_gems": {"movie_title": "category", "average_rating": "float32", "total_ratings": "int32"},
+    "rating_over_the_years": {"rating_year": "int32", "ratings_given": "int32"},
+    "tag_relevance_analysis": {"tag_name": "category", "avg_relevance": "float32", "movies_tagged": "int32"},
+    "genre_analysis": {"genre": "category", "number_of_movies": "int32", "average_rating": "float32"},
+    "executive_summary": {"total_movies": "int64", "total_ratings": "int64", "total_users": "int64"},
+    "genre_options": {"genre": "string"},
+    "year_range": {"first_year": "int32", "last_year": "int32"},
+    # Keyset columns keep full precision; they are bound back into the next page's query
+    "user_engagement_page": {"user_id": "int32", "number_of_ratings": "int32", "average_rating_given": "float32"},
+    "tag_relevance_page": {"tag_name": "category", "avg_relevance": "float64", "movies_tagged": "int32"},
+    "genome_tags": {"tag_id": "int32", "tag_name": "string"},
+    "genome_score_hashes": {"movie_id": "int32", "scores_hash": "string"},
+    "genome_scores": {"movie_id": "int32", "tag_id": "int32", "relevance_score": "float32"},
+    "genome_movie_titles": {"movie_id": "int32", "movie_title": "string"},
+}
+
+class Param:
+    """A typed query parameter. Values are coerced to `type`; None turns the filter off."""
+
+    def __init__(self, name, type, default=None):
+        self.name = name
+        self.type = type
+        self.default = default
+
+    def coerce(self, value):
+        return None if value is None else self.type(value)
+
+
+MIN_RATINGS = Param("min_ratings", int, default=100)
+MIN_AVERAGE = Param("min_average", float, default=4.0)
+GENRE = Param("genre", str)
+YEAR_FROM = Param("year_from", int)
+YEAR_TO = Param("year_to", int)
+
+MOVIE_FILTERS = [MIN_RATINGS, GENRE, YEAR_FROM, YEAR_TO]
+
+# Parameters each query function accepts, by function name. Queries not listed here
+# take none.
+QUERY_PARAMS = {
+    "highest_rated_movies": MOVIE_FILTERS,
+    "most_popular_movies": MOVIE_FILTERS,
+    "hidden_gems": MOVIE_FILTERS + [MIN_AVERAGE],
+    "rating_over_the_years": [YEAR_FROM, YEAR_TO],
+}
+
+
+# --- Query ids ---
+# build_query opens every query with a comment naming its query function. The name
+# shows up in Snowflake's query history, and backends that answer queries without
+# running their SQL (ColumnarBackend) dispatch on it.
+_QUERY_ID = re.compile(r"^\s*/\* query=(\w+) \*/")
+
+def tag_query(name, sql):
+    return f"/* query={name} */{sql}"
+
+def query_id(sql):
+    """The query function name `sql` was tagged with, or None."""
+    match = _QUERY_ID.match(sql)
+    return match.group(1) if match else None
+
+
+# Query functions that accept `approximate=True` for a fast preview
+APPROXIMATE_QUERIES = {"hidden_gems", "tag_relevance_analysis", "tag_relevance_page"}
+
+
+def build_query(query_func, approximate=False, **filters):
+    """Returns `(sql, params)` for `query_func`, taking its declared parameters from `filters`.
+
+    Parameters missing from `filters` get their default; parameters that end up
+    None are left out of both the SQL and `params`. Other entries in `filters`
+    are ignored, so every query can be built from the same filter set. The SQL
+    text only depends on which filters are set, so the warehouse can reuse
+    compiled statements across users and the result cache keys on
+    `(query, params)`. With `approximate=True`, `query_func` must be listed in
+    `APPROXIMATE_QUERIES`. The SQL is tagged with the function's name (see `tag_query`).
+    """
+    name = query_func.__name__
+    params = {}
+    for param in QUERY_PARAMS.get(name, []):
+        value = param.coerce(filters.get(param.name, param.default))
+        if value is not None:
+            params[param.name] = value
+    if approximate:
+        if name not in APPROXIMATE_QUERIES:
+            raise ValueError(f"{name} has no approximate version")
+        return tag_query(name, query_func(approximate=True, **params)), params or None
+    return tag_query(name, query_func(**params)), params or None
+
+
+# Every query the dashboard runs, grouped by sidebar section. The first entry is the
+# section's primary query; the cache warmer pre-executes all of them.
+SECTION_QUERIES = {
+    "Executive Summary": [executive_summary],
+    "Genre Analysis": [genre_analysis],
+    "Top Rated Movies": [highest_rated_movies, most_popular_movies, hidden_gems],
+    "User Engagement": [user_engagement_segments, most_active_users],
+    "Rating Trends": [rating_over_the_years],
+    "Tag Analysis": [tag_relevance_page],
+    "Similar Movies": [genome_movie_titles],
+}
+
+
+# Full results users can download from each section, as (label, query). Exports
+# stream from the cursor instead of going through the result cache.
+SECTION_EXPORTS = {
+    "Genre Analysis": [("Genre statistics", genre_analysis)],
+    "Top Rated Movies": [("Movies with over 100 ratings", top_rated_movies_summary)],
+    "User Engagement": [("All users", user_engagement)],
+    "Rating Trends": [("Ratings per year", rating_over_the_years)],
+    "Tag Analysis": [("All tag relevances", tag_relevance_analysis)],
+}
@@ -0,0 +1,529 @@
+# ratings_store.py
+
+"""In-process columnar copy of `fct_ratings` for the `columnar` query backend.
+
+Ratings are kept as four fixed-width columns in flat files that are memory-mapped
+on open: int32 user_id and movie_id, uint8 rating × 2 and int32 epoch seconds,
+13 bytes per row. Per-movie, per-user and per-year totals are computed once with
+`np.bincount` and kept current as rows are appended, so the dashboard queries in
+`queries1.py` are answered from a few small arrays. Genres come from `dim_movies`
+as a per-movie bitmask.
+
+The store is filled from the `fct_ratings` Parquet export (see `export_parquet`)
+and refreshed like the incremental marts: `sync` appends the rows whose
+`loaded_at` is newer than the store's watermark, and reloads everything after
+a full refresh of `fct_ratings`.
+"""
+
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from queries1 import USER_SEGMENTS
+
+
+# Column files and their on-disk types
+COLUMNS = {
+    "user_id": np.dtype("<i4"),
+    "movie_id": np.dtype("<i4"),
+    "rating2": np.dtype("u1"),
+    "rated_at": np.dtype("<i4"),
+}
+
+# Rows per bincount pass, which bounds temporary memory on full scans
+CHUNK_ROWS = 4_000_000
+
+# Rating years the store can hold; int32 epoch seconds end in 2038
+FIRST_YEAR = 1970
+YEARS = 69
+_YEAR_STARTS = np.array([np.datetime64(str(FIRST_YEAR + i), "s").astype(np.int64) for i in range(YEARS)])
+
+NO_GENRES = "(no genres listed)"
+
+_META = "store.json"
+_MOVIES = "movies.parquet"
+
+# movie_years maps each rating year to per-movie (count, doubled sum) arrays, so
+# year filters add up a few arrays instead of rescanning the rows
+Snapshot = namedtuple("Snapshot", "rows columns movie_count movie_sum2 user_count user_sum2 movie_years")
+
+_EMPTY_COUNTS = np.zeros(0, dtype=np.int32)
+
+
+def _epoch_seconds(timestamps):
+    seconds = pc.cast(timestamps, pa.timestamp("s", tz=timestamps.type.tz), safe=False)
+    return seconds.cast(pa.int64()).to_numpy()
+
+
+def _add(total, delta):
+    """`total + delta` for bincounts of different lengths, as a new array."""
+    if len(delta) > len(total):
+        total, delta = delta, total
+    result = total.copy()
+    result[:len(delta)] += delta
+    return result
+
+
+def _count_chunk(chunk, snapshot):
+    """Folds one chunk of rows into the totals of `snapshot`."""
+    movie_id, user_id, rating2 = chunk["movie_id"], chunk["user_id"], chunk["rating2"]
+    # Stable sort on the year (a radix sort for uint8), then one bincount per year's slice
+    year_index = np.clip(np.searchsorted(_YEAR_STARTS, chunk["rated_at"], side="right") - 1, 0, YEARS - 1).astype(np.uint8)
+    order = np.argsort(year_index, kind="stable")
+    bounds = np.searchsorted(year_index[order], np.arange(YEARS + 1))
+    by_year, by_year_rating2 = movie_id[order], rating2[order]
+    movie_years = dict(snapshot.movie_years)
+    for index in np.flatnonzero(np.diff(bounds)):
+        ids, ratings = by_year[bounds[index]:bounds[index + 1]], by_year_rating2[bounds[index]:bounds[index + 1]]
+        count, sum2 = movie_years.get(FIRST_YEAR + index, (_EMPTY_COUNTS, _EMPTY_COUNTS))
+        movie_years[FIRST_YEAR + index] = (
+            _add(count, np.bincount(ids).astype(np.int32)),
+            _add(sum2, np.bincount(ids, weights=ratings).astype(np.int32)),
+        )
+    return snapshot._replace(
+        movie_count=_add(snapshot.movie_count, np.bincount(movie_id)),
+        movie_sum2=_add(snapshot.movie_sum2, np.bincount(movie_id, weights=rating2)),
+        user_count=_add(snapshot.user_count, np.bincount(user_id)),
+        user_sum2=_add(snapshot.user_sum2, np.bincount(user_id, weights=rating2)),
+        movie_years=movie_years,
+    )
+
+
+def _empty_snapshot(columns, rows=0):
+    counts, sums = np.zeros(0, dtype=np.int64), np.zeros(0)
+    return Snapshot(rows, columns, counts, sums, counts, sums, {})
+
+
+def _chunks(columns, start, stop):
+    for offset in range(start, stop, CHUNK_ROWS):
+        end = min(offset + CHUNK_ROWS, stop)
+        yield {name: column[offset:end] for name, column in columns.items()}
+
+
+def _rating_chunk(user_id, movie_id, rating, rated_at):
+    """Ratings in stars and epoch seconds as the store's column types."""
+    return {
+        "user_id": np.asarray(user_id, dtype=COLUMNS["user_id"]),
+        "movie_id": np.asarray(movie_id, dtype=COLUMNS["movie_id"]),
+        "rating2": np.rint(np.asarray(rating, dtype=np.float64) * 2).astype(COLUMNS["rating2"]),
+        "rated_at": np.asarray(rated_at, dtype=COLUMNS["rated_at"]),
+    }
+
+
+def _column_file(name, generation):
+    # A reload writes a new generation of files next to the one being read
+    return f"{name}.bin" if generation == 0 else f"{name}.{generation}.bin"
+
+
+def _table_path(data_dir, table):
+    single = os.path.join(data_dir, f"{table}.parquet")
+    return single if os.path.isfile(single) else os.path.join(data_dir, table)
+
+
+class RatingsStore:
+    """Memory-mapped rating columns plus the running totals the dashboard reads.
+
+    Readers take `snapshot()` once per query; appends and syncs build new totals
+    on the side and swap the snapshot once, so a query never sees half of one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_mtime = None
+        self._load_movies()
+        self._load()
+
+    def _load(self):
+        """Maps the rows recorded in the store's metadata and counts their totals."""
+        with open(os.path.join(self.path, _META), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.watermark = meta.get("watermark")
+        self.generation = meta.get("generation", 0)
+        columns = self._map_columns(meta["rows"], self.generation)
+        snapshot = _empty_snapshot(columns, meta["rows"])
+        for chunk in _chunks(columns, 0, meta["rows"]):
+            snapshot = _count_chunk(chunk, snapshot)
+        self._snapshot = snapshot
+
+    @classmethod
+    def open(cls, path, data_dir=None):
+        """Opens the store at `path`, creating it from `data_dir`'s Parquet exports if needed, and syncs it."""
+        if not os.path.isfile(os.path.join(path, _META)):
+            if data_dir is None:
+                raise FileNotFoundError(f"No ratings store in {path} and no Parquet exports to build one from")
+            cls.create(path, data_dir)
+        store = cls(path)
+        if data_dir is not None:
+            store.sync(data_dir)
+        return store
+
+    @staticmethod
+    def create(path, data_dir):
+        """Lays out an empty store at `path` with the movies of `data_dir`'s `dim_movies` export."""
+        os.makedirs(path, exist_ok=True)
+        movies = ds.dataset(_table_path(data_dir, "dim_movies")).to_table(columns=["movie_id", "movie_title", "genres"])
+        pq.write_table(movies, os.path.join(path, _MOVIES))
+        for name in COLUMNS:
+            open(os.path.join(path, _column_file(name, 0)), "wb").close()
+        _write_meta(path, rows=0, watermark=None, generation=0)
+
+    def _load_movies(self):
+        movies = pq.read_table(os.path.join(self.path, _MOVIES)).to_pandas()
+        ids = movies["movie_id"].to_numpy(dtype=np.int64)
+        size = int(ids.max()) + 1 if len(ids) else 0
+        genre_lists = movies["genres"].fillna("").str.split("|")
+        self.genres = sorted({genre for genres in genre_lists for genre in genres if genre})
+        if len(self.genres) > 64:
+            raise ValueError(f"{len(self.genres)} genres do not fit in a 64-bit genre mask")
+        bit = {genre: np.uint64(1) << np.uint64(i) for i, genre in enumerate(self.genres)}
+        self.movie_count = len(ids)
+        self.known = np.zeros(size, dtype=bool)
+        self.known[ids] = True
+        self.titles = np.empty(size, dtype=object)
+        self.titles[ids] = movies["movie_title"].to_numpy()
+        self.genre_mask = np.zeros(size, dtype=np.uint64)
+        self.genre_mask[ids] = [np.bitwise_or.reduce([bit[g] for g in genres if g], initial=np.uint64(0)) for genres in genre_lists]
+        # movies × genres, for per-genre totals as one matrix product
+        self.genre_matrix = (self.genre_mask[:, None] >> np.arange(len(self.genres), dtype=np.uint64)) & np.uint64(1) == 1
+
+    def _column_path(self, name, generation):
+        return os.path.join(self.path, _column_file(name, generation))
+
+    def _map_columns(self, rows, generation):
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self._column_path(name, generation), dtype=dtype, mode="r", shape=(rows,))
+        return columns
+
+    @property
+    def rows(self):
+        return self._snapshot.rows
+
+    def snapshot(self):
+        return self._snapshot
+
+    # --- Refresh ---
+    def append(self, user_id, movie_id, rating, rated_at, watermark=None):
+        """Appends ratings (`rating` in stars, `rated_at` in epoch seconds) and folds them into the totals."""
+        with self._sync_lock:
+            chunk = _rating_chunk(user_id, movie_id, rating, rated_at)
+            self._publish(self._write_chunk(chunk, self._snapshot, self.generation), watermark or self.watermark, self.generation)
+        return len(chunk["user_id"])
+
+    def _write_chunk(self, chunk, snapshot, generation):
+        """Writes `chunk` after the rows of `snapshot` in `generation`'s files; returns the snapshot holding it.
+
+        Nothing is published: readers keep the current snapshot until `_publish`.
+        """
+        for name, values in chunk.items():
+            with open(self._column_path(name, generation), "r+b") as f:
+                # Overwrites whatever an interrupted sync left past the recorded rows.
+                # Not truncated: older snapshots may still map the bytes after them.
+                f.seek(snapshot.rows * COLUMNS[name].itemsize)
+                f.write(values.tobytes())
+        rows = snapshot.rows + len(chunk["user_id"])
+        return _count_chunk(chunk, snapshot._replace(rows=rows, columns=self._map_columns(rows, generation)))
+
+    def _publish(self, snapshot, watermark, generation):
+        """Records `snapshot` in the store's metadata and hands it to readers, in one step."""
+        with self._lock:
+            # Written first: a store reopened after a crash sees the old rows or the new ones, never a mix
+            _write_meta(self.path, rows=snapshot.rows, watermark=watermark, generation=generation)
+            self._snapshot = snapshot
+            self.watermark = watermark
+            self.generation = generation
+
+    def sync(self, data_dir):
+        """Brings the store up to date with the `fct_ratings` export; returns how many rows it appended.
+
+        The store holds exactly the export's rows with a rating timestamp and a
+        `loaded_at` up to its watermark, and appends the rows loaded after it. When
+        that no longer adds up, because `fct_ratings` was rebuilt (a full refresh
+        restamps every `loaded_at`) or rows were removed, the store is reloaded
+        into a new set of column files. Exports without `loaded_at` are reloaded
+        whenever their row count changes. Either way the new rows are published
+        once, after the last batch: until then queries see the previous rows and
+        totals, and an interrupted sync is read again in full. Nothing is read
+        while the export's modification time is unchanged.
+        """
+        path = _table_path(data_dir, "fct_ratings")
+        mtime = os.path.getmtime(path)
+        with self._sync_lock:
+            if mtime == self._synced_mtime:
+                return 0
+            dataset = ds.dataset(path)
+            incremental = "loaded_at" in dataset.schema.names
+            # Like the SQL queries, which skip ratings without a timestamp
+            dated = pc.field("rating_timestamp").is_valid()
+            if not incremental:
+                held, new = dated, None
+            elif self.watermark is None:
+                held, new = None, dated
+            else:
+                cutoff = pa.scalar(pd.Timestamp(self.watermark), dataset.schema.field("loaded_at").type)
+                held, new = dated & (pc.field("loaded_at") <= cutoff), dated & (pc.field("loaded_at") > cutoff)
+            reload = (dataset.count_rows(filter=held) if held is not None else 0) != self.rows
+            if reload:
+                new = dated
+                generation = self.generation + 1
+                for name in COLUMNS:
+                    open(self._column_path(name, generation), "wb").close()
+                snapshot, latest = _empty_snapshot(self._map_columns(0, generation)), None
+            elif new is None:
+                self._synced_mtime = mtime
+                return 0
+            else:
+                generation, snapshot = self.generation, self._snapshot
+                latest = pd.Timestamp(self.watermark) if self.watermark else None
+
+            columns = ["user_id", "movie_id", "rating", "rating_timestamp"] + (["loaded_at"] if incremental else [])
+            appended = 0
+            try:
+                # Batches arrive in no particular `loaded_at` order, so the watermark waits for the last one
+                for batch in dataset.to_batches(columns=columns, filter=new, batch_size=CHUNK_ROWS):
+                    if not batch.num_rows:
+                        continue
+                    if incremental:
+                        batch_latest = pd.Timestamp(pc.max(batch.column("loaded_at")).as_py())
+                        latest = batch_latest if latest is None else max(latest, batch_latest)
+                    chunk = _rating_chunk(
+                        batch.column("user_id").to_numpy(),
+                        batch.column("movie_id").to_numpy(),
+                        batch.column("rating").to_numpy(),
+                        _epoch_seconds(batch.column("rating_timestamp")),
+                    )
+                    snapshot = self._write_chunk(chunk, snapshot, generation)
+                    appended += batch.num_rows
+            except Exception:
+                if reload:
+                    self._remove_generation(generation)
+                raise
+            previous = self.generation
+            self._publish(snapshot, latest.isoformat() if latest is not None else None, generation)
+            if reload:
+                # Snapshots taken before the swap keep their mappings of the removed files
+                self._remove_generation(previous)
+            self._synced_mtime = mtime
+            return appended
+
+    def _remove_generation(self, generation):
+        for name in COLUMNS:
+            try:
+                os.remove(self._column_path(name, generation))
+            except OSError:
+                pass
+
+    # --- Aggregates ---
+    def movie_totals(self, snapshot, year_from=None, year_to=None):
+        """Per-movie rating counts and doubled rating sums, over all time or the rating years given."""
+        if year_from is None and year_to is None:
+            return snapshot.movie_count, snapshot.movie_sum2
+        size = len(snapshot.movie_count)
+        count, sum2 = np.zeros(size, dtype=np.int64), np.zeros(size, dtype=np.int64)
+        for year, (year_count, year_sum2) in snapshot.movie_years.items():
+            if (year_from is None or year >= year_from) and (year_to is None or year <= year_to):
+                count[:len(year_count)] += year_count
+                sum2[:len(year_sum2)] += year_sum2
+        return count, sum2
+
+    def year_totals(self, snapshot):
+        """Rating years in order and the number of ratings given in each."""
+        years = sorted(snapshot.movie_years)
+        return np.array(years, dtype=np.int64), np.array([int(snapshot.movie_years[year][0].sum()) for year in years], dtype=np.int64)
+
+    def genre_totals(self, snapshot):
+        """Per-genre counts of rated movies and ratings, and doubled rating sums, over movies in `dim_movies`."""
+        size = min(len(snapshot.movie_count), len(self.known))
+        matrix = self.genre_matrix[:size] & self.known[:size, None]
+        count, sum2 = snapshot.movie_count[:size], snapshot.movie_sum2[:size]
+        return (count > 0).astype(np.int64) @ matrix, count @ matrix, sum2 @ matrix
+
+    def genre_ids(self, movie_ids, genre):
+        """The entries of `movie_ids` tagged with `genre`."""
+        if genre not in self.genres:
+            return movie_ids[:0]
+        movie_ids = movie_ids[movie_ids < len(self.genre_mask)]
+        bit = np.uint64(1) << np.uint64(self.genres.index(genre))
+        return movie_ids[(self.genre_mask[movie_ids] & bit) != 0]
+
+    def in_dim_movies(self, movie_ids):
+        """Mask of the entries of `movie_ids` that have a row in `dim_movies`."""
+        keep = movie_ids < len(self.known)
+        keep[keep] = self.known[movie_ids[keep]]
+        return keep
+
+
+def _write_meta(path, **meta):
+    tmp = os.path.join(path, _META + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(path, _META))
+
+
+# --- Queries ---
+# One function per query in queries1.py the store can answer. Each takes the store,
+# the query's bound parameters and its LIMIT (None if it has none) and returns the
+# columns the SQL selects, in the same order.
+def _movie_stats(store, snapshot, params):
+    """Like queries1._movie_stats: ids, average ratings and counts of the movies passing the filters."""
+    count, sum2 = store.movie_totals(snapshot, params.get("year_from"), params.get("year_to"))
+    ids = np.flatnonzero(count)
+    if params.get("genre") is not None:
+        ids = store.genre_ids(ids, params["genre"])
+    if params.get("min_ratings") is not None:
+        ids = ids[count[ids] > params["min_ratings"]]
+    return ids, sum2[ids] / 2 / count[ids], count[ids]
+
+
+def _movie_frame(store, ids, average, total, order, limit):
+    order = order[:limit]
+    return pd.DataFrame({
+        "movie_title": store.titles[ids[order]],
+        "average_rating": average[order],
+        "total_ratings": total[order],
+    })
+
+
+def _joined(store, ids, average, total):
+    keep = store.in_dim_movies(ids)
+    return ids[keep], average[keep], total[keep]
+
+
+def highest_rated_movies(store, params, limit):
+    ids, average, total = _joined(store, *_movie_stats(store, store.snapshot(), params))
+    return _movie_frame(store, ids, average, total, np.lexsort((-total, -average)), limit)
+
+
+def most_popular_movies(store, params, limit):
+    ids, average, total = _joined(store, *_movie_stats(store, store.snapshot(), params))
+    return _movie_frame(store, ids, average, total, np.argsort(-total, kind="stable"), limit)
+
+
+def hidden_gems(store, params, limit):
+    ids, average, total = _movie_stats(store, store.snapshot(), params)
+    # The median is taken over the filtered stats, before the join to dim_movies
+    keep = total < np.median(total) if len(total) else np.zeros(0, dtype=bool)
+    if params.get("min_average") is not None:
+        keep &= average >= params["min_average"]
+    ids, average, total = _joined(store, ids[keep], average[keep], total[keep])
+    return _movie_frame(store, ids, average, total, np.argsort(-average, kind="stable"), limit)
+
+
+def top_rated_movies_summary(store, params, limit):
+    ids, average, total = _joined(store, *_movie_stats(store, store.snapshot(), {"min_ratings": 100}))
+    return _movie_frame(store, ids, average, total, np.argsort(-average, kind="stable"), limit)
+
+
+def _users(snapshot):
+    ids = np.flatnonzero(snapshot.user_count)
+    count = snapshot.user_count[ids]
+    return ids, count, snapshot.user_sum2[ids] / 2 / count
+
+
+def _user_frame(ids, count, average, order, limit):
+    order = order[:limit]
+    return pd.DataFrame({"user_id": ids[order], "number_of_ratings": count[order], "average_rating_given": average[order]})
+
+
+def user_engagement(store, params, limit):
+    ids, count, average = _users(store.snapshot())
+    return _user_frame(ids, count, average, np.argsort(-count, kind="stable"), limit)
+
+
+def most_active_users(store, params, limit):
+    ids, count, average = _users(store.snapshot())
+    # user ids are already ascending, so a stable sort breaks ties by user_id
+    return _user_frame(ids, count, average, np.argsort(-count, kind="stable"), limit)
+
+
+def user_engagement_page(store, params, limit):
+    ids, count, average = _users(store.snapshot())
+    if params:
+        after_count, after_id = params["number_of_ratings"], params["user_id"]
+        keep = (count < after_count) | ((count == after_count) & (ids < after_id))
+        ids, count, average = ids[keep], count[keep], average[keep]
+    return _user_frame(ids, count, average, np.lexsort((-ids, -count)), limit)
+
+
+def user_engagement_segments(store, params, limit):
+    _, count, _ = _users(store.snapshot())
+    bounds = [bound for bound, _ in USER_SEGMENTS if bound is not None]
+    users = np.bincount(np.searchsorted(bounds, count, side="left"), minlength=len(USER_SEGMENTS))
+    segments = [(label, n) for (_, label), n in zip(USER_SEGMENTS, users) if n]
+    return pd.DataFrame(segments, columns=["category", "number_of_users"])
+
+
+def rating_over_the_years(store, params, limit):
+    years, ratings = store.year_totals(store.snapshot())
+    keep = np.ones(len(years), dtype=bool)
+    if params.get("year_from") is not None:
+        keep &= years >= params["year_from"]
+    if params.get("year_to") is not None:
+        keep &= years <= params["year_to"]
+    return pd.DataFrame({"rating_year": years[keep], "ratings_given": ratings[keep]})
+
+
+def year_range(store, params, limit):
+    years, _ = store.year_totals(store.snapshot())
+    first, last = (int(years[0]), int(years[-1])) if len(years) else (None, None)
+    return pd.DataFrame({"first_year": [first], "last_year": [last]})
+
+
+def _genre_stats(store):
+    movies, ratings, sum2 = store.genre_totals(store.snapshot())
+    genres = np.array(store.genres, dtype=object)
+    # Genres without rated movies drop out of the joins in the SQL
+    keep = movies > 0
+    return genres[keep], movies[keep], ratings[keep], sum2[keep] / 2 / ratings[keep]
+
+
+def genre_analysis(store, params, limit):
+    genres, movies, _, average = _genre_stats(store)
+    keep = genres != NO_GENRES
+    order = np.argsort(-movies[keep], kind="stable")
+    return pd.DataFrame({"genre": genres[keep][order], "number_of_movies": movies[keep][order], "average_rating": average[keep][order]})
+
+
+def genre_options(store, params, limit):
+    genres, _, _, _ = _genre_stats(store)
+    return pd.DataFrame({"genre": sorted(genre for genre in genres if genre != NO_GENRES)})
+
+
+def genre_rating_distribution(store, params, limit):
+    genres, movies, _, average = _genre_stats(store)
+    order = np.argsort(-average, kind="stable")[:limit]
+    return pd.DataFrame({"genre": genres[order], "average_rating": average[order], "total_movies": movies[order]})
+
+
+def executive_summary(store, params, limit):
+    snapshot = store.snapshot()
+    return pd.DataFrame({
+        "total_movies": [store.movie_count],
+        "total_ratings": [snapshot.rows],
+        "total_users": [int(np.count_nonzero(snapshot.user_count))],
+    })
+
+
+# Query functions the store answers, by name; the rest need the fallback backend
+QUERY_HANDLERS = {
+    func.__name__: func
+    for func in [
+        top_rated_movies_summary, user_engagement, user_engagement_segments, most_active_users,
+        highest_rated_movies, most_popular_movies, hidden_gems, rating_over_the_years,
+        genre_options, year_range, user_engagement_page, genre_rating_distribution,
+        genre_analysis, executive_summary,
+    ]
+}
@@ -0,0 +1,278 @@
+# result_cache.py
+
+"""Two-tier cache for query results.
+
+Results are keyed on the normalized SQL plus its parameters. They live in a
+byte-bounded in-memory LRU and in Parquet files on local disk, so a restarted
+process does not re-run identical warehouse queries. Entries are tagged with a
+data version (the last dbt run plus the backend's own notion of freshness), so
+they are invalidated when the models change rather than on a timer.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+logger = logging.getLogger(__name__)
+
+_VERSION_METADATA_KEY = b"movielens_cache_version"
+
+
+def normalize_sql(query):
+    """Collapses whitespace and trailing semicolons so formatting changes share a cache entry."""
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+def cache_key(query, params=None, schema=None):
+    payload = json.dumps([normalize_sql(query), params or {}, schema or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def dbt_run_version(target_dir):
+    """Identifies the last dbt invocation from `target/run_results.json`, or None if there is none."""
+    path = os.path.join(target_dir, "run_results.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            metadata = json.load(f).get("metadata", {})
+        return metadata.get("invocation_id") or metadata.get("generated_at")
+    except (OSError, ValueError):
+        return None
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class ResultCache:
+    """Byte-bounded LRU in memory, backed by Parquet files on disk.
+
+    `version_fn` returns an opaque token for the current state of the data; it is
+    re-evaluated at most every `version_ttl` seconds, by one caller at a time and
+    outside the cache lock, and the last token is kept if it fails. Entries stored
+    under a different token are treated as misses and dropped, unless `on_stale` is
+    set (see `CacheWarmer`). The disk tier holds at most `disk_max_bytes`; the least
+    recently used files go first. Cached DataFrames are shared between callers and
+    must not be modified in place.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None, version_fn=None, version_ttl=30, disk_max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.version_fn = version_fn
+        self.version_ttl = version_ttl
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()  # key -> (version, df, nbytes)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self._version_refresh = threading.Lock()
+        self._disk_bytes = None  # measured by the first write
+        self._disk_lock = threading.Lock()
+        # Set by CacheWarmer to serve stale entries while they are recomputed
+        self.on_stale = None
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    # --- Versioning ---
+    def current_version(self):
+        with self._lock:
+            version = self._version
+            due = self.version_fn is not None and (version is None or time.monotonic() - self._version_checked_at >= self.version_ttl)
+        # Only the first check waits; later ones keep the current token while one caller refreshes it
+        if due and self._version_refresh.acquire(blocking=version is None):
+            try:
+                version = self._refresh_version()
+            finally:
+                self._version_refresh.release()
+        return version or ""
+
+    def _refresh_version(self):
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._version_checked_at < self.version_ttl:
+                return self._version
+        try:
+            fetched = str(self.version_fn())
+        except Exception:
+            logger.warning("Could not fetch the data version; keeping %r", self._version, exc_info=True)
+            fetched = None
+        with self._lock:
+            if fetched is not None:
+                self._version = fetched
+            # Also after a failure, so a broken version source is retried on the same schedule
+            self._version_checked_at = time.monotonic()
+            return self._version
+
+    def invalidate(self):
+        """Forces the next lookup to re-check the data version."""
+        with self._lock:
+            self._version_checked_at = 0.0
+
+    # --- Lookup ---
+    def lookup(self, key):
+        """Returns `(df, fresh)` for `key`, or `(None, False)` if nothing is cached.
+
+        Entries from an older data version are only returned (with `fresh=False`)
+        when an `on_stale` handler is set; otherwise they are dropped.
+        """
+        version = self.current_version()
+        keep_stale = self.on_stale is not None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == version or keep_stale:
+                    self._entries.move_to_end(key)
+                    return entry[1], entry[0] == version
+                self._evict(key)
+        entry_version, df = self._read_disk(key, version, keep_stale)
+        if df is None:
+            return None, False
+        self._remember(key, entry_version, df)
+        return df, entry_version == version
+
+    def get(self, key):
+        df, fresh = self.lookup(key)
+        return df if fresh else None
+
+    def put(self, key, df, version=None):
+        """Stores `df`, replacing any previous entry for `key` in one step."""
+        version = self.current_version() if version is None else version
+        self._remember(key, version, df)
+        self._write_disk(key, version, df)
+
+    def get_or_run(self, query, run, params=None, schema=None):
+        """Returns the cached result for `query`, calling `run()` to compute it on a miss.
+
+        A stale entry is served as-is and handed to `on_stale(key, run)` to be
+        refreshed in the background.
+        """
+        key = cache_key(query, params, schema)
+        df, fresh = self.lookup(key)
+        if df is not None:
+            if not fresh:
+                self.on_stale(key, run)
+            return df
+        df = run()
+        self.put(key, df)
+        return df
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            with self._disk_lock:
+                for name in os.listdir(self.disk_dir):
+                    if name.endswith(".parquet"):
+                        os.remove(os.path.join(self.disk_dir, name))
+                self._disk_bytes = 0
+
+    # --- Memory tier ---
+    def _remember(self, key, version, df):
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            # Never let an older result replace a newer one stored meanwhile
+            current = self._entries.get(key)
+            if current is not None and current[0] == self._version and version != self._version:
+                return
+            self._evict(key)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (version, df, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    # --- Disk tier ---
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.parquet")
+
+    def _read_disk(self, key, version, keep_stale=False):
+        """Returns `(entry_version, df)` from disk, or `(None, None)` on a miss."""
+        if not self.disk_dir:
+            return None, None
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+        except (OSError, pa.ArrowInvalid):
+            return None, None
+        entry_version = (table.schema.metadata or {}).get(_VERSION_METADATA_KEY, b"").decode()
+        if entry_version != version and not keep_stale:
+            self._remove_quietly(path)
+            return None, None
+        # Marks the file as recently used for the size sweep
+        self._touch_quietly(path)
+        return entry_version, table.to_pandas()
+
+    def _write_disk(self, key, version, df):
+        if not self.disk_dir:
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_VERSION_METADATA_KEY] = version.encode()
+        table = table.replace_schema_metadata(metadata)
+        # Write to a temporary file first so readers never see a partial file
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self._path(key))
+        self._account_disk(os.path.getsize(self._path(key)))
+
+    def _account_disk(self, nbytes):
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += nbytes
+            if self._disk_bytes > self.disk_max_bytes:
+                self._sweep_disk()
+
+    def _sweep_disk(self):
+        """Deletes the least recently used files until the disk tier is down to 80% of its cap."""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= 0.8 * self.disk_max_bytes:
+                break
+            self._remove_quietly(path)
+            total -= size
+        self._disk_bytes = total
+
+    def _disk_files(self):
+        """`(mtime, size, path)` of every cached file; files removed meanwhile are skipped."""
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".parquet"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _touch_quietly(path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
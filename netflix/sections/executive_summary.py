@@ -0,0 +1,31 @@
+# sections/executive_summary.py
+
+"""Executive Summary: headline counts of movies, ratings and users."""
+
+import streamlit as st
+
+import dashboard as db
+from queries1 import executive_summary
+
+
+st.subheader("🚀 At a Glance: The State of Cinema")
+
+summary_df = db.run_query(*db.query_spec(executive_summary), section="Executive Summary")
+
+if not summary_df.empty:
+    total_movies = int(summary_df.at[0, 'total_movies'])
+    total_ratings = int(summary_df.at[0, 'total_ratings'])
+    total_users = int(summary_df.at[0, 'total_users'])
+
+    # The count-up runs in the browser, so the page renders in a single delta
+    db.animated_metrics([
+        ("Total Movies Analyzed 🍿", total_movies),
+        ("Total Ratings Submitted 🌟", total_ratings),
+        ("Unique Active Users 👥", total_users),
+    ])
+
+else:
+    st.warning("Could not fetch summary data. Please check the connection and queries.")
+
+st.markdown("---")
+st.info("💡 **Welcome!** This dashboard provides a deep dive into the MovieLens dataset. Use the sidebar to navigate through different analytical views.", icon="💎")
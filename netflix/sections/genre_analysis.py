@@ -0,0 +1,35 @@
+# sections/genre_analysis.py
+
+"""Genre Analysis: movie counts and average ratings per genre."""
+
+import plotly.express as px
+import streamlit as st
+
+import dashboard as db
+
+
+def genre_pie(df):
+    fig = px.pie(df.head(10), names='genre', values='number_of_movies', title='Top 10 Genres by Movie Count', hole=0.4)
+    fig.update_traces(textinfo='percent+label', pull=[0.05]*10)
+    return fig
+
+
+def genre_average_rating(df):
+    df = df.sort_values('average_rating', ascending=False)
+    return px.bar(df, x='genre', y='average_rating', title='Average User Rating per Genre', color='average_rating', color_continuous_scale=px.colors.sequential.Viridis)
+
+
+frames = db.section_frames("Genre Analysis")
+if frames:
+    df = frames[0]
+    st.subheader("🎭 Deep Dive into Movie Genres")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.markdown("#### 📊 Genre Distribution")
+        db.plotly_chart("genre_pie", df, genre_pie)
+    with col2:
+        st.markdown("#### ⭐ Average Rating by Genre")
+        db.plotly_chart("genre_average_rating", df, genre_average_rating)
+    st.markdown("#### 🔢 Full Genre Data")
+    df_to_display = df.sort_values('number_of_movies', ascending=False)
+    db.display_styled_dataframe(df_to_display, 'viridis', ['average_rating'], formatter={'average_rating': '{:.2f}'})
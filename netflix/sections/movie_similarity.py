@@ -0,0 +1,66 @@
+# sections/movie_similarity.py
+
+"""Similar Movies: the nearest neighbours of a movie by tag genome profile."""
+
+import os
+
+import plotly.express as px
+import streamlit as st
+
+import dashboard as db
+from instrumentation import tracer
+from similar_movies import SimilarityIndex
+
+
+@st.cache_resource
+def get_similarity_index():
+    """Top-K genome neighbours for the Similar Movies section, kept on local disk between restarts."""
+    return SimilarityIndex(
+        os.getenv("MOVIELENS_SIMILAR_DIR", os.path.join(os.path.dirname(db.__file__), ".cache", "similar_movies")),
+        k=int(os.getenv("MOVIELENS_SIMILAR_K", "50"))
+    )
+
+
+def similar_movies(df):
+    fig = px.bar(df, x='similarity', y='movie_title', orientation='h', title='Cosine Similarity of Tag Relevance', color='similarity', color_continuous_scale=px.colors.sequential.Tealgrn)
+    fig.update_layout(yaxis={'categoryorder':'total ascending'}, xaxis_title='Similarity', yaxis_title='Movie')
+    return fig
+
+
+@st.fragment
+def similar_movies_view(index, title_by_id):
+    """The movie picker and its neighbours; changing the picks reruns only this view."""
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        movie_id = st.selectbox("Movie", list(title_by_id), format_func=title_by_id.get, key="similar_movie")
+    with col2:
+        count = st.slider("Similar movies", 5, index.k, min(10, index.k), key="similar_count")
+    neighbors = index.neighbors(movie_id, count)
+    neighbors['movie_title'] = neighbors['movie_id'].map(title_by_id)
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.markdown(f"#### 🎯 Closest to {title_by_id[movie_id]}")
+        db.plotly_chart("similar_movies", neighbors, similar_movies)
+    with col2:
+        st.markdown("#### 🏷️ Defining Tags")
+        db.display_styled_dataframe(index.top_tags(movie_id), 'Greens', ['weight'], formatter={'weight': '{:.3f}'})
+    db.display_styled_dataframe(neighbors[['movie_title', 'similarity']], 'Greens', ['similarity'], formatter={'similarity': '{:.3f}'})
+
+
+frames = db.section_frames("Similar Movies")
+if frames:
+    df = frames[0]
+    st.subheader("🧬 Similar Movies: Matching Tag Genome Profiles")
+    index = get_similarity_index()
+    try:
+        # Only movies whose genome scores changed since the last data version are recomputed
+        with st.spinner("Updating the similarity index..."), tracer.span("similarity_index"):
+            index.sync(db.backend(), db.get_result_cache().current_version())
+    except Exception as e:
+        st.error(f"❌ Could not update the similarity index. Error details: {e}")
+    titles = df[[movie_id in index for movie_id in df['movie_id']]]
+    if titles.empty:
+        st.warning("The similarity index has no movies yet.")
+    else:
+        title_by_id = dict(zip(titles['movie_id'], titles['movie_title']))
+        similar_movies_view(index, title_by_id)
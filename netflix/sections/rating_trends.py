@@ -0,0 +1,26 @@
+# sections/rating_trends.py
+
+"""Rating Trends: ratings submitted per year."""
+
+import plotly.express as px
+import streamlit as st
+
+import dashboard as db
+from charts import WEBGL_MIN_POINTS, downsample
+
+
+def ratings_per_year(df):
+    df = downsample(df, 'rating_year', 'ratings_given')
+    # A filled line rather than px.area, which has no WebGL mode
+    render_mode = 'webgl' if len(df) > WEBGL_MIN_POINTS else 'svg'
+    fig = px.line(df, x='rating_year', y='ratings_given', title='Total Ratings Submitted Per Year', markers=render_mode == 'svg', render_mode=render_mode)
+    fig.update_traces(fill='tozeroy')
+    fig.update_layout(xaxis_title='Year', yaxis_title='Number of Ratings')
+    return fig
+
+
+frames = db.section_frames("Rating Trends")
+if frames:
+    st.subheader("📈 A Journey Through Time: Rating Trends")
+    # Long series are downsampled and drawn with WebGL by the builder
+    db.plotly_chart("ratings_per_year", frames[0], ratings_per_year)
@@ -0,0 +1,28 @@
+# sections/tag_analysis.py
+
+"""Tag Analysis: the most relevant genome tags and every tag page by page."""
+
+import plotly.express as px
+import streamlit as st
+
+import dashboard as db
+from queries1 import TAG_RELEVANCE_KEYSET, tag_relevance_page
+
+
+def tag_relevance(df):
+    fig = px.bar(df.head(20), x='avg_relevance', y='tag_name', orientation='h', title='Most Relevant Tags According to Users', color='avg_relevance', color_continuous_scale=px.colors.sequential.Magma)
+    fig.update_layout(yaxis={'categoryorder':'total ascending'}, xaxis_title='Average Relevance Score')
+    return fig
+
+
+frames = db.section_frames("Tag Analysis")
+if frames:
+    st.subheader("🏷️ The DNA of Movies: Tag Relevance")
+    st.markdown("#### ✨ Top 20 Most Relevant Tags")
+    db.plotly_chart("tag_relevance", frames[0], tag_relevance)
+    st.markdown("#### 🏷️ All Tags")
+    if db.is_preview():
+        # Paging needs exact keyset values, so the table waits for the exact results
+        st.caption("⏳ The full tag table appears with the exact results.")
+    else:
+        db.paginated_table(tag_relevance_page, TAG_RELEVANCE_KEYSET, 'magma', ['avg_relevance'], formatter={'avg_relevance': '{:.3f}'})
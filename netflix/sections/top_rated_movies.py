@@ -0,0 +1,40 @@
+# sections/top_rated_movies.py
+
+"""Top Rated Movies: the highest rated, the most rated and the hidden gems."""
+
+import plotly.express as px
+import streamlit as st
+
+import dashboard as db
+
+
+def highest_rated(df):
+    fig = px.bar(df, y='movie_title', x='average_rating', orientation='h', title='Top 10 by Average Score', color='average_rating', color_continuous_scale=px.colors.sequential.Cividis_r, labels={'movie_title': 'Movie', 'average_rating': 'Average Rating (out of 5)'})
+    fig.update_layout(yaxis={'categoryorder':'total ascending'})
+    return fig
+
+
+def most_popular(df):
+    fig = px.bar(df, y='movie_title', x='total_ratings', orientation='h', title='Top 10 by Number of Ratings', color='total_ratings', color_continuous_scale=px.colors.sequential.Plasma, labels={'movie_title': 'Movie', 'total_ratings': 'Number of Ratings'})
+    fig.update_layout(yaxis={'categoryorder':'total ascending'})
+    return fig
+
+
+frames = db.section_frames("Top Rated Movies")
+if frames:
+    st.subheader("🏆 The Best of the Best: Critic & Audience Picks")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### ⭐ Highest Rated Movies (Critic's Choice)")
+        db.plotly_chart("highest_rated", frames[0], highest_rated)
+    with col2:
+        st.markdown("#### 🔥 Most Popular Movies (People's Choice)")
+        db.plotly_chart("most_popular", frames[1], most_popular)
+    st.markdown("---")
+    st.markdown("#### 💎 Hidden Gems: Highly Rated, Less Seen")
+    df_hidden_gems = frames[2]
+    if not df_hidden_gems.empty:
+        st.info("These movies have excellent scores but haven't been discovered by as many people. Give them a try!", icon="💡")
+        db.display_styled_dataframe(df_hidden_gems, 'cividis', ['average_rating', 'total_ratings'], formatter={'average_rating': '{:.2f}'})
+    else:
+        st.warning("No 'Hidden Gems' found based on the current criteria.")
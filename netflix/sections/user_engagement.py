@@ -0,0 +1,27 @@
+# sections/user_engagement.py
+
+"""User Engagement: users by activity segment, the most active users and every user page by page."""
+
+import plotly.express as px
+import streamlit as st
+
+import dashboard as db
+from queries1 import USER_ENGAGEMENT_KEYSET, USER_SEGMENTS, user_engagement_page
+
+
+def user_segments(df):
+    labels = [label for _, label in USER_SEGMENTS]
+    fig = px.bar(df, x='category', y='number_of_users', title='Number of Users by Engagement Level', labels={'category': 'User Segment', 'number_of_users': 'Number of Users'}, color='category', color_discrete_sequence=px.colors.sequential.Plasma_r)
+    fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray': labels})
+    return fig
+
+
+frames = db.section_frames("User Engagement")
+if frames:
+    st.subheader("🔥 Power Users & Community Engagement")
+    st.markdown("#### 📊 User Activity Segments")
+    db.plotly_chart("user_segments", frames[0], user_segments)
+    st.markdown("#### 🏆 Top 20 Most Active Users")
+    db.display_styled_dataframe(frames[1], 'plasma', ['number_of_ratings'])
+    st.markdown("#### 👥 All Users")
+    db.paginated_table(user_engagement_page, USER_ENGAGEMENT_KEYSET, 'plasma', ['number_of_ratings'], formatter={'average_rating_given': '{:.2f}'})
@@ -0,0 +1,37 @@
+# serve.py
+
+"""Runs the dashboard with a route that streams exports to the browser.
+
+    streamlit run serve.py
+
+Serves `app1.py` as usual, plus `/export/<token>`, which sends the export a
+page registered in `exports.links` as it is encoded: the download starts with
+the first batch and memory stays at about one batch, so exports are not capped
+by size. Needs Streamlit's ASGI server (`st.App`).
+"""
+
+import os
+
+import streamlit as st
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import exports
+
+
+async def export(request):
+    found = exports.links.get(request.path_params["token"])
+    if found is None:
+        return PlainTextResponse("This export link has expired. Reload the page for a new one.", status_code=404)
+    filename, fmt, open_batches, max_rows = found
+    extension, mime = exports.EXPORT_FORMATS[fmt]
+    # A plain generator: Starlette iterates it in a worker thread, so reading the cursor never blocks the event loop
+    return StreamingResponse(
+        exports.export_chunks(open_batches(), fmt, max_rows),
+        media_type=mime,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
+
+
+exports.links.served = True
+app = st.App(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app1.py"), routes=[Route("/export/{token}", export)])
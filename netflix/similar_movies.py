@@ -0,0 +1,270 @@
+# similar_movies.py
+
+"""Movie-to-movie similarity over the tag genome, for the Similar Movies section.
+
+`fct_genome_scores` is a dense movie × tag relevance matrix. `SimilarityIndex`
+keeps it on disk as a memory-mapped float32 matrix with one L2-normalized row per
+movie, and precomputes each movie's K nearest neighbours by cosine similarity.
+The neighbours are found block by block: a block of rows is multiplied against a
+block of columns at a time and only the best K per row are carried over, so
+memory stays bounded by the block sizes rather than the number of movies.
+Looking up a movie then reads its K stored neighbours.
+
+On refresh, only movies whose per-movie score hash changed are re-read from the
+warehouse. Their rows are rewritten and their neighbours recomputed. Every other
+movie only has to check its neighbours against the changed rows.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from queries1 import QUERY_SCHEMAS, build_query, genome_score_hashes, genome_scores, genome_tags, tag_query
+
+
+DEFAULT_K = 50
+
+# Rows and columns per block of the similarity product; a block needs
+# ROW_BLOCK × (COLUMN_BLOCK + K) floats
+ROW_BLOCK = 1024
+COLUMN_BLOCK = 4096
+
+# Movies per genome_scores query (one bind parameter each)
+SCORE_BATCH = 500
+
+_META = "index.json"
+
+
+def _fetch(backend, query_func):
+    query, params = build_query(query_func)
+    return backend.run_query(query, QUERY_SCHEMAS.get(query_func.__name__), params)
+
+
+def _merge(best_idx, best_sim, cand_idx, cand_sim, k):
+    """Keeps the `k` most similar of the current best and the candidates, per row."""
+    idx = np.concatenate([best_idx, cand_idx], axis=1)
+    sim = np.concatenate([best_sim, cand_sim], axis=1)
+    if sim.shape[1] > k:
+        top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        idx, sim = np.take_along_axis(idx, top, axis=1), np.take_along_axis(sim, top, axis=1)
+    return idx, sim
+
+
+class SimilarityIndex:
+    """Genome vectors and top-K cosine neighbours, kept in `path`.
+
+    Call `sync` to build or refresh it from a query backend; `neighbors` and
+    `top_tags` only read what is already there, waiting for a running refresh.
+    """
+
+    def __init__(self, path, k=DEFAULT_K):
+        self.path = path
+        self.k = k
+        self._lock = threading.Lock()
+        self.version = None
+        self.tag_ids = np.zeros(0, dtype=np.int32)
+        self.tag_names = []
+        self.movie_ids = np.zeros(0, dtype=np.int32)
+        self.hashes = np.zeros(0, dtype=object)
+        self._rows = {}
+        self._neighbors = (np.zeros((0, k), dtype=np.int32), np.zeros((0, k), dtype=np.float32))
+        try:
+            with open(os.path.join(path, _META), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        if meta.get("k") == k:
+            self._load(meta)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self, meta):
+        self.version = meta["version"]
+        self.tag_ids = np.load(self._file("tag_ids.npy"))
+        self.tag_names = meta["tag_names"]
+        self.movie_ids = np.load(self._file("movie_ids.npy"))
+        self.hashes = np.load(self._file("hashes.npy"), allow_pickle=True)
+        self._rows = {int(movie_id): row for row, movie_id in enumerate(self.movie_ids)}
+        self._neighbors = (np.load(self._file("neighbors.npy")), np.load(self._file("similarity.npy")))
+
+    def _vectors(self, mode="r"):
+        shape = (len(self.movie_ids), len(self.tag_ids))
+        if not all(shape):
+            return np.zeros(shape, dtype=np.float32)
+        return np.memmap(self._file("vectors.f32"), dtype=np.float32, mode=mode, shape=shape)
+
+    # --- Lookups ---
+    def __contains__(self, movie_id):
+        return int(movie_id) in self._rows
+
+    def neighbors(self, movie_id, k=None):
+        """The `k` (default: all stored) movies most similar to `movie_id`, as movie_id and similarity."""
+        with self._lock:
+            row = self._rows.get(int(movie_id))
+            if row is None:
+                return pd.DataFrame({"movie_id": pd.Series(dtype="int32"), "similarity": pd.Series(dtype="float32")})
+            idx, sim = self._neighbors
+            idx, sim = idx[row, :k], sim[row, :k]
+            found = idx >= 0
+            return pd.DataFrame({"movie_id": self.movie_ids[idx[found]], "similarity": sim[found]})
+
+    def top_tags(self, movie_id, n=10):
+        """The `n` genome tags weighing most in `movie_id`'s normalized profile."""
+        with self._lock:
+            row = self._rows.get(int(movie_id))
+            if row is None:
+                return pd.DataFrame({"tag_name": [], "weight": []})
+            vector = np.asarray(self._vectors()[row])
+            top = np.argsort(-vector, kind="stable")[:n]
+            return pd.DataFrame({"tag_name": [self.tag_names[i] for i in top], "weight": vector[top]})
+
+    # --- Refresh ---
+    def sync(self, backend, version):
+        """Brings the index up to date with `backend` unless it was last synced at `version`.
+
+        Returns the number of movies whose vectors were (re)computed.
+        """
+        version = json.dumps(version, default=str)
+        with self._lock:
+            if version == self.version:
+                return 0
+            changed = self._refresh(backend)
+            self.version = version
+            self._save()
+            return changed
+
+    def _refresh(self, backend):
+        os.makedirs(self.path, exist_ok=True)
+        tags = _fetch(backend, genome_tags)
+        hashes = _fetch(backend, genome_score_hashes).sort_values("movie_id")
+        tag_ids = tags["tag_id"].to_numpy(dtype=np.int32)
+        known = pd.Series(np.arange(len(self.movie_ids)), index=self.movie_ids)
+        rows = known.reindex(hashes["movie_id"].to_numpy()).to_numpy()
+        removed = len(self.movie_ids) - np.count_nonzero(~np.isnan(rows))
+        if not np.array_equal(tag_ids, self.tag_ids) or removed:
+            # New tag columns or dropped movies change every row's shape or position
+            return self._rebuild(backend, tags, hashes)
+        is_new = np.isnan(rows)
+        stale = is_new.copy()
+        stale[~is_new] = self.hashes[rows[~is_new].astype(np.int64)] != hashes["scores_hash"].to_numpy()[~is_new]
+        if not stale.any():
+            return 0
+        new_ids = hashes["movie_id"].to_numpy(dtype=np.int32)[is_new]
+        self.movie_ids = np.concatenate([self.movie_ids, new_ids])
+        self.hashes = np.concatenate([self.hashes, np.zeros(len(new_ids), dtype=object)])
+        self._rows = {int(movie_id): row for row, movie_id in enumerate(self.movie_ids)}
+        self._resize_vectors()
+        changed_ids = hashes["movie_id"].to_numpy(dtype=np.int32)[stale]
+        self._load_vectors(backend, changed_ids, hashes)
+        self._update_neighbors(np.array([self._rows[int(movie_id)] for movie_id in changed_ids]))
+        return len(changed_ids)
+
+    def _rebuild(self, backend, tags, hashes):
+        self.tag_ids = tags["tag_id"].to_numpy(dtype=np.int32)
+        self.tag_names = tags["tag_name"].astype(str).tolist()
+        self.movie_ids = hashes["movie_id"].to_numpy(dtype=np.int32)
+        self.hashes = np.zeros(len(self.movie_ids), dtype=object)
+        self._rows = {int(movie_id): row for row, movie_id in enumerate(self.movie_ids)}
+        if os.path.exists(self._file("vectors.f32")):
+            os.remove(self._file("vectors.f32"))
+        self._resize_vectors()
+        self._load_vectors(backend, self.movie_ids, hashes)
+        self._neighbors = self._top_k(np.arange(len(self.movie_ids)))
+        return len(self.movie_ids)
+
+    def _resize_vectors(self):
+        size = len(self.movie_ids) * len(self.tag_ids) * np.dtype(np.float32).itemsize
+        with open(self._file("vectors.f32"), "ab") as f:
+            f.truncate(size)
+
+    def _load_vectors(self, backend, movie_ids, hashes):
+        """Reads the scores of `movie_ids` in batches and writes their normalized rows."""
+        vectors = self._vectors(mode="r+")
+        new_hashes = hashes.set_index("movie_id")["scores_hash"]
+        for start in range(0, len(movie_ids), SCORE_BATCH):
+            batch = movie_ids[start:start + SCORE_BATCH]
+            params = {f"movie_{i}": int(movie_id) for i, movie_id in enumerate(batch)}
+            query = tag_query("genome_scores", genome_scores(batch))
+            scores = backend.run_query(query, QUERY_SCHEMAS["genome_scores"], params)
+            rows = np.array([self._rows[int(movie_id)] for movie_id in batch])
+            block = np.zeros((len(batch), len(self.tag_ids)), dtype=np.float32)
+            position = pd.Series(np.arange(len(batch)), index=batch)
+            block[
+                position.loc[scores["movie_id"].to_numpy()].to_numpy(),
+                np.searchsorted(self.tag_ids, scores["tag_id"].to_numpy()),
+            ] = scores["relevance_score"].to_numpy()
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            vectors[rows] = np.divide(block, norms, out=np.zeros_like(block), where=norms > 0)
+            self.hashes[rows] = new_hashes.loc[batch].to_numpy()
+        vectors.flush()
+
+    # --- Neighbours ---
+    def _top_k(self, rows):
+        """Top-K neighbours of `rows` against every movie, computed block by block."""
+        vectors = self._vectors()
+        n, k = len(self.movie_ids), self.k
+        all_idx = np.full((len(rows), k), -1, dtype=np.int32)
+        all_sim = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        for r0 in range(0, len(rows), ROW_BLOCK):
+            block_rows = rows[r0:r0 + ROW_BLOCK]
+            queries = np.asarray(vectors[block_rows])
+            best_idx, best_sim = all_idx[r0:r0 + ROW_BLOCK], all_sim[r0:r0 + ROW_BLOCK]
+            for c0 in range(0, n, COLUMN_BLOCK):
+                sim = queries @ np.asarray(vectors[c0:c0 + COLUMN_BLOCK]).T
+                own = (block_rows >= c0) & (block_rows < c0 + sim.shape[1])
+                sim[np.flatnonzero(own), block_rows[own] - c0] = -np.inf
+                cand = np.broadcast_to(np.arange(c0, c0 + sim.shape[1], dtype=np.int32), sim.shape)
+                best_idx, best_sim = _merge(best_idx, best_sim, cand, sim, k)
+            all_idx[r0:r0 + ROW_BLOCK], all_sim[r0:r0 + ROW_BLOCK] = best_idx, best_sim
+        return self._sorted(all_idx, all_sim)
+
+    @staticmethod
+    def _sorted(idx, sim):
+        order = np.argsort(-sim, axis=1, kind="stable")
+        idx, sim = np.take_along_axis(idx, order, axis=1), np.take_along_axis(sim, order, axis=1)
+        idx[~np.isfinite(sim)] = -1
+        return idx, sim
+
+    def _update_neighbors(self, changed):
+        """Recomputes the neighbours of `changed` rows and patches everyone else's."""
+        vectors = self._vectors()
+        n, k = len(self.movie_ids), self.k
+        old_idx, old_sim = self._neighbors
+        idx = np.full((n, k), -1, dtype=np.int32)
+        sim = np.full((n, k), -np.inf, dtype=np.float32)
+        idx[:len(old_idx)], sim[:len(old_sim)] = old_idx, old_sim
+        is_changed = np.zeros(n, dtype=bool)
+        is_changed[changed] = True
+        changed_vectors = np.asarray(vectors[changed])
+        recompute = []
+        for r0 in range(0, n, ROW_BLOCK):
+            block = np.arange(r0, min(r0 + ROW_BLOCK, n))
+            block = block[~is_changed[block]]
+            # A changed movie among the stored neighbours may have dropped out, and
+            # the row's K+1th neighbour is unknown, so those rows start over
+            stale = (is_changed[np.maximum(idx[block], 0)] & (idx[block] >= 0)).any(axis=1)
+            recompute.append(block[stale])
+            block = block[~stale]
+            cand_sim = np.asarray(vectors[block]) @ changed_vectors.T
+            cand_idx = np.broadcast_to(changed.astype(np.int32), cand_sim.shape)
+            idx[block], sim[block] = self._sorted(*_merge(idx[block], sim[block], cand_idx, cand_sim, k))
+        rows = np.concatenate([changed] + recompute)
+        idx[rows], sim[rows] = self._top_k(rows)
+        self._neighbors = (idx, sim)
+
+    def _save(self):
+        idx, sim = self._neighbors
+        np.save(self._file("tag_ids.npy"), self.tag_ids)
+        np.save(self._file("movie_ids.npy"), self.movie_ids)
+        np.save(self._file("hashes.npy"), self.hashes, allow_pickle=True)
+        np.save(self._file("neighbors.npy"), idx)
+        np.save(self._file("similarity.npy"), sim)
+        # Written last, so an interrupted refresh is redone on the next start
+        tmp = self._file(_META + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"k": self.k, "version": self.version, "tag_names": self.tag_names}, f)
+        os.replace(tmp, self._file(_META))
@@ -0,0 +1,6 @@
+-- Only the ratings of the latest load; use --vars '{profile_full: true}' for the whole table
+{{ profile_columns(
+    ref('fct_ratings'),
+    checks={'rating': 'rating BETWEEN 0.5 AND 5'},
+    incremental_column='loaded_at'
+) }}
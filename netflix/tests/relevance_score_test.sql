@@ -1,8 +1,2 @@
--- SELECT
---     movie_id,
---     tag_id,
---     relevance_score
--- FROM {{ ref('fct_genome_scores') }}
--- WHERE relevance_score <= 0
-
-{{ no_nulls_in_columns(ref('fct_genome_scores'))}}
\ No newline at end of file
+-- Nulls in any column and non-positive relevance scores, in one scan
+{{ profile_columns(ref('fct_genome_scores'), checks={'relevance_score': 'relevance_score > 0'}) }}
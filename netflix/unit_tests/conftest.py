@@ -0,0 +1,36 @@
+# unit_tests/conftest.py
+
+"""Makes the dashboard's top-level modules importable when running `python -m pytest unit_tests`.
+
+dbt owns `tests/`, so the Python tests live here instead.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: drives the whole app or spawns interpreters; deselect with -m 'not slow'")
+
+
+@pytest.fixture(scope="session")
+def bench_dir(tmp_path_factory):
+    """A benchmark work directory holding ml-100k synthetic data and its model exports, built once per run."""
+    from benchmarks import synthetic
+    from benchmarks.run import benchmark_models
+
+    work_dir = tmp_path_factory.mktemp("bench")
+    scale_dir = os.path.join(work_dir, "ml-100k-seed42")
+    synthetic.generate("ml-100k", os.path.join(scale_dir, "raw"), 42)
+    benchmark_models(os.path.join(scale_dir, "raw"), os.path.join(scale_dir, "models"))
+    return str(work_dir)
+
+
+@pytest.fixture(scope="session")
+def exports_dir(bench_dir):
+    """Parquet exports of the dbt models over ml-100k synthetic data, as the local backends read them."""
+    return os.path.join(bench_dir, "ml-100k-seed42", "models")
@@ -0,0 +1,65 @@
+# unit_tests/test_approximate.py
+
+"""Approximate preview versions of the slow queries and their DuckDB translation."""
+
+import pytest
+
+import queries1
+from backends import DuckDBBackend, to_duckdb_sql
+from queries1 import APPROXIMATE_QUERIES, build_query, query_id
+
+
+@pytest.mark.parametrize("snowflake, duckdb", [
+    ("APPROX_PERCENTILE(total_ratings, 0.5)", "approx_quantile(total_ratings, 0.5)"),
+    ("FROM fct_genome_scores gs SAMPLE SYSTEM (10)", "FROM fct_genome_scores gs TABLESAMPLE SYSTEM (10%)"),
+])
+def test_approximate_constructs_are_rewritten(snowflake, duckdb):
+    assert to_duckdb_sql(snowflake) == duckdb
+
+
+def test_only_listed_queries_have_an_approximate_version():
+    with pytest.raises(ValueError):
+        build_query(queries1.most_popular_movies, approximate=True)
+
+
+@pytest.mark.parametrize("name", sorted(APPROXIMATE_QUERIES))
+def test_approximate_version_is_a_different_query_with_the_same_id(name):
+    query_func = getattr(queries1, name)
+
+    exact, exact_params = build_query(query_func)
+    approximate, params = build_query(query_func, approximate=True)
+
+    # Cached apart from the exact result, answered by the same handlers
+    assert approximate != exact
+    assert params == exact_params
+    assert query_id(approximate) == query_id(exact) == name
+
+
+@pytest.fixture(scope="module")
+def duckdb_backend(exports_dir):
+    backend = DuckDBBackend(exports_dir)
+    yield backend
+    backend.close()
+
+
+def run(backend, query_func, approximate):
+    query, params = build_query(query_func, approximate=approximate)
+    return backend.run_query(query, queries1.QUERY_SCHEMAS.get(query_func.__name__), params)
+
+
+def test_sampled_tag_relevance_is_close_to_the_exact_one(duckdb_backend):
+    exact = run(duckdb_backend, queries1.tag_relevance_analysis, approximate=False)
+    preview = run(duckdb_backend, queries1.tag_relevance_analysis, approximate=True)
+
+    both = exact.merge(preview, on="tag_name", suffixes=("", "_preview"))
+    assert len(both) == len(exact)
+    assert (both["avg_relevance"] - both["avg_relevance_preview"]).abs().max() < 0.15
+    assert (both["movies_tagged_preview"] / both["movies_tagged"]).between(0.5, 2).all()
+
+
+def test_approximate_median_keeps_the_hidden_gems(duckdb_backend):
+    exact = run(duckdb_backend, queries1.hidden_gems, approximate=False)
+    preview = run(duckdb_backend, queries1.hidden_gems, approximate=True)
+
+    assert len(preview) == len(exact) > 0
+    assert len(set(preview["movie_title"]) & set(exact["movie_title"])) >= len(exact) // 2
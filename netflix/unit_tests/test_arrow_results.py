@@ -0,0 +1,68 @@
+# unit_tests/test_arrow_results.py
+
+"""Arrow results converted to pandas with the dtypes each query declares."""
+
+from decimal import Decimal
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import queries1
+from backends import DuckDBBackend, arrow_to_frame
+from benchmarks.run import dashboard_queries
+
+
+def test_declared_types_are_applied():
+    table = pa.table({
+        "USER_ID": pa.array([1, 2], pa.int64()),
+        "AVERAGE": pa.array([3.5, 4.0], pa.float64()),
+        "TITLE": pa.array(["A", "A"]),
+    })
+
+    df = arrow_to_frame(table, {"user_id": "int32", "average": "float32", "title": "category"})
+
+    assert list(df.columns) == ["user_id", "average", "title"]
+    assert df.dtypes.astype(str).tolist() == ["int32", "float32", "category"]
+    assert list(df["title"].cat.categories) == ["A"]
+
+
+def test_undeclared_decimals_become_floats():
+    table = pa.table({"total": pa.array([Decimal("1.50"), None], pa.decimal128(10, 2)), "n": pa.array([1, 2], pa.int64())})
+
+    df = arrow_to_frame(table)
+
+    assert df.dtypes.astype(str).tolist() == ["float64", "int64"]
+    assert df["total"].iloc[0] == 1.5
+
+
+def test_unknown_declared_type_is_an_error():
+    with pytest.raises(KeyError):
+        arrow_to_frame(pa.table({"a": [1]}), {"a": "decimal"})
+
+
+@pytest.fixture(scope="module")
+def duckdb_backend(exports_dir):
+    backend = DuckDBBackend(exports_dir)
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize("query_func", dashboard_queries(), ids=lambda func: func.__name__)
+def test_declared_schemas_match_the_results(duckdb_backend, query_func):
+    schema = queries1.QUERY_SCHEMAS.get(query_func.__name__, {})
+    query, params = queries1.build_query(query_func)
+
+    df = duckdb_backend.run_query(query, schema, params)
+
+    assert set(schema) <= set(df.columns)
+    for column, dtype in schema.items():
+        if dtype == "string":
+            # object or pandas' own string dtype, depending on the pandas version
+            assert pd.api.types.is_string_dtype(df[column]), column
+        else:
+            assert str(df[column].dtype) == dtype, column
+    # Only text may come back as Python objects
+    for column in df.columns:
+        if df[column].dtype == object:
+            assert df[column].dropna().map(type).eq(str).all(), column
@@ -0,0 +1,48 @@
+# unit_tests/test_backends.py
+
+"""The Snowflake-to-DuckDB rewrites and the local DuckDB backend."""
+
+import pytest
+
+import queries1
+from backends import DuckDBBackend, create_backend, to_duckdb_sql
+from benchmarks.run import dashboard_queries
+
+
+# --- Dialect ---
+@pytest.mark.parametrize("snowflake, duckdb", [
+    ("FROM dim_movies m, LATERAL FLATTEN(input => SPLIT(m.genres, '|')) g",
+     "FROM dim_movies m, UNNEST(string_split(m.genres, '|')) AS g(value)"),
+    ("EXTRACT(YEAR FROM r.rating_timestamp)", "year(r.rating_timestamp)"),
+    ("FROM MOVIELENS.DEV.fct_ratings", "FROM fct_ratings"),
+])
+def test_snowflake_constructs_are_rewritten(snowflake, duckdb):
+    assert to_duckdb_sql(snowflake) == duckdb
+
+
+# --- DuckDB backend ---
+@pytest.fixture(scope="module")
+def duckdb_backend(exports_dir):
+    backend = DuckDBBackend(exports_dir)
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize("query_func", dashboard_queries(), ids=lambda func: func.__name__)
+def test_every_dashboard_query_runs_locally(duckdb_backend, query_func):
+    query, params = queries1.build_query(query_func)
+
+    df = duckdb_backend.run_query(query, queries1.QUERY_SCHEMAS.get(query_func.__name__), params)
+
+    assert len(df) > 0
+    assert all(column == column.lower() for column in df.columns)
+
+
+def test_missing_exports_are_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="fct_ratings"):
+        DuckDBBackend(str(tmp_path))
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_backend("oracle")
@@ -0,0 +1,69 @@
+# unit_tests/test_benchmarks.py
+
+"""Synthetic data generation and the benchmark regression check."""
+
+import os
+
+import pyarrow.parquet as pq
+
+from benchmarks import synthetic
+from benchmarks.run import MIN_COMPARABLE_MS, compare
+
+
+def raw_dir(bench_dir):
+    return os.path.join(bench_dir, "ml-100k-seed42", "raw")
+
+
+def test_generated_tables_follow_the_scale(bench_dir):
+    spec = synthetic.SCALES["ml-100k"]
+
+    ratings = pq.read_table(os.path.join(raw_dir(bench_dir), "raw_ratings.parquet"))
+    movies = pq.read_table(os.path.join(raw_dir(bench_dir), "raw_movies.parquet"))
+
+    assert ratings.num_rows == spec["ratings"]
+    assert movies.num_rows == spec["movies"]
+    assert len(set(ratings.column("userId").to_pylist())) <= spec["users"]
+
+
+def test_same_seed_gives_the_same_files(bench_dir, tmp_path):
+    assert synthetic.generate("ml-100k", str(tmp_path), 42)
+
+    for table in synthetic.RAW_TABLES:
+        path = f"{table}.parquet"
+        assert pq.read_table(tmp_path / path).equals(pq.read_table(os.path.join(raw_dir(bench_dir), path))), table
+
+
+def test_other_seed_gives_other_data(bench_dir, tmp_path):
+    synthetic.generate("ml-100k", str(tmp_path), 7)
+
+    assert not pq.read_table(tmp_path / "raw_ratings.parquet").equals(pq.read_table(os.path.join(raw_dir(bench_dir), "raw_ratings.parquet")))
+
+
+def test_existing_data_is_reused(bench_dir):
+    assert not synthetic.generate("ml-100k", raw_dir(bench_dir), 42)
+
+
+def test_model_exports_hold_every_rating(exports_dir):
+    assert pq.read_metadata(os.path.join(exports_dir, "fct_ratings.parquet")).num_rows == synthetic.SCALES["ml-100k"]["ratings"]
+
+
+def step(name, median_ms, rows_scanned=1000):
+    return {"kind": "query", "name": name, "latency_ms": {"median": median_ms}, "rows_scanned": rows_scanned}
+
+
+def test_compare_flags_slower_and_wider_steps():
+    baseline = {"results": [step("a", 100), step("b", 100), step("c", 100)]}
+    report = {"results": [step("a", 120), step("b", 130), step("c", 100, rows_scanned=2000), step("new", 500)]}
+
+    regressions = compare(report, baseline, tolerance=0.25)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("query b: median latency")
+    assert regressions[1].startswith("query c: rows scanned")
+
+
+def test_compare_ignores_steps_too_fast_to_time():
+    fast = MIN_COMPARABLE_MS / 2
+    baseline = {"results": [step("a", fast)]}
+
+    assert compare({"results": [step("a", fast * 3)]}, baseline, tolerance=0.25) == []
@@ -0,0 +1,122 @@
+# unit_tests/test_cache_warmer.py
+
+"""Stale-while-revalidate refreshes by `CacheWarmer`."""
+
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from cache_warmer import CacheWarmer
+from result_cache import ResultCache, cache_key
+
+
+class Data:
+    """A data version and a query whose answer follows it."""
+
+    def __init__(self):
+        self.version = "v1"
+        self.runs = 0
+
+    def run(self):
+        self.runs += 1
+        return pd.DataFrame({"version": [self.version]})
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def data():
+    return Data()
+
+
+@pytest.fixture
+def cache(data):
+    return ResultCache(version_fn=lambda: data.version, version_ttl=0)
+
+
+@pytest.fixture
+def warmer(cache):
+    warmer = CacheWarmer(cache, interval=3600, poll_interval=0.01)
+    yield warmer
+    warmer.stop(timeout=10)
+
+
+def test_registered_queries_are_filled_on_start(cache, data, warmer):
+    key = warmer.register("SELECT version", data.run)
+
+    warmer.start()
+
+    wait_until(lambda: cache.get(key) is not None)
+    assert cache.get(key)["version"].tolist() == ["v1"]
+
+
+def test_stale_result_is_served_while_it_is_refreshed(cache, data, warmer):
+    key = cache_key("SELECT version")
+    cache.put(key, data.run())
+    warmer.start()
+    data.version = "v2"
+
+    stale = cache.get_or_run("SELECT version", data.run)
+
+    # Answered from the cache without running the query, then refreshed in the background
+    assert stale["version"].tolist() == ["v1"]
+    wait_until(lambda: cache.get(key) is not None)
+    assert cache.get(key)["version"].tolist() == ["v2"]
+    assert data.runs == 2
+
+
+def test_new_data_version_refreshes_registered_queries(cache, data, warmer):
+    key = warmer.register("SELECT version", data.run)
+    warmer.start()
+    wait_until(lambda: cache.get(key) is not None)
+
+    data.version = "v2"
+
+    wait_until(lambda: cache.get(key) is not None)
+    assert cache.get(key)["version"].tolist() == ["v2"]
+
+
+def test_repeated_refreshes_of_a_key_run_once(cache, data, warmer):
+    release = threading.Event()
+    runs = []
+
+    def slow_run():
+        runs.append(None)
+        release.wait(10)
+        return data.run()
+
+    key = cache_key("SELECT version")
+    for _ in range(5):
+        warmer.refresh(key, slow_run)
+    warmer.start()
+    wait_until(lambda: runs)
+    warmer.refresh(key, slow_run)
+    release.set()
+
+    wait_until(lambda: cache.get(key) is not None)
+    assert len(runs) == 1
+
+
+def test_failed_refresh_keeps_the_previous_result(cache, data, warmer):
+    key = cache_key("SELECT version")
+    cache.put(key, data.run())
+    data.version = "v2"
+
+    def failing_run():
+        raise RuntimeError("warehouse unavailable")
+
+    warmer.refresh(key, failing_run)
+    warmer.start()
+
+    wait_until(lambda: not warmer._pending)
+    df, fresh = cache.lookup(key)
+    assert df["version"].tolist() == ["v1"]
+    assert not fresh
@@ -0,0 +1,100 @@
+# unit_tests/test_charts.py
+
+"""LTTB downsampling, data fingerprints and the figure cache."""
+
+import numpy as np
+import pandas as pd
+
+from charts import ChartCache, _gradient_lut, downsample, frame_fingerprint, gradient_styles, lttb
+
+
+# --- Downsampling ---
+def test_lttb_keeps_the_ends_and_the_requested_number_of_points():
+    x = np.arange(10_000)
+    y = np.sin(x / 500)
+
+    kept = lttb(x, y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(5_000)
+    y = np.zeros(len(x))
+    y[1234], y[3777] = 100, -50
+
+    kept = lttb(x, y, 50)
+
+    assert {1234, 3777} <= set(kept.tolist())
+
+
+def test_lttb_leaves_short_series_alone():
+    assert lttb(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+    assert lttb(np.arange(10), np.arange(10), 2).tolist() == list(range(10))
+
+
+def test_downsample_sorts_and_reduces_long_frames():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"year": rng.permutation(5_000), "ratings": rng.integers(0, 1_000, 5_000)})
+
+    reduced = downsample(df, "year", "ratings", max_points=300)
+
+    assert len(reduced) == 300
+    assert reduced["year"].is_monotonic_increasing
+    assert reduced["year"].iloc[0] == 0 and reduced["year"].iloc[-1] == 4_999
+    assert len(downsample(df.head(100), "year", "ratings", max_points=300)) == 100
+
+
+# --- Caching ---
+def test_fingerprint_follows_values_dtypes_and_labels():
+    df = pd.DataFrame({"genre": ["Drama", "Comedy"], "movies": [10, 20]})
+
+    assert frame_fingerprint(df) == frame_fingerprint(df.copy())
+    assert frame_fingerprint(df) != frame_fingerprint(df.assign(movies=[10, 21]))
+    assert frame_fingerprint(df) != frame_fingerprint(df.astype({"movies": "float64"}))
+    assert frame_fingerprint(df) != frame_fingerprint(df.rename(columns={"movies": "titles"}))
+    assert frame_fingerprint(df) != frame_fingerprint(df.set_axis([1, 2]))
+
+
+def test_figures_are_rebuilt_only_when_the_data_changes():
+    cache = ChartCache()
+    builds = []
+
+    def build(df):
+        builds.append(len(df))
+        return object()
+
+    df = pd.DataFrame({"year": [2000, 2001], "ratings": [5, 7]})
+    first = cache.get_or_build("trend", df, build)
+
+    assert cache.get_or_build("trend", df.copy(), build) is first
+    assert cache.get_or_build("trend", df.assign(ratings=[5, 8]), build) is not first
+    assert cache.get_or_build("other", df, build) is not first
+    assert len(builds) == 3
+
+
+def test_least_recently_used_figures_are_evicted():
+    cache = ChartCache(max_entries=2)
+    frames = [pd.DataFrame({"n": [i]}) for i in range(3)]
+    cache.get_or_build("chart", frames[0], lambda df: "a")
+    cache.get_or_build("chart", frames[1], lambda df: "b")
+    cache.get_or_build("chart", frames[0], lambda df: "a")
+
+    cache.get_or_build("chart", frames[2], lambda df: "c")
+
+    assert cache.get_or_build("chart", frames[0], lambda df: "rebuilt") == "a"
+    assert cache.get_or_build("chart", frames[1], lambda df: "rebuilt") == "rebuilt"
+
+
+# --- Table gradients ---
+def test_gradient_spans_each_column_and_skips_missing_values():
+    df = pd.DataFrame({"rating": [1.0, 3.0, np.nan, 5.0], "count": [7, 7, 7, 7]})
+    lut = _gradient_lut("Viridis")
+
+    styles = gradient_styles(df, "Viridis", ["rating", "count"])
+
+    assert styles["rating"].tolist() == [lut[0], lut[128], "", lut[-1]]
+    # A constant column gets the low end of the scale
+    assert set(styles["count"]) == {lut[0]}
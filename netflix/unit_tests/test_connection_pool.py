@@ -0,0 +1,125 @@
+# unit_tests/test_connection_pool.py
+
+"""Checkout, reuse and replacement of pooled connections."""
+
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool
+
+
+class ProgrammingError(Exception):
+    """Stands in for the driver's error for a bad query."""
+
+
+class SessionExpired(Exception):
+    errno = 390114
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnector:
+    def __init__(self):
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def make_pool(connector, **kwargs):
+    kwargs.setdefault("health_check", lambda conn: None)
+    return ConnectionPool(connector.connect, query_errors=ProgrammingError, **kwargs)
+
+
+def fail_with(error):
+    def fn(conn):
+        raise error
+    return fn
+
+
+def test_query_error_returns_connection_to_pool():
+    connector = FakeConnector()
+    pool = make_pool(connector)
+
+    with pytest.raises(ProgrammingError):
+        pool.run(fail_with(ProgrammingError("syntax error")))
+
+    assert pool.run(lambda conn: conn) is connector.opened[0]
+    assert not connector.opened[0].closed
+
+
+def test_broken_connection_is_closed_and_replaced():
+    connector = FakeConnector()
+    pool = make_pool(connector)
+
+    with pytest.raises(ConnectionResetError):
+        pool.run(fail_with(ConnectionResetError("connection reset by peer")))
+
+    assert connector.opened[0].closed
+    assert pool.run(lambda conn: conn) is connector.opened[1]
+
+
+def test_expired_session_drops_idle_connections_and_retries_once():
+    connector = FakeConnector()
+    pool = make_pool(connector, size=2)
+    # Two idle connections from the same login
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    calls = []
+
+    def expires_once(conn):
+        calls.append(conn)
+        if len(calls) == 1:
+            raise SessionExpired("session token expired")
+        return conn
+
+    conn = pool.run(expires_once)
+
+    assert first.closed and second.closed
+    assert conn is connector.opened[2]
+    assert len(calls) == 2
+
+
+def test_idle_connection_failing_its_health_check_is_replaced():
+    connector = FakeConnector()
+
+    def health_check(conn):
+        raise ConnectionResetError
+
+    pool = make_pool(connector, check_after=0, health_check=health_check)
+    pool.release(pool.acquire())
+
+    assert pool.run(lambda conn: conn) is connector.opened[1]
+    assert connector.opened[0].closed
+
+
+def test_checkout_times_out_when_every_connection_is_busy():
+    connector = FakeConnector()
+    pool = make_pool(connector, size=1, checkout_timeout=0.1)
+    held = pool.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    assert time.monotonic() - start < 1
+
+    # The failed wait took no slot: a waiter gets the connection once it is released
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(pool.run(lambda conn: conn)))
+    pool.checkout_timeout = 5
+    waiter.start()
+    pool.release(held)
+    waiter.join()
+    assert result == [held]
@@ -0,0 +1,34 @@
+# unit_tests/test_executor.py
+
+"""Result handling of `QueryExecutor`."""
+
+import pandas as pd
+
+from backends import QueryBackend
+from executor import QueryExecutor
+from result_cache import ResultCache
+
+
+class FrameBackend(QueryBackend):
+    name = "frames"
+
+    def __init__(self):
+        self.runs = 0
+
+    def run_query(self, query, schema=None, params=None):
+        self.runs += 1
+        return pd.DataFrame({"n": [self.runs]})
+
+
+class BrokenCache(ResultCache):
+    def put(self, key, df, version=None):
+        raise OSError("disk full")
+
+
+def test_result_is_delivered_when_caching_it_fails():
+    executor = QueryExecutor(FrameBackend(), BrokenCache())
+
+    df = executor.submit("SELECT 1").result(timeout=10)
+
+    assert df["n"].tolist() == [1]
+    assert not executor._inflight
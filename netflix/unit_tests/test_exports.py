@@ -0,0 +1,94 @@
+# unit_tests/test_exports.py
+
+"""Row and byte caps of `export_chunks`, and the links the streaming route serves."""
+
+import io
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+from exports import ExportLinks, export_bytes, export_chunks
+
+
+def batches(count, rows=1000, closed=None):
+    try:
+        for i in range(count):
+            start = i * rows
+            yield pa.record_batch({"user_id": pa.array(range(start, start + rows)), "title": pa.array(["x" * 40] * rows)})
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_whole_result_round_trips(fmt):
+    data = b"".join(export_chunks(batches(3), fmt))
+
+    table = pa_csv.read_csv(io.BytesIO(data)) if fmt == "csv" else pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 3000
+    assert table.column("user_id").to_pylist() == list(range(3000))
+
+
+def test_yields_a_chunk_per_batch():
+    chunks = list(export_chunks(batches(4), "csv"))
+
+    # One per batch, then whatever the writer flushes on close
+    assert len(chunks) == 5
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_row_cap_cuts_the_last_batch_and_closes_the_cursor(fmt):
+    closed = []
+
+    data = b"".join(export_chunks(batches(10, closed=closed), fmt, max_rows=2500))
+
+    table = pa_csv.read_csv(io.BytesIO(data)) if fmt == "csv" else pq.read_table(io.BytesIO(data))
+    assert table.num_rows == 2500
+    assert closed == [True]
+
+
+def test_byte_cap_ends_near_the_cap():
+    closed = []
+    cap = 200_000
+
+    data = b"".join(export_chunks(batches(50, closed=closed), "csv", max_bytes=cap))
+
+    # Cut by the bytes per row so far, so it ends within a few rows of the cap rather than a batch past it
+    assert cap * 0.95 <= len(data) <= cap * 1.05
+    assert pa_csv.read_csv(io.BytesIO(data)).num_rows < 50_000
+    assert closed == [True]
+
+
+def test_empty_result_is_an_empty_file():
+    assert export_bytes(iter([]), "csv") == b""
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        export_bytes(batches(1), "xlsx")
+
+
+def test_links_keep_their_token_across_reruns():
+    links = ExportLinks()
+    first = links.register(("q", "[]", "csv"), "users", "csv", lambda: batches(1), 10)
+
+    again = links.register(("q", "[]", "csv"), "users", "csv", lambda: batches(1), 10)
+
+    assert again == first
+    assert links.register(("q", "[]", "parquet"), "users", "parquet", lambda: batches(1)) != first
+    filename, fmt, _, max_rows = links.get(first)
+    assert (filename, fmt, max_rows) == ("users", "csv", 10)
+
+
+def test_least_recently_offered_links_expire():
+    links = ExportLinks(max_links=2)
+    first = links.register("a", "a", "csv", None)
+    second = links.register("b", "b", "csv", None)
+    links.register("a", "a", "csv", None)
+
+    links.register("c", "c", "csv", None)
+
+    assert links.get(first) is not None
+    assert links.get(second) is None
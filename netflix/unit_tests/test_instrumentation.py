@@ -0,0 +1,89 @@
+# unit_tests/test_instrumentation.py
+
+"""Spans recorded by `Tracer` and the query spans the backends add to a page's trace."""
+
+import json
+import threading
+
+import pytest
+
+import queries1
+from backends import DuckDBBackend
+from instrumentation import NULL_SPAN, Tracer, tracer
+
+
+def test_disabled_tracer_hands_out_the_null_span():
+    off = Tracer(enabled=False)
+
+    with off.span("execute") as span:
+        span.set(rows=1)
+
+    assert span is NULL_SPAN
+    assert not span
+    assert off.spans() == []
+
+
+def test_nested_spans_share_the_trace_of_the_current_span():
+    on = Tracer(enabled=True)
+
+    with on.span("page") as page:
+        with on.span("execute", backend="duckdb") as execute:
+            execute.set(rows=3)
+    with on.span("other") as other:
+        pass
+
+    assert [s.name for s in on.spans()] == ["execute", "page", "other"]
+    assert execute.trace_id == page.trace_id and execute.parent_id == page.span_id
+    assert other.trace_id != page.trace_id
+    assert execute.attrs == {"backend": "duckdb", "rows": 3}
+    assert [s.name for s in on.spans(page.trace_id)] == ["execute", "page"]
+
+
+def test_failed_stage_records_its_error():
+    on = Tracer(enabled=True)
+
+    with pytest.raises(ValueError):
+        with on.span("fetch"):
+            raise ValueError("bad chunk")
+
+    assert on.spans()[0].attrs["error"] == "ValueError('bad chunk')"
+
+
+def test_span_can_be_ended_by_another_thread_once():
+    on = Tracer(enabled=True)
+    span = on.span("execute")
+
+    thread = threading.Thread(target=span.end)
+    thread.start()
+    thread.join()
+    span.end()
+
+    assert on.spans() == [span]
+    assert span.duration_ms >= 0
+
+
+def test_spans_are_appended_to_the_log(tmp_path):
+    log = tmp_path / "trace.jsonl"
+    on = Tracer(enabled=True, log_path=str(log))
+
+    with on.span("execute", query_id="01ab"):
+        pass
+
+    record = json.loads(log.read_text().splitlines()[0])
+    assert record["name"] == "execute" and record["query_id"] == "01ab"
+
+
+def test_background_queries_join_the_page_trace(exports_dir, monkeypatch):
+    monkeypatch.setattr(tracer, "enabled", True)
+    backend = DuckDBBackend(exports_dir)
+    try:
+        with tracer.span("page") as page:
+            query, params = queries1.build_query(queries1.most_active_users)
+            backend.submit(query, queries1.QUERY_SCHEMAS.get("most_active_users"), params).result(timeout=30)
+    finally:
+        backend.close()
+
+    spans = {s.name: s for s in tracer.spans(page.trace_id)}
+    assert {"execute", "fetch", "frame"} <= set(spans)
+    assert all(spans[name].parent_id == page.span_id for name in ("execute", "fetch", "frame"))
+    assert spans["fetch"].attrs["rows"] == 20
@@ -0,0 +1,73 @@
+# unit_tests/test_keyset_pages.py
+
+"""Keyset pages of the user and tag tables, and the bind parameters they use."""
+
+import pytest
+
+import queries1
+from backends import DuckDBBackend, to_qmark
+
+
+# --- Bind parameters ---
+def test_named_parameters_become_qmarks_in_order():
+    query, args = to_qmark("SELECT * FROM t WHERE a >= :low AND b = :name AND a <= :high OR c = :low", {"low": 1, "high": 9, "name": "x"})
+
+    assert query == "SELECT * FROM t WHERE a >= ? AND b = ? AND a <= ? OR c = ?"
+    assert args == [1, "x", 9, 1]
+
+
+def test_string_literals_and_casts_are_left_alone():
+    query, args = to_qmark("SELECT ':not_a_param', 'it''s :x', a::int FROM t WHERE b = :b", {"b": 2})
+
+    assert query == "SELECT ':not_a_param', 'it''s :x', a::int FROM t WHERE b = ?"
+    assert args == [2]
+
+
+def test_missing_parameter_is_an_error():
+    with pytest.raises(KeyError):
+        to_qmark("SELECT * FROM t WHERE a = :a AND b = :b", {"a": 1})
+
+
+def test_query_without_parameters_is_unchanged():
+    assert to_qmark("SELECT :a", None) == ("SELECT :a", None)
+
+
+# --- Keyset pages ---
+def test_keyset_condition_spells_out_the_row_comparison():
+    assert queries1.keyset_condition(["a", "b"]) == "(a < :a OR (a = :a AND b < :b))"
+
+
+@pytest.fixture(scope="module")
+def duckdb_backend(exports_dir):
+    backend = DuckDBBackend(exports_dir)
+    yield backend
+    backend.close()
+
+
+def walk(backend, page_func, keyset, page_size):
+    """Every page of `page_func`, following the cursor like the dashboard's Next button."""
+    pages, after = [], None
+    while True:
+        df = backend.run_query(page_func(page_size, after), params=after)
+        pages.append(df.head(page_size))
+        if len(df) <= page_size:
+            return pages
+        after = df[keyset].iloc[page_size - 1].to_dict()
+
+
+@pytest.mark.parametrize("page_func, full_func, keyset", [
+    (queries1.user_engagement_page, queries1.user_engagement, queries1.USER_ENGAGEMENT_KEYSET),
+    (queries1.tag_relevance_page, queries1.tag_relevance_analysis, queries1.TAG_RELEVANCE_KEYSET),
+], ids=["users", "tags"])
+def test_pages_cover_the_full_table_once(duckdb_backend, page_func, full_func, keyset):
+    full = duckdb_backend.run_query(full_func())
+
+    pages = walk(duckdb_backend, page_func, keyset, page_size=100)
+
+    rows = [row for page in pages for row in page[keyset[-1]].tolist()]
+    assert len(pages) == -(-len(full) // 100)
+    assert len(rows) == len(set(rows)) == len(full)
+    assert set(rows) == set(full[keyset[-1]].tolist())
+    # Each page continues where the last one stopped, in keyset order
+    ordered = [tuple(row) for page in pages for row in page[keyset].itertuples(index=False)]
+    assert ordered == sorted(ordered, reverse=True)
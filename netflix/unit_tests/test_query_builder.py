@@ -0,0 +1,86 @@
+# unit_tests/test_query_builder.py
+
+"""Typed parameters and bound filters of `build_query`."""
+
+import itertools
+
+import pytest
+
+import queries1
+from backends import DuckDBBackend, to_qmark
+from queries1 import build_query, query_id
+
+
+def test_declared_defaults_are_bound():
+    query, params = build_query(queries1.highest_rated_movies)
+
+    assert params == {"min_ratings": 100}
+    assert ":min_ratings" in query
+    assert query_id(query) == "highest_rated_movies"
+
+
+def test_values_are_coerced_and_never_formatted_into_the_sql():
+    query, params = build_query(queries1.hidden_gems, min_ratings="25", min_average="3.5", genre="Drama", year_from=2001.0)
+
+    assert params == {"min_ratings": 25, "min_average": 3.5, "genre": "Drama", "year_from": 2001}
+    assert "Drama" not in query and "2001" not in query
+
+
+def test_none_turns_a_filter_off():
+    query, params = build_query(queries1.highest_rated_movies, min_ratings=None)
+
+    assert params is None
+    assert ":min_ratings" not in query
+
+
+def test_filters_a_query_does_not_take_are_ignored():
+    assert build_query(queries1.genre_analysis, genre="Drama", year_from=2001)[1] is None
+
+
+def test_sql_only_depends_on_which_filters_are_set():
+    first, _ = build_query(queries1.most_popular_movies, genre="Drama", year_to=2005)
+    second, _ = build_query(queries1.most_popular_movies, genre="Comedy", year_to=2010)
+
+    assert first == second
+
+
+FILTER_VALUES = {"min_ratings": [None, 10], "genre": [None, "Drama"], "year_from": [None, 2000], "year_to": [None, 2010], "min_average": [None, 3.0]}
+
+
+@pytest.mark.parametrize("query_func", [queries1.highest_rated_movies, queries1.most_popular_movies, queries1.hidden_gems, queries1.rating_over_the_years], ids=lambda func: func.__name__)
+def test_every_filter_combination_binds(query_func):
+    for values in itertools.product(*FILTER_VALUES.values()):
+        query, params = build_query(query_func, **dict(zip(FILTER_VALUES, values)))
+        # Raises if the SQL references a parameter that is not set
+        to_qmark(query, params)
+
+
+@pytest.fixture(scope="module")
+def duckdb_backend(exports_dir):
+    backend = DuckDBBackend(exports_dir)
+    yield backend
+    backend.close()
+
+
+def run(backend, query_func, **filters):
+    query, params = build_query(query_func, **filters)
+    return backend.run_query(query, params=params)
+
+
+def test_genre_and_rating_filters_reach_the_results(duckdb_backend):
+    drama = set(duckdb_backend.run_query("SELECT m.movie_title FROM dim_movie_genres g JOIN dim_movies m USING (movie_id) WHERE genre = 'Drama'")["movie_title"])
+
+    df = run(duckdb_backend, queries1.most_popular_movies, genre="Drama", min_ratings=20)
+
+    assert len(df) > 0
+    assert set(df["movie_title"]) <= drama
+    assert (df["total_ratings"] > 20).all()
+
+
+def test_year_range_reaches_the_results(duckdb_backend):
+    everything = run(duckdb_backend, queries1.rating_over_the_years)
+
+    df = run(duckdb_backend, queries1.rating_over_the_years, year_from=2005, year_to=2010)
+
+    assert df["rating_year"].between(2005, 2010).all()
+    assert 0 < len(df) < len(everything)
@@ -0,0 +1,206 @@
+# unit_tests/test_ratings_store.py
+
+"""Syncing `RatingsStore` with a changing `fct_ratings` export, and its answers against the SQL."""
+
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import queries1
+import ratings_store
+from backends import ColumnarBackend, DuckDBBackend
+from ratings_store import QUERY_HANDLERS, RatingsStore
+
+
+def write_exports(data_dir, ratings):
+    pd.DataFrame({
+        "movie_id": [1, 2],
+        "movie_title": ["A", "B"],
+        "genres": ["Drama", "Comedy|Drama"],
+    }).to_parquet(os.path.join(data_dir, "dim_movies.parquet"), index=False)
+    path = os.path.join(data_dir, "fct_ratings.parquet")
+    ratings.to_parquet(path, index=False)
+    # Moves the mtime on even within the file system's timestamp resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def ratings(rows, loaded_at):
+    return pd.DataFrame({
+        "user_id": [user for user, _, _, _ in rows],
+        "movie_id": [movie for _, movie, _, _ in rows],
+        "rating": [rating for _, _, rating, _ in rows],
+        "rating_timestamp": pd.to_datetime([ts for _, _, _, ts in rows], utc=True),
+        "loaded_at": pd.to_datetime([loaded_at] * len(rows), utc=True),
+    })
+
+
+FIRST_LOAD = [(1, 1, 4.0, "2015-01-01"), (2, 1, 3.0, "2015-06-01"), (1, 2, 5.0, "2016-01-01")]
+LATE = [(3, 2, 2.0, "2016-02-01")]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_exports(tmp_path, ratings(FIRST_LOAD, "2024-01-01"))
+    return str(tmp_path)
+
+
+def open_store(data_dir):
+    return RatingsStore.open(os.path.join(data_dir, "store"), data_dir)
+
+
+def test_incremental_sync_appends_only_new_rows(data_dir):
+    store = open_store(data_dir)
+    write_exports(data_dir, pd.concat([ratings(FIRST_LOAD, "2024-01-01"), ratings(LATE, "2024-01-02")]))
+
+    assert store.sync(data_dir) == 1
+    assert store.rows == 4
+    assert RatingsStore(os.path.join(data_dir, "store")).rows == 4
+
+
+def test_full_refresh_reloads_instead_of_double_counting(data_dir):
+    store = open_store(data_dir)
+    # Every loaded_at restamped, as `dbt run --full-refresh` does
+    write_exports(data_dir, ratings(FIRST_LOAD + LATE, "2024-02-01"))
+
+    store.sync(data_dir)
+
+    assert store.rows == 4
+    assert int(store.snapshot().movie_count.sum()) == 4
+    assert RatingsStore(os.path.join(data_dir, "store")).rows == 4
+
+
+def test_ratings_without_timestamp_are_skipped(tmp_path):
+    rows = ratings(FIRST_LOAD, "2024-01-01")
+    rows.loc[0, "rating_timestamp"] = pd.NaT
+    write_exports(tmp_path, rows)
+
+    store = open_store(str(tmp_path))
+
+    assert store.rows == 2
+    years, _ = store.year_totals(store.snapshot())
+    assert list(years) == [2015, 2016]
+
+
+def test_interrupted_sync_is_read_again(data_dir, monkeypatch):
+    store = open_store(data_dir)
+    write_exports(data_dir, pd.concat([
+        ratings(FIRST_LOAD, "2024-01-01"),
+        ratings(LATE, "2024-01-03"),
+        ratings([(4, 1, 1.0, "2016-03-01")], "2024-01-02"),
+    ]))
+    monkeypatch.setattr(ratings_store, "CHUNK_ROWS", 1)
+    write_chunk = store._write_chunk
+    calls = []
+
+    def failing_write_chunk(*args):
+        calls.append(None)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return write_chunk(*args)
+
+    monkeypatch.setattr(store, "_write_chunk", failing_write_chunk)
+    with pytest.raises(OSError):
+        store.sync(data_dir)
+    assert store.rows == 3
+    # Nothing of the interrupted sync was committed
+    assert RatingsStore(os.path.join(data_dir, "store")).rows == 3
+
+    monkeypatch.setattr(store, "_write_chunk", write_chunk)
+    assert store.sync(data_dir) == 2
+    assert store.rows == 5
+
+
+def test_queries_during_a_reload_see_the_previous_rows(data_dir, monkeypatch):
+    store = open_store(data_dir)
+    before = ratings_store.executive_summary(store, {}, None)
+    write_exports(data_dir, ratings(FIRST_LOAD + LATE, "2024-02-01"))
+    monkeypatch.setattr(ratings_store, "CHUNK_ROWS", 1)
+    write_chunk = store._write_chunk
+    seen = []
+
+    def querying_write_chunk(*args):
+        seen.append(ratings_store.executive_summary(store, {}, None))
+        return write_chunk(*args)
+
+    monkeypatch.setattr(store, "_write_chunk", querying_write_chunk)
+    store.sync(data_dir)
+
+    assert len(seen) == 4
+    for summary in seen:
+        pd.testing.assert_frame_equal(summary, before)
+    assert int(ratings_store.executive_summary(store, {}, None)["total_ratings"][0]) == 4
+    # The reload went to new column files and the old ones are gone
+    files = sorted(name for name in os.listdir(os.path.join(data_dir, "store")) if name.endswith(".bin"))
+    assert files == sorted(f"{name}.1.bin" for name in ratings_store.COLUMNS)
+
+
+# --- Parity with the SQL ---
+@pytest.fixture(scope="module")
+def backends(exports_dir, tmp_path_factory):
+    duckdb = DuckDBBackend(exports_dir)
+    columnar = ColumnarBackend(RatingsStore.open(str(tmp_path_factory.mktemp("store")), exports_dir))
+    yield duckdb, columnar
+    duckdb.close()
+
+
+_ORDER_BY = re.compile(r"ORDER BY (.+?)\s*(?:LIMIT|;|$)", re.S)
+
+
+def order_keys(query):
+    """Result columns `query` sorts on, without table aliases and directions."""
+    match = _ORDER_BY.search(query)
+    if match is None:
+        return []
+    return [re.sub(r"^\w+\.|\s+(ASC|DESC)$", "", key.strip(), flags=re.I) for key in match.group(1).split(",")]
+
+
+def assert_same_result(sql, store, query):
+    """Same rows in the same order, up to the order of rows that tie on every ORDER BY key."""
+    assert list(store.columns) == list(sql.columns)
+    assert len(store) == len(sql)
+    keys = order_keys(query)
+    if keys:
+        pd.testing.assert_frame_equal(store[keys].reset_index(drop=True), sql[keys].reset_index(drop=True), check_dtype=False)
+    if "LIMIT" in query and keys:
+        # Rows tied with the last one may be cut differently; the rest must be the same
+        last = tuple(sql[keys].iloc[-1]) if len(sql) else None
+        sql = sql[[tuple(row) != last for row in sql[keys].itertuples(index=False)]]
+        store = store[[tuple(row) != last for row in store[keys].itertuples(index=False)]]
+    pd.testing.assert_frame_equal(_sorted(store), _sorted(sql), check_dtype=False, rtol=1e-5)
+
+
+def _sorted(df):
+    # Categories are compared as text, since each side has its own category order
+    df = df.astype({column: str for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)})
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+FILTERS = [
+    {},
+    {"genre": "Drama", "min_ratings": 20},
+    {"year_from": 2000, "year_to": 2010, "min_ratings": 5},
+    {"min_ratings": None, "min_average": 3.5},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS, ids=["defaults", "genre", "years", "unfiltered"])
+@pytest.mark.parametrize("name", sorted(set(QUERY_HANDLERS) - {"user_engagement_page"}))
+def test_handlers_answer_like_the_sql(backends, name, filters):
+    duckdb, columnar = backends
+    query, params = queries1.build_query(getattr(queries1, name), **filters)
+    schema = queries1.QUERY_SCHEMAS.get(name)
+
+    assert_same_result(duckdb.run_query(query, schema, params), columnar.run_query(query, schema, params), query)
+
+
+def test_user_pages_follow_the_sql_cursor(backends):
+    duckdb, columnar = backends
+    after = None
+    for _ in range(3):
+        query = queries1.tag_query("user_engagement_page", queries1.user_engagement_page(50, after))
+        sql = duckdb.run_query(query, params=after)
+        pd.testing.assert_frame_equal(columnar.run_query(query, params=after), sql, check_dtype=False)
+        after = sql[queries1.USER_ENGAGEMENT_KEYSET].iloc[49].to_dict()
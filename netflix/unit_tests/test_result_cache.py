@@ -0,0 +1,66 @@
+# unit_tests/test_result_cache.py
+
+"""Data versioning and disk bounds of `ResultCache`."""
+
+import os
+import threading
+import time
+
+import pandas as pd
+
+from result_cache import ResultCache
+
+
+def test_failed_version_fetch_keeps_last_version():
+    versions = iter(["v1"])
+
+    def version_fn():
+        # Fails on every call after the first
+        return next(versions)
+
+    cache = ResultCache(version_fn=version_fn, version_ttl=0)
+    assert cache.current_version() == "v1"
+    assert cache.current_version() == "v1"
+
+
+def test_lookups_do_not_wait_on_a_slow_version_fetch():
+    release = threading.Event()
+    calls = []
+
+    def version_fn():
+        calls.append(None)
+        if len(calls) > 1:
+            release.wait(5)
+        return f"v{len(calls)}"
+
+    cache = ResultCache(version_fn=version_fn, version_ttl=0)
+    cache.put("key", pd.DataFrame({"a": [1]}))
+    refresher = threading.Thread(target=cache.current_version)
+    refresher.start()
+    while len(calls) < 2:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    df = cache.get("key")
+    assert time.monotonic() - start < 1
+    assert df is not None
+    release.set()
+    refresher.join()
+    assert cache.current_version() in {"v2", "v3"}
+
+
+def test_disk_tier_drops_least_recently_used_files_over_its_cap(tmp_path):
+    df = pd.DataFrame({"a": range(1000)})
+    cache = ResultCache(disk_dir=str(tmp_path))
+    cache.put("probe", df)
+    file_bytes = os.path.getsize(tmp_path / "probe.parquet")
+    cache.clear()
+
+    cache = ResultCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=int(3.5 * file_bytes))
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, df)
+        os.utime(tmp_path / f"{key}.parquet", (i, i))
+    cache.get("a")  # now the most recently used
+    cache.put("d", df)
+
+    assert sorted(os.listdir(tmp_path)) == ["a.parquet", "d.parquet"]
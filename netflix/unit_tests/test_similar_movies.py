@@ -0,0 +1,131 @@
+# unit_tests/test_similar_movies.py
+
+"""Top-K genome neighbours of `SimilarityIndex`, built whole and refreshed in place."""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import similar_movies
+from backends import DASHBOARD_TABLES, DuckDBBackend, to_duckdb_sql
+from similar_movies import SimilarityIndex
+
+
+K = 10
+
+
+def test_hash_agg_is_rewritten():
+    assert to_duckdb_sql("HASH_AGG(tag_id, relevance_score)") == "bit_xor(hash(tag_id, relevance_score))"
+
+
+@pytest.fixture
+def data_dir(exports_dir, tmp_path):
+    """A copy of the base table exports, so a test can change its genome scores."""
+    path = tmp_path / "models"
+    path.mkdir()
+    for table in DASHBOARD_TABLES:
+        shutil.copy(os.path.join(exports_dir, f"{table}.parquet"), path)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Several row and column blocks even at ml-100k's genome size
+    monkeypatch.setattr(similar_movies, "ROW_BLOCK", 64)
+    monkeypatch.setattr(similar_movies, "COLUMN_BLOCK", 128)
+
+
+def sync(index, data_dir, version):
+    backend = DuckDBBackend(data_dir)
+    try:
+        return index.sync(backend, version)
+    finally:
+        backend.close()
+
+
+def brute_force(data_dir):
+    """Every movie's K nearest neighbours by cosine similarity, from the whole score matrix."""
+    scores = pd.read_parquet(os.path.join(data_dir, "fct_genome_scores.parquet"))
+    matrix = scores.pivot_table(index="movie_id", columns="tag_id", values="relevance_score", fill_value=0)
+    vectors = matrix.to_numpy(dtype=np.float64)
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+    order = np.argsort(-similarity, axis=1, kind="stable")[:, :K]
+    ids = matrix.index.to_numpy()
+    return {
+        int(movie_id): (ids[order[row]], similarity[row, order[row]])
+        for row, movie_id in enumerate(ids)
+    }
+
+
+def assert_neighbors(index, expected):
+    assert sorted(int(movie_id) for movie_id in index.movie_ids) == sorted(expected)
+    for movie_id, (ids, similarity) in expected.items():
+        found = index.neighbors(movie_id)
+        np.testing.assert_allclose(found["similarity"], similarity, rtol=1e-4)
+        np.testing.assert_array_equal(found["movie_id"], ids)
+
+
+def change_scores(data_dir, movie_ids):
+    path = os.path.join(data_dir, "fct_genome_scores.parquet")
+    scores = pd.read_parquet(path)
+    changed = scores["movie_id"].isin(movie_ids)
+    scores.loc[changed, "relevance_score"] = 1 - scores.loc[changed, "relevance_score"]
+    scores.to_parquet(path, index=False)
+
+
+def test_built_index_matches_brute_force(data_dir, tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index"), k=K)
+
+    built = sync(index, data_dir, "v1")
+
+    expected = brute_force(data_dir)
+    assert built == len(expected)
+    assert_neighbors(index, expected)
+
+
+def test_same_version_is_not_synced_again(data_dir, tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index"), k=K)
+    sync(index, data_dir, "v1")
+
+    assert sync(index, data_dir, "v1") == 0
+
+
+def test_index_is_read_back_from_disk(data_dir, tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index"), k=K)
+    sync(index, data_dir, "v1")
+
+    reopened = SimilarityIndex(str(tmp_path / "index"), k=K)
+
+    assert reopened.version == index.version
+    movie_id = int(index.movie_ids[0])
+    pd.testing.assert_frame_equal(reopened.neighbors(movie_id), index.neighbors(movie_id))
+    pd.testing.assert_frame_equal(reopened.top_tags(movie_id), index.top_tags(movie_id))
+
+
+def test_incremental_sync_only_rereads_changed_movies(data_dir, tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index"), k=K)
+    sync(index, data_dir, "v1")
+    changed = [int(movie_id) for movie_id in index.movie_ids[[3, 100, 250]]]
+    change_scores(data_dir, changed)
+
+    assert sync(index, data_dir, "v2") == len(changed)
+
+    # Same neighbours as an index built from scratch over the new scores
+    assert_neighbors(index, brute_force(data_dir))
+    rebuilt = SimilarityIndex(str(tmp_path / "rebuilt"), k=K)
+    sync(rebuilt, data_dir, "v2")
+    for movie_id in index.movie_ids:
+        np.testing.assert_allclose(index.neighbors(movie_id)["similarity"], rebuilt.neighbors(movie_id)["similarity"], rtol=1e-5)
+
+
+def test_unknown_movie_has_no_neighbors(data_dir, tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index"), k=K)
+    sync(index, data_dir, "v1")
+
+    assert index.neighbors(-1).empty
+    assert -1 not in index
@@ -0,0 +1,138 @@
+# unit_tests/test_snowflake_submit.py
+
+"""Concurrent Snowflake submits against a fake connector with slow queries."""
+
+import itertools
+import threading
+import time
+
+import pyarrow as pa
+
+from backends import SnowflakeBackend
+from executor import QueryExecutor
+from result_cache import ResultCache
+
+QUERY_SECONDS = 0.5
+
+
+class FakeWarehouse:
+    """Runs every `execute_async` query for `QUERY_SECONDS` and records when each started."""
+
+    def __init__(self):
+        self.started = {}  # query id -> (query, start time)
+        self.connections_out = 0
+        self.max_connections_out = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def connect(self, **connect_args):
+        return FakeConnection(self)
+
+    def checkout(self, delta):
+        with self._lock:
+            self.connections_out += delta
+            self.max_connections_out = max(self.max_connections_out, self.connections_out)
+
+
+class FakeCursor:
+    description = [("N",)]
+
+    def __init__(self, warehouse):
+        self.warehouse = warehouse
+        self.sfqid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute_async(self, query, args=None):
+        self.sfqid = f"q{next(self.warehouse._ids)}"
+        self.warehouse.started[self.sfqid] = (query, time.monotonic())
+
+    def get_results_from_sfqid(self, query_id):
+        self.sfqid = query_id
+
+    def fetch_arrow_all(self):
+        return pa.table({"N": [int(self.sfqid[1:])]})
+
+
+class FakeConnection:
+    def __init__(self, warehouse):
+        self.warehouse = warehouse
+
+    def cursor(self):
+        # A cursor is only opened while the pool has this connection checked out
+        return FakeCursor(self.warehouse)
+
+    def get_query_status_throw_if_error(self, query_id):
+        return time.monotonic() - self.warehouse.started[query_id][1] < QUERY_SECONDS
+
+    def is_still_running(self, status):
+        return status
+
+    def close(self):
+        pass
+
+
+class CountingPool:
+    """Wraps the backend's pool to track how many connections are checked out at once."""
+
+    def __init__(self, pool, warehouse):
+        self.pool = pool
+        self.warehouse = warehouse
+
+    def run(self, fn):
+        def counted(conn):
+            self.warehouse.checkout(1)
+            try:
+                return fn(conn)
+            finally:
+                self.warehouse.checkout(-1)
+        return self.pool.run(counted)
+
+    def close(self):
+        self.pool.close()
+
+
+def make_backend(warehouse, pool_size=4):
+    backend = SnowflakeBackend(pool_size=pool_size, keepalive_interval=None, connector=warehouse)
+    backend.poll_interval = 0.01
+    backend.pool = CountingPool(backend.pool, warehouse)
+    return backend
+
+
+def test_submits_return_at_once_and_run_beyond_pool_size():
+    warehouse = FakeWarehouse()
+    executor = QueryExecutor(make_backend(warehouse, pool_size=4), ResultCache())
+
+    start = time.monotonic()
+    futures = [executor.submit(f"SELECT {i}") for i in range(8)]
+    submit_seconds = time.monotonic() - start
+    frames = [future.result(timeout=10) for future in futures]
+    total_seconds = time.monotonic() - start
+
+    assert submit_seconds < 0.1
+    assert len(frames) == 8
+    # All eight were in the warehouse at once instead of two waves of four
+    starts = sorted(started for _, started in warehouse.started.values())
+    assert starts[-1] - starts[0] < QUERY_SECONDS
+    assert total_seconds < 2 * QUERY_SECONDS
+    assert warehouse.max_connections_out <= 4
+
+
+def test_identical_queries_share_one_execution():
+    warehouse = FakeWarehouse()
+    executor = QueryExecutor(make_backend(warehouse), ResultCache())
+
+    first, second = executor.submit("SELECT 1"), executor.submit("SELECT 1")
+
+    assert first is second
+    first.result(timeout=10)
+    assert len(warehouse.started) == 1
+    # Cached by the time its waiters wake up
+    assert executor.submit("SELECT 1").done()
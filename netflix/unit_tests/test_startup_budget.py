@@ -0,0 +1,25 @@
+# unit_tests/test_startup_budget.py
+
+"""The dashboard's import time and warm reruns stay within the `benchmarks.startup` budgets."""
+
+import pytest
+
+from benchmarks import startup
+
+
+@pytest.mark.slow
+def test_startup_is_within_budget(bench_dir, tmp_path, monkeypatch, capsys):
+    # The rerun check points the app at the exports through these
+    for name in ("MOVIELENS_BACKEND", "MOVIELENS_PARQUET_DIR", "MOVIELENS_CACHE_DIR", "MOVIELENS_SIMILAR_DIR"):
+        monkeypatch.delenv(name, raising=False)
+
+    code = startup.main([
+        "--work-dir", bench_dir,
+        "--scale", "ml-100k",
+        "--repeat", "3",
+        "--import-budget-ms", "150",
+        "--rerun-budget-ms", "250",
+        "--output", str(tmp_path / "startup.json"),
+    ])
+
+    assert code == 0, capsys.readouterr().err